@@ -1,11 +1,27 @@
 from django.contrib import admin
-from .models import Book, UserBookInteraction, Review
+from django.db.models import Q
+from .models import Book, BookFacet, UserBookInteraction, Review
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     """Admin view for the Book model."""
     list_display = ('title', 'google_id', 'published_date')
-    search_fields = ('title', 'google_id', 'authors')
+    search_fields = ('title', 'google_id')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Exact author names use the membership index; the start of a name
+        # ("tolk" is not enough, "J. R. R." is) is a range on the BookFacet
+        # (kind, value) index, as typed or title-cased. Nothing here scans.
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()[:255]
+        if term:
+            prefixes = Q()
+            for prefix in {term, term.title()}:
+                prefixes |= Q(facets__value__gte=prefix, facets__value__lt=prefix + "\U0010ffff")
+            results |= queryset.by_author(term)
+            results |= queryset.filter(prefixes, facets__kind=BookFacet.Kind.AUTHOR)
+            may_have_duplicates = True
+        return results, may_have_duplicates
 
 @admin.register(UserBookInteraction)
 class UserBookInteractionAdmin(admin.ModelAdmin):
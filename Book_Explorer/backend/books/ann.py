@@ -0,0 +1,193 @@
+# books/ann.py
+"""
+Approximate nearest-neighbour (IVF) index over Book embeddings.
+
+Centroids live in EmbeddingCentroid and every embedded Book stores the id of
+its nearest centroid in Book.ann_list (indexed). A query probes the few lists
+closest to the user vector, so candidate retrieval touches a small, indexed
+slice of the catalog instead of scanning it.
+"""
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Book, EmbeddingCentroid, EMBEDDING_DTYPE
+
+ANN_VERSION_KEY = "book_ann_index_version"
+DEFAULT_N_PROBE = 4
+ASSIGN_CHUNK = 2000
+ASSIGN_UPDATE_BATCH = 500  # rows per CASE-based bulk_update statement
+SAMPLE_FETCH_CHUNK = 1000  # ids per IN clause when loading the training sample
+
+# Per-process copy of the centroid matrix, reloaded when the index version changes.
+_state = {"version": None, "ids": None, "matrix": None}
+
+
+# --- Helpers ---
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.array(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for every row, computed in chunks."""
+    out = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), ASSIGN_CHUNK):
+        out[start:start + ASSIGN_CHUNK] = np.argmax(data[start:start + ASSIGN_CHUNK] @ centroids.T, axis=1)
+    return out
+
+
+def _spherical_kmeans(data: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = data[rng.choice(len(data), size=len(empty), replace=False)]
+        centroids = _unit_rows(sums)
+    return centroids
+
+
+def _load_centroids():
+    version = cache.get(ANN_VERSION_KEY, 0)
+    if _state["matrix"] is None or _state["version"] != version:
+        rows = list(EmbeddingCentroid.objects.order_by("list_id").values_list("list_id", "vector"))
+        if rows:
+            _state["ids"] = np.array([r[0] for r in rows], dtype=np.int64)
+            _state["matrix"] = np.vstack([np.frombuffer(r[1], dtype=EMBEDDING_DTYPE) for r in rows])
+        else:
+            _state["ids"], _state["matrix"] = None, None
+        _state["version"] = version
+    return _state["ids"], _state["matrix"]
+
+
+# --- Index maintenance ---
+def build_index(n_lists: Optional[int] = None, sample_size: int = 20000, iterations: int = 8, seed: int = 0) -> dict:
+    """
+    (Re)build the IVF index from every embedded book.
+    Centroids are trained on a random sample; all books are then assigned in chunks.
+    """
+    rng = np.random.default_rng(seed)
+    all_ids = list(Book.objects.filter(embedding__isnull=False).values_list("google_id", flat=True))
+    if not all_ids:
+        return {"books": 0, "lists": 0}
+
+    sample_ids = [all_ids[i] for i in rng.choice(len(all_ids), size=min(sample_size, len(all_ids)), replace=False)]
+    sample = []
+    for start in range(0, len(sample_ids), SAMPLE_FETCH_CHUNK):
+        raws = Book.objects.filter(google_id__in=sample_ids[start:start + SAMPLE_FETCH_CHUNK]).values_list(
+            "embedding", flat=True
+        )
+        sample.extend(np.frombuffer(raw, dtype=EMBEDDING_DTYPE) for raw in raws if raw)
+    # Mixed providers produce different dimensions; index the dominant one.
+    dims, counts = np.unique([len(v) for v in sample], return_counts=True)
+    dim = int(dims[np.argmax(counts)])
+    data = _unit_rows([v for v in sample if len(v) == dim])
+
+    if n_lists is None:
+        n_lists = int(4 * math.sqrt(len(all_ids)))
+    n_lists = max(1, min(n_lists, len(data)))
+    centroids = _spherical_kmeans(data, n_lists, iterations, rng)
+
+    sizes = np.zeros(n_lists, dtype=np.int64)
+    with transaction.atomic():
+        EmbeddingCentroid.objects.all().delete()
+        Book.objects.filter(ann_list__isnull=False).update(ann_list=None)
+
+        for start in range(0, len(all_ids), ASSIGN_CHUNK):
+            chunk = Book.objects.filter(google_id__in=all_ids[start:start + ASSIGN_CHUNK]).values_list(
+                "google_id", "embedding"
+            )
+            ids, vecs = [], []
+            for google_id, raw in chunk:
+                vec = np.frombuffer(raw, dtype=EMBEDDING_DTYPE) if raw else None
+                if vec is not None and len(vec) == dim:
+                    ids.append(google_id)
+                    vecs.append(vec)
+            if not ids:
+                continue
+            assign = _nearest(_unit_rows(vecs), centroids)
+            # One CASE-based UPDATE per batch instead of one IN-list UPDATE per list.
+            Book.objects.bulk_update(
+                [Book(google_id=g, ann_list=int(a)) for g, a in zip(ids, assign)],
+                ["ann_list"],
+                batch_size=ASSIGN_UPDATE_BATCH,
+            )
+            sizes += np.bincount(assign, minlength=n_lists)
+
+        EmbeddingCentroid.objects.bulk_create([
+            EmbeddingCentroid(list_id=i, vector=centroids[i].tobytes(), size=int(sizes[i]))
+            for i in range(n_lists)
+        ])
+
+    _bump_version()
+    return {"books": int(sizes.sum()), "lists": n_lists, "dim": dim}
+
+
+def _bump_version():
+    try:
+        cache.incr(ANN_VERSION_KEY)
+    except ValueError:
+        cache.set(ANN_VERSION_KEY, 1, timeout=None)
+
+
+def adjust_list_sizes(deltas: Dict[int, int]) -> None:
+    """Apply per-list size changes; sizes never go below zero."""
+    for list_id, delta in deltas.items():
+        if delta:
+            EmbeddingCentroid.objects.filter(list_id=int(list_id)).update(size=Greatest(F("size") + delta, 0))
+
+
+def place_books(books: List[Book]) -> None:
+    """
+    Incrementally place freshly embedded books into their IVF lists.
+    Sets book.ann_list on each (the caller saves them) and moves list sizes:
+    a re-embedded book leaves its old list as it joins the new one.
+    """
+    ids, matrix = _load_centroids()
+    previous = dict(
+        Book.objects.filter(google_id__in=[b.google_id for b in books], ann_list__isnull=False)
+        .values_list("google_id", "ann_list")
+    ) if matrix is not None else {}
+    for book in books:
+        book.ann_list = None
+
+    if matrix is not None:
+        placeable = [(b, b.get_embedding()) for b in books]
+        placeable = [(b, v) for b, v in placeable if v is not None and len(v) == matrix.shape[1]]
+        if placeable:
+            assign = _nearest(_unit_rows([v for _, v in placeable]), matrix)
+            for (book, _), row in zip(placeable, assign):
+                book.ann_list = int(ids[row])
+
+    deltas = Counter(b.ann_list for b in books if b.ann_list is not None)
+    deltas.subtract(previous.values())
+    adjust_list_sizes(deltas)
+
+
+# --- Query ---
+def candidate_books(user_vector, exclude_ids: set, n_probe: int = DEFAULT_N_PROBE) -> List[Book]:
+    """
+    Books from the n_probe IVF lists closest to user_vector.
+    Returns an empty list when no index has been built yet.
+    """
+    ids, matrix = _load_centroids()
+    if matrix is None or user_vector is None or len(user_vector) != matrix.shape[1]:
+        return []
+
+    sims = matrix @ _unit_rows([user_vector])[0]
+    n_probe = min(n_probe, len(sims))
+    probes = ids[np.argpartition(-sims, n_probe - 1)[:n_probe]]
+    qs = Book.objects.vector().filter(ann_list__in=[int(p) for p in probes]).exclude(google_id__in=exclude_ids)
+    return list(qs)
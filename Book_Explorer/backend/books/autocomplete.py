@@ -0,0 +1,413 @@
+# books/autocomplete.py
+"""
+Prefix autocomplete over persisted book titles and author names.
+
+The index is a sorted list of normalized keys searched with bisect; each key
+points at a record (kind, display text, google_id, weight). Titles are also
+keyed without a leading article ("lord of" finds "The Lord of the Rings") and
+authors by surname ("tolk" finds "J. R. R. Tolkien"). Every match of a prefix
+is ranked with a heap; results for short (2-3 character) prefixes, whose
+ranges are the longest, are memoized per process until a key under them changes.
+
+The shared cache holds a base snapshot plus a log of small deltas (the rows of
+the books that changed), both under one version counter. Processes keep a copy
+and, when the version moves, apply just the new deltas; only a process that
+falls too far behind (or finds a delta expired) reloads the snapshot. Updates
+append a delta under a cache lock, and every AUTOCOMPLETE_COMPACT_EVERY deltas
+the snapshot is rebuilt from the Book table.
+"""
+import bisect
+import heapq
+import threading
+import time
+import unicodedata
+import uuid
+from array import array
+
+from django.core.cache import cache
+
+from .models import Book
+
+AUTOCOMPLETE_SNAPSHOT_KEY = "autocomplete_snapshot"
+AUTOCOMPLETE_BASE_VERSION_KEY = "autocomplete_base_version"
+AUTOCOMPLETE_VERSION_KEY = "autocomplete_version"
+AUTOCOMPLETE_DELTA_KEY = "autocomplete_delta_{}"
+AUTOCOMPLETE_LOCK_KEY = "autocomplete_update_lock"
+AUTOCOMPLETE_BUILD_QUEUED_KEY = "autocomplete_build_queued"
+AUTOCOMPLETE_LOCK_TTL = 60
+AUTOCOMPLETE_DELTA_TTL = 60 * 60 * 24
+AUTOCOMPLETE_COMPACT_EVERY = 200  # deltas after the base snapshot before the next update rebuilds it
+AUTOCOMPLETE_VERSION_POLL = 1.0   # seconds between version checks per process
+AUTOCOMPLETE_MIN_PREFIX = 2
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_MEMO_PREFIX = 3      # prefixes up to this length keep their top AUTOCOMPLETE_MAX_LIMIT records
+BUILD_CHUNK = 2000
+SNAPSHOT_FORMAT = 2               # bump when to_snapshot() changes; older snapshots are rebuilt
+
+TITLE, AUTHOR = "t", "a"
+_ARTICLES = ("the ", "a ", "an ")
+
+# Per-process copy of the index, caught up when the shared version changes.
+# The lock keeps searches off the index while deltas are applied to it.
+_state = {"version": None, "index": None, "checked_at": 0.0}
+_state_lock = threading.RLock()
+
+
+# ============================================================
+# 🔹 Index Structure
+# ============================================================
+def normalize(text):
+    """Lowercase, accent-free, single-spaced form used for keys and prefixes."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def _title_keys(title):
+    key = normalize(title)
+    keys = [key] if key else []
+    for article in _ARTICLES:
+        if key.startswith(article) and len(key) > len(article):
+            keys.append(key[len(article):])
+            break
+    return keys
+
+
+def _author_keys(author):
+    key = normalize(author) if isinstance(author, str) else ""
+    surname = key.rsplit(" ", 1)[-1]
+    return [key, surname] if surname != key else ([key] if key else [])
+
+
+class PrefixIndex:
+    """
+    Sorted keys plus parallel record arrays. `refs[i]` is the record that
+    `keys[i]` belongs to; a record can have several keys. An author's weight
+    is the number of books listing them, tracked through `book_authors`
+    (google_id -> author record numbers) so re-adding a book never counts twice.
+    Authors left without books and removed titles keep their record but lose their keys.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.refs = array("I")
+        self.kinds = []
+        self.texts = []
+        self.google_ids = []
+        self.weights = array("I")
+        self.book_authors = {}
+        self._records = None  # (kind, identity) -> record number; built on first write
+        self._top = {}        # short prefix -> best record numbers (memo)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _record_map(self):
+        if self._records is None:
+            self._records = {
+                (kind, self.google_ids[n] if kind == TITLE else normalize(self.texts[n])): n
+                for n, kind in enumerate(self.kinds)
+            }
+        return self._records
+
+    def _record_keys(self, number):
+        if self.kinds[number] == TITLE:
+            return _title_keys(self.texts[number])
+        return _author_keys(self.texts[number])
+
+    def _touch(self, keys):
+        """Forget memoized rankings of every short prefix of `keys`."""
+        for key in keys:
+            for n in range(AUTOCOMPLETE_MIN_PREFIX, AUTOCOMPLETE_MEMO_PREFIX + 1):
+                self._top.pop(key[:n], None)
+
+    def _record(self, kind, text, google_id, weight):
+        identity = google_id if kind == TITLE else normalize(text)
+        number = self._record_map().get((kind, identity))
+        if number is not None:
+            if kind == TITLE and (self.texts[number], self.weights[number]) != (text, weight):
+                self.texts[number], self.weights[number] = text, weight
+                self._touch(_title_keys(text))
+            return number, False
+        number = len(self.texts)
+        self.kinds.append(kind)
+        self.texts.append(text)
+        self.google_ids.append(google_id if kind == TITLE else "")
+        self.weights.append(weight)
+        self._records[(kind, identity)] = number
+        return number, True
+
+    def _key_range(self, key):
+        return bisect.bisect_left(self.keys, key), bisect.bisect_right(self.keys, key)
+
+    def _insert_key(self, key, number):
+        lo, hi = self._key_range(key)
+        if number in self.refs[lo:hi]:
+            return
+        self.keys.insert(hi, key)
+        self.refs.insert(hi, number)
+        self._touch([key])
+
+    def _remove_key(self, key, number):
+        lo, hi = self._key_range(key)
+        for pos in range(lo, hi):
+            if self.refs[pos] == number:
+                del self.keys[pos]
+                del self.refs[pos]
+                self._touch([key])
+                return
+
+    def _set_title(self, google_id, title, weight):
+        number = self._record_map().get((TITLE, google_id))
+        if number is not None:
+            # A renamed (or removed) book must stop matching its old title.
+            keep = set(_title_keys(title)) if title else set()
+            for key in set(self._record_keys(number)) - keep:
+                self._remove_key(key, number)
+            if not title:
+                self.weights[number] = 0
+        if title:
+            number, _ = self._record(TITLE, title, google_id, weight + 1)
+            for key in _title_keys(title):
+                self._insert_key(key, number)
+
+    def add_book(self, google_id, title, authors, weight=0):
+        """Add (or refresh) one book's title and author entries in place."""
+        self._set_title(google_id, title, weight)
+        members = set()
+        for author in authors or []:
+            keys = _author_keys(author)
+            if keys:
+                number, _ = self._record(AUTHOR, author, None, 0)
+                members.add(number)
+                for key in keys:
+                    self._insert_key(key, number)
+        self._set_book_authors(google_id, members)
+
+    def remove_book(self, google_id):
+        """Drop a deleted book's title keys and its share of its authors' weights."""
+        self._set_title(google_id, None, 0)
+        self._set_book_authors(google_id, set())
+
+    def _set_book_authors(self, google_id, members):
+        previous = set(self.book_authors.get(google_id, ()))
+        for number in members - previous:
+            self.weights[number] += 1
+            self._touch(self._record_keys(number))
+        for number in previous - members:
+            self.weights[number] -= 1
+            if self.weights[number]:
+                self._touch(self._record_keys(number))
+            else:
+                for key in self._record_keys(number):
+                    self._remove_key(key, number)
+        if members:
+            self.book_authors[google_id] = tuple(sorted(members))
+        else:
+            self.book_authors.pop(google_id, None)
+
+    def apply(self, rows):
+        """Apply one delta: (google_id, title, authors, weight) rows; title None removes the book."""
+        for google_id, title, authors, weight in rows:
+            if title is None:
+                self.remove_book(google_id)
+            else:
+                self.add_book(google_id, title, authors, weight)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Bulk build: collect every key, then sort once instead of inserting."""
+        index = cls()
+        pairs = []
+        for google_id, title, authors, weight in rows:
+            if title:
+                number, _ = index._record(TITLE, title, google_id, weight + 1)
+                pairs.extend((key, number) for key in _title_keys(title))
+            members = set()
+            for author in authors or []:
+                keys = _author_keys(author)
+                if keys:
+                    number, created = index._record(AUTHOR, author, None, 0)
+                    members.add(number)
+                    if created:
+                        pairs.extend((key, number) for key in keys)
+            index._set_book_authors(google_id, members)
+        pairs.sort()
+        index.keys = [key for key, _ in pairs]
+        index.refs = array("I", (number for _, number in pairs))
+        return index
+
+    def _rank(self, prefix, limit):
+        """Heap over every record with a key in the prefix range (heaviest, then shortest, then A-Z)."""
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        return heapq.nsmallest(
+            limit, set(self.refs[lo:hi]),
+            key=lambda n: (-self.weights[n], len(self.texts[n]), self.texts[n]),
+        )
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Best `limit` records whose key starts with `prefix` (heaviest first, then shortest)."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= AUTOCOMPLETE_MEMO_PREFIX and limit <= AUTOCOMPLETE_MAX_LIMIT:
+            ranked = self._top.get(prefix)
+            if ranked is None:
+                ranked = self._top[prefix] = self._rank(prefix, AUTOCOMPLETE_MAX_LIMIT)
+        else:
+            ranked = self._rank(prefix, limit)
+        return [
+            {"type": "title" if self.kinds[n] == TITLE else "author",
+             "text": self.texts[n],
+             "google_id": self.google_ids[n] or None}
+            for n in ranked[:limit]
+        ]
+
+    # --- Snapshot (what goes into the shared cache) ---
+    def to_snapshot(self):
+        return (SNAPSHOT_FORMAT, self.keys, self.refs.tobytes(), "".join(self.kinds), self.texts,
+                self.google_ids, self.weights.tobytes(), self.book_authors)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Index from a cached snapshot, or None if it was written in an older format."""
+        if not snapshot or snapshot[0] != SNAPSHOT_FORMAT:
+            return None
+        _, keys, refs, kinds, texts, google_ids, weights, book_authors = snapshot
+        index = cls()
+        index.book_authors = book_authors
+        index.keys, index.texts, index.google_ids = keys, texts, google_ids
+        index.kinds = list(kinds)
+        index.refs.frombytes(refs)
+        index.weights.frombytes(weights)
+        return index
+
+
+# ============================================================
+# 🔹 Shared Snapshot
+# ============================================================
+def _book_rows(queryset):
+    return queryset.values_list("google_id", "title", "authors", "review_count").iterator(chunk_size=BUILD_CHUNK)
+
+
+def _delta_key(version):
+    return AUTOCOMPLETE_DELTA_KEY.format(version)
+
+
+def _build():
+    """Rebuild from the Book table and publish it as the new base snapshot (lock held)."""
+    index = PrefixIndex.from_rows(_book_rows(Book.objects.all()))
+    version = (cache.get(AUTOCOMPLETE_VERSION_KEY) or 0) + 1
+    # Snapshot before the version, so no reader sees a version whose data isn't there yet.
+    cache.set_many({AUTOCOMPLETE_SNAPSHOT_KEY: index.to_snapshot(), AUTOCOMPLETE_BASE_VERSION_KEY: version}, timeout=None)
+    cache.set(AUTOCOMPLETE_VERSION_KEY, version, timeout=None)
+    with _state_lock:
+        _state.update(version=version, index=index, checked_at=time.monotonic())
+    return index
+
+
+def _catch_up(index, from_version, to_version):
+    """Apply the deltas after from_version up to to_version, or return False if any has expired."""
+    keys = [_delta_key(v) for v in range(from_version + 1, to_version + 1)]
+    deltas = cache.get_many(keys)
+    if len(deltas) != len(keys):
+        return False
+    for key in keys:
+        index.apply(deltas[key])
+    return True
+
+
+def _sync(version):
+    """Bring this process's copy to `version` (lock held); returns False if that needs a full build."""
+    index, current = _state["index"], _state["version"]
+    if index is not None and current == version:
+        return True
+    if index is not None and current is not None and 0 < version - current <= AUTOCOMPLETE_COMPACT_EVERY:
+        if _catch_up(index, current, version):
+            _state["version"] = version
+            return True
+    found = cache.get_many([AUTOCOMPLETE_SNAPSHOT_KEY, AUTOCOMPLETE_BASE_VERSION_KEY])
+    base = found.get(AUTOCOMPLETE_BASE_VERSION_KEY)
+    fresh = PrefixIndex.from_snapshot(found.get(AUTOCOMPLETE_SNAPSHOT_KEY))
+    if fresh is None or base is None:
+        return False
+    if base < version and not _catch_up(fresh, base, version):
+        return False
+    _state.update(version=max(base, version), index=fresh)
+    return True
+
+
+def update_index(google_ids=None):
+    """
+    Append the given books' current rows (deleted ones as removals) to the
+    shared delta log, or rebuild the base snapshot from the Book table when
+    google_ids is None, there is no usable snapshot, or the log is due for
+    compaction. Returns the index size, or None if another process holds the
+    update lock (retry).
+    """
+    token = uuid.uuid4().hex
+    if not cache.add(AUTOCOMPLETE_LOCK_KEY, token, AUTOCOMPLETE_LOCK_TTL):
+        return None
+    try:
+        found = cache.get_many([AUTOCOMPLETE_VERSION_KEY, AUTOCOMPLETE_BASE_VERSION_KEY])
+        version, base = found.get(AUTOCOMPLETE_VERSION_KEY), found.get(AUTOCOMPLETE_BASE_VERSION_KEY)
+        with _state_lock:
+            usable = (
+                google_ids and version is not None and base is not None
+                and version - base < AUTOCOMPLETE_COMPACT_EVERY and _sync(version)
+            )
+            if usable:
+                rows = list(_book_rows(Book.objects.filter(google_id__in=google_ids)))
+                saved = {row[0] for row in rows}
+                rows += [(g, None, None, 0) for g in google_ids if g not in saved]
+                cache.set(_delta_key(version + 1), rows, timeout=AUTOCOMPLETE_DELTA_TTL)
+                cache.set(AUTOCOMPLETE_VERSION_KEY, version + 1, timeout=None)
+                index = _state["index"]
+                index.apply(rows)
+                _state.update(version=version + 1, checked_at=time.monotonic())
+        if not usable:
+            index = _build()
+        return {"records": len(index), "keys": len(index.keys)}
+    finally:
+        if cache.get(AUTOCOMPLETE_LOCK_KEY) == token:
+            cache.delete(AUTOCOMPLETE_LOCK_KEY)
+        if google_ids is None:
+            cache.delete(AUTOCOMPLETE_BUILD_QUEUED_KEY)
+
+
+def get_index():
+    """
+    This process's copy of the index, caught up at most once per poll interval.
+    Call with _state_lock held; deltas are applied to the copy in place.
+    """
+    now = time.monotonic()
+    if _state["index"] is not None and now - _state["checked_at"] < AUTOCOMPLETE_VERSION_POLL:
+        return _state["index"]
+    _state["checked_at"] = now
+    version = cache.get(AUTOCOMPLETE_VERSION_KEY)
+    if version is None or not _sync(version):
+        schedule_index_update(None)
+    return _state["index"] or PrefixIndex()
+
+
+def suggest(prefix, limit=AUTOCOMPLETE_LIMIT):
+    if len(normalize(prefix)) < AUTOCOMPLETE_MIN_PREFIX:
+        return []
+    with _state_lock:
+        return get_index().search(prefix, limit=limit)
+
+
+def schedule_index_update(google_id):
+    """
+    Queue a saved, renamed or deleted book for the shared index, or a full build
+    when google_id is None (at most one queued per lock window). Never fails the request.
+    """
+    if google_id is None and not cache.add(AUTOCOMPLETE_BUILD_QUEUED_KEY, True, AUTOCOMPLETE_LOCK_TTL):
+        return
+    from .tasks import update_autocomplete_index_task
+    try:
+        update_autocomplete_index_task.delay([google_id] if google_id else None)
+    except Exception as e:
+        print(f"⚠️ Could not queue autocomplete update for {google_id or 'full build'}: {e}")
@@ -0,0 +1,337 @@
+# books/caching.py
+"""
+Cache helpers shared by the book services.
+
+single_flight() collapses concurrent identical upstream calls: threads in one
+process share an in-flight call, and processes coordinate through a cache lock
+so only one of them hits the upstream while the others wait for its result.
+
+Stale-while-revalidate: swr_get() serves values past their soft expiry and
+hands the rebuild to a Celery task, so readers only pay for a build on a cold key.
+
+Two-tier reads: local_get() keeps the hottest values in a small per-process
+LRU for a few seconds in front of the shared cache. Entries are kept pickled,
+so every caller gets its own copy. bump_local_epoch() makes every process drop
+its local copies within LOCAL_EPOCH_POLL seconds.
+
+Tag-versioned keys: tagged_key() folds the current version of each tag
+(e.g. "book:<id>", "user:<id>", "explore") into the key, so bump_tags()
+invalidates every dependent entry in O(1); orphaned entries just expire.
+Tag versions are always read from the shared cache, so every process sees a
+bump at once; local copies stay warm but are filed under the old key.
+"""
+import hashlib
+import math
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from . import http_client
+
+SINGLE_FLIGHT_LOCK_MARGIN = 5   # seconds on top of the worst-case upstream call
+SINGLE_FLIGHT_RESULT_TTL = 30   # leader's (successful) result stays readable this long
+SINGLE_FLIGHT_POLL = 0.05       # seconds between follower polls
+SWR_REFRESH_LOCK_TTL = 60 * 5   # at most one background refresh per key in this window
+SWR_BUILD_LOCK_TTL = 60 * 3     # inline cold builds fan out to several upstream rounds
+LOCAL_CACHE_MAX_ENTRIES = 512
+LOCAL_CACHE_TTL = 5             # seconds a local copy is trusted without asking the shared cache
+LOCAL_EPOCH_KEY = "local_cache_epoch"
+LOCAL_EPOCH_POLL = 1.0          # seconds between epoch checks per process
+
+
+def normalized_key(prefix, *parts):
+    """Stable, cache-safe key from request parts (case and whitespace insensitive)."""
+    raw = "|".join(" ".join(str(p).split()).lower() for p in parts)
+    return f"{prefix}_{hashlib.md5(raw.encode('utf-8')).hexdigest()}"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def single_flight_lock_ttl():
+    """
+    How long a leader may hold the upstream lock: one pooled HTTP call at its
+    worst (timeouts x retries + backoff, see http_client) plus a margin, so the
+    lock can't expire while the leader is still waiting on the upstream
+    (computed for this process's budget: short on web threads, long in Celery).
+    """
+    return math.ceil(http_client.max_request_seconds()) + SINGLE_FLIGHT_LOCK_MARGIN
+
+
+def is_successful_result(result):
+    """Upstream helpers signal failure with None / {} or an {"error": ...} payload."""
+    return bool(result) and not (isinstance(result, dict) and "error" in result)
+
+
+def single_flight(key, fn, wait=None, lock_ttl=None, cacheable=is_successful_result):
+    """
+    Return fn() while making sure only one call per key runs at a time,
+    across threads and across processes. Concurrent callers wait for the
+    leader and share its result; if the leader fails or takes longer than
+    `wait`, they fall back to calling fn() themselves. Only results passing
+    `cacheable` are published to other processes, so an upstream error is
+    never served from the cache.
+    """
+    lock_ttl = lock_ttl or single_flight_lock_ttl()
+    wait = wait or lock_ttl
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+
+    if not leader:
+        if call.done.wait(wait) and not call.failed:
+            return call.result
+        return fn()
+
+    try:
+        call.result = _single_flight_across_processes(key, fn, wait, lock_ttl, cacheable)
+        return call.result
+    except Exception:
+        call.failed = True
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call.done.set()
+
+
+def _single_flight_across_processes(key, fn, wait, lock_ttl, cacheable):
+    lock_key, result_key = f"sf_lock_{key}", f"sf_result_{key}"
+
+    boxed = cache.get(result_key)
+    if boxed is not None:
+        return boxed["value"]
+
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, lock_ttl):
+        try:
+            result = fn()
+            if cacheable(result):
+                # Boxed so any value shape can be told apart from a cache miss.
+                cache.set(result_key, {"value": result}, SINGLE_FLIGHT_RESULT_TTL)
+            return result
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    # Another process is the leader: wait for its result.
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        boxed = cache.get(result_key)
+        if boxed is not None:
+            return boxed["value"]
+        if cache.get(lock_key) is None:
+            break
+        time.sleep(SINGLE_FLIGHT_POLL)
+
+    boxed = cache.get(result_key)
+    return boxed["value"] if boxed is not None else fn()
+
+
+# ============================================================
+# 🔹 In-Process LRU Tier
+# ============================================================
+_local = OrderedDict()          # key -> (expires_at, pickled value)
+_local_lock = threading.Lock()
+_local_epoch = None
+_epoch_checked_at = 0.0
+
+
+def _sync_local_epoch():
+    """Drop every local entry once another process has bumped the shared epoch."""
+    global _local_epoch, _epoch_checked_at
+    now = time.monotonic()
+    if now - _epoch_checked_at < LOCAL_EPOCH_POLL:
+        return
+    _epoch_checked_at = now
+    epoch = cache.get(LOCAL_EPOCH_KEY, 0)
+    if epoch != _local_epoch:
+        with _local_lock:
+            _local.clear()
+        _local_epoch = epoch
+
+
+def local_get(key, default=None):
+    """
+    Read through the local LRU, falling back to the shared cache. Every call
+    returns a fresh copy, so callers may modify what they get back.
+    """
+    _sync_local_epoch()
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local.get(key)
+        if entry is not None and entry[0] > now:
+            _local.move_to_end(key)
+            data = entry[1]
+        else:
+            data = None
+    if data is not None:
+        return pickle.loads(data)
+
+    value = cache.get(key)
+    if value is None:
+        return default
+    _local_put(key, value)
+    return value
+
+
+def local_set(key, value, timeout):
+    cache.set(key, value, timeout=timeout)
+    _local_put(key, value)
+
+
+def _local_put(key, value):
+    # Pickled (not shared by reference) so no caller can mutate another's copy.
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    with _local_lock:
+        _local[key] = (time.monotonic() + LOCAL_CACHE_TTL, data)
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_CACHE_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def bump_local_epoch():
+    """Invalidate the local tier in every process (this one immediately)."""
+    global _epoch_checked_at
+    cache.add(LOCAL_EPOCH_KEY, 0, timeout=None)
+    try:
+        cache.incr(LOCAL_EPOCH_KEY)
+    except ValueError:
+        cache.set(LOCAL_EPOCH_KEY, 1, timeout=None)
+    with _local_lock:
+        _local.clear()
+    _epoch_checked_at = 0.0
+
+
+# ============================================================
+# 🔹 Tag-Versioned Keys
+# ============================================================
+def _tag_version_key(tag):
+    return f"tagv_{tag}"
+
+
+def _new_tag_version():
+    # Millisecond clock start: a version evicted and re-created never reuses an old number.
+    return int(time.time() * 1000)
+
+
+def tag_versions(tags):
+    """
+    Current version of each tag in one shared-cache round trip. Never served from
+    the local tier: a process that read a version just before another process
+    bumped it would otherwise keep serving the old entries for LOCAL_CACHE_TTL.
+    """
+    keys = [_tag_version_key(tag) for tag in tags]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _new_tag_version(), timeout=None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+def tagged_key(base, *tags):
+    """Cache key for `base` that changes whenever any of `tags` is bumped."""
+    return f"{base}@" + ".".join(str(v) for v in tag_versions(tags))
+
+
+def bump_tags(*tags):
+    """
+    Invalidate every key registered under `tags`, in every process at once (tag
+    versions are never cached locally). The local tier needs no flush: its
+    copies are filed under the old keys and expire within LOCAL_CACHE_TTL.
+    """
+    for tag in tags:
+        key = _tag_version_key(tag)
+        cache.add(key, _new_tag_version(), timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_tag_version(), timeout=None)
+
+
+# ============================================================
+# 🔹 Stale-While-Revalidate
+# ============================================================
+_swr_registry = {}
+
+
+def swr_builder(key, soft_ttl, hard_ttl):
+    """
+    Register a zero-argument builder for `key`. Values are fresh for soft_ttl
+    seconds, then served stale (while a refresh runs) until hard_ttl.
+    """
+    def decorator(builder):
+        _swr_registry[key] = (builder, soft_ttl, hard_ttl)
+        return builder
+    return decorator
+
+
+def swr_keys():
+    return list(_swr_registry)
+
+
+def swr_expires_in(key):
+    """Seconds until `key` goes stale (negative once stale), or None if it is not cached."""
+    envelope = cache.get(key)
+    if not (isinstance(envelope, dict) and "soft_expires" in envelope):
+        return None
+    return envelope["soft_expires"] - time.time()
+
+
+def swr_refresh(key):
+    """
+    Rebuild `key` now and store it with a new soft expiry. An empty build
+    (failed upstreams) is returned but not stored, so the previous copy stays.
+    """
+    builder, soft_ttl, hard_ttl = _swr_registry[key]
+    value = builder()
+    if value:
+        local_set(key, {"value": value, "soft_expires": time.time() + soft_ttl}, timeout=hard_ttl)
+    return value
+
+
+def swr_get(key):
+    """
+    Return (value, from_cache). Stale values are returned immediately and a
+    background refresh is queued; only a missing or empty entry is built inline.
+    """
+    envelope = local_get(key)
+    if isinstance(envelope, dict) and "soft_expires" in envelope and envelope["value"]:
+        if time.time() >= envelope["soft_expires"]:
+            _schedule_refresh(key)
+        return envelope["value"], True
+    return single_flight(f"swr_build_{key}", lambda: swr_refresh(key), lock_ttl=SWR_BUILD_LOCK_TTL), False
+
+
+def _schedule_refresh(key):
+    lock_key = f"swr_refresh_{key}"
+    if not cache.add(lock_key, True, SWR_REFRESH_LOCK_TTL):
+        return
+    from .tasks import refresh_cached_section_task
+    try:
+        refresh_cached_section_task.delay(key)
+    except Exception as e:
+        cache.delete(lock_key)
+        print(f"⚠️ Could not queue refresh for {key}: {e}")
+
+
+def release_refresh_lock(key):
+    cache.delete(f"swr_refresh_{key}")
@@ -0,0 +1,126 @@
+# books/http_client.py
+"""
+Shared outbound HTTP client.
+
+One keep-alive requests.Session per process with per-host connection pools,
+default timeouts and retry with exponential backoff on 429/5xx, so calls to
+Google Books, NYT and Open Library reuse TCP+TLS connections instead of
+opening a new one per request.
+
+Two retry budgets: web request threads get a short one (no 429 retries, the
+whole call stays under 10s, like the old single 10s timeout); Celery workers
+switch to the long background budget at startup (see config/celery.py).
+"""
+import os
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+REQUEST = "request"
+BACKGROUND = "background"
+
+DEFAULTS = {
+    # Background (Celery) budget
+    "TIMEOUT": (3.05, 10),          # (connect, read) seconds
+    "RETRIES": 3,
+    "BACKOFF_FACTOR": 0.5,          # 0.5s, 1s, 2s ...
+    "STATUS_FORCELIST": (429, 500, 502, 503, 504),
+    "RESPECT_RETRY_AFTER": True,
+    "POOL_CONNECTIONS": 10,         # number of hosts with a cached pool
+    "POOL_MAXSIZE": 20,             # keep-alive connections per host
+    # Overrides for web request threads: one quick retry on 5xx, never sleep on Retry-After
+    "REQUEST": {
+        "TIMEOUT": (1.5, 3),
+        "RETRIES": 1,
+        "BACKOFF_FACTOR": 0.25,
+        "STATUS_FORCELIST": (500, 502, 503, 504),
+        "RESPECT_RETRY_AFTER": False,
+    },
+}
+
+_lock = threading.Lock()
+_sessions = {}
+_session_pid = None
+_profile = REQUEST
+
+
+def use_background_budget():
+    """Switch this process to the long retry budget (called once when a Celery worker starts)."""
+    global _profile
+    with _lock:
+        _profile = BACKGROUND
+        _sessions.clear()
+
+
+def current_profile() -> str:
+    return _profile
+
+
+def _config(profile=None):
+    overrides = getattr(settings, "OUTBOUND_HTTP", {})
+    config = {**DEFAULTS, **overrides}
+    request_overrides = {**DEFAULTS["REQUEST"], **overrides.get("REQUEST", {})}
+    config.pop("REQUEST")
+    if (profile or _profile) == REQUEST:
+        config.update(request_overrides)
+    return config
+
+
+def _build_session(profile) -> requests.Session:
+    config = _config(profile)
+    retry = Retry(
+        total=config["RETRIES"],
+        backoff_factor=config["BACKOFF_FACTOR"],
+        status_forcelist=config["STATUS_FORCELIST"],
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=config["RESPECT_RETRY_AFTER"],
+        # Hand the final 429/5xx back as a response so callers' raise_for_status() still works.
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config["POOL_CONNECTIONS"],
+        pool_maxsize=config["POOL_MAXSIZE"],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session, rebuilt after fork so Gunicorn/Celery workers never share sockets."""
+    global _session_pid
+    pid, profile = os.getpid(), _profile
+    session = _sessions.get(profile)
+    if session is None or _session_pid != pid:
+        with _lock:
+            if _session_pid != pid:
+                _sessions.clear()
+                _session_pid = pid
+            session = _sessions.get(profile)
+            if session is None:
+                session = _sessions[profile] = _build_session(profile)
+    return session
+
+
+def max_request_seconds(timeout=None, profile=None) -> float:
+    """
+    Longest a single get() can take with the configured timeouts and retries:
+    every attempt running to its connect + read timeout, plus the backoff sleeps.
+    Retry-After sleeps are only honoured on the background budget and aren't bounded here.
+    """
+    config = _config(profile)
+    timeout = timeout or config["TIMEOUT"]
+    per_attempt = sum(timeout) if isinstance(timeout, (tuple, list)) else timeout
+    retries = config["RETRIES"]
+    backoff = sum(min(config["BACKOFF_FACTOR"] * 2 ** i, Retry.DEFAULT_BACKOFF_MAX) for i in range(retries))
+    return per_attempt * (retries + 1) + backoff
+
+
+def get(url, params=None, timeout=None, **kwargs) -> requests.Response:
+    """GET through the shared session with the current budget's default timeout."""
+    return get_session().get(url, params=params, timeout=timeout or _config()["TIMEOUT"], **kwargs)
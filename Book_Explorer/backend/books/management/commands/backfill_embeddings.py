@@ -0,0 +1,100 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from backend.books.models import Book
+from backend.books.recommender import EMBEDDING_BATCH_SIZE, embedding_dedupe_stats, generate_book_embeddings
+
+CURSOR_KEY = "backfill_embeddings_cursor"
+FAILED_KEY = "backfill_embeddings_failed"  # ids passed by the cursor without getting an embedding
+
+
+def _embed_batch(books):
+    try:
+        return generate_book_embeddings(books, batch_size=len(books))
+    finally:
+        # Worker threads open their own DB connections; release them.
+        connections.close_all()
+
+
+def _still_missing(google_ids):
+    return set(Book.objects.filter(google_id__in=google_ids, embedding__isnull=True).values_list("google_id", flat=True))
+
+
+class Command(BaseCommand):
+    help = "Generate embeddings for every book that is missing one, in batches, resumably."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help="Texts per provider request.")
+        parser.add_argument("--concurrency", type=int, default=4, help="Provider requests in flight at once.")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many books.")
+        parser.add_argument("--reset", action="store_true", help="Ignore saved progress and start from the beginning.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        concurrency = max(1, options["concurrency"])
+        limit = options["limit"]
+
+        if options["reset"]:
+            cache.delete_many([CURSOR_KEY, FAILED_KEY])
+        cursor = cache.get(CURSOR_KEY, "")
+        failed = set(cache.get(FAILED_KEY, []))
+        if cursor:
+            self.stdout.write(f"↪️ Resuming after google_id={cursor!r} ({len(failed)} failed books queued for retry)")
+
+        fields = ("google_id", "title", "authors", "short_description", "full_description", "embedding")
+        seen = saved = 0
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while limit is None or seen < limit:
+                page_size = batch_size * concurrency
+                if limit is not None:
+                    page_size = min(page_size, limit - seen)
+                page = list(
+                    Book.objects.filter(embedding__isnull=True, google_id__gt=cursor)
+                    .order_by("google_id")
+                    .only(*fields)[:page_size]
+                )
+                if not page:
+                    break
+
+                batches = [page[i:i + batch_size] for i in range(0, len(page), batch_size)]
+                saved += sum(pool.map(_embed_batch, batches))
+                seen += len(page)
+
+                # Keyset progress: a rerun continues after the last book attempted;
+                # books the provider didn't embed are remembered for the retry pass.
+                failed |= _still_missing([b.google_id for b in page])
+                cursor = page[-1].google_id
+                cache.set_many({CURSOR_KEY: cursor, FAILED_KEY: sorted(failed)}, timeout=None)
+
+                rate = seen / max(time.perf_counter() - started, 1e-9)
+                self.stdout.write(f"… {saved}/{seen} embedded ({rate:.1f} books/s), cursor={cursor!r}")
+
+            if failed and (limit is None or seen < limit):
+                retry_ids = sorted(failed)
+                self.stdout.write(f"🔁 Retrying {len(retry_ids)} books that were not embedded...")
+                retry = list(Book.objects.filter(google_id__in=retry_ids, embedding__isnull=True).only(*fields))
+                batches = [retry[i:i + batch_size] for i in range(0, len(retry), batch_size)]
+                saved += sum(pool.map(_embed_batch, batches))
+                seen += len(retry)
+                failed = _still_missing(retry_ids)
+
+        if limit is None or seen < limit:
+            cache.delete(CURSOR_KEY)
+            if failed:
+                cache.set(FAILED_KEY, sorted(failed), timeout=None)
+                self.stdout.write(self.style.WARNING(f"⚠️ {len(failed)} books still have no embedding; a rerun retries them."))
+            else:
+                cache.delete(FAILED_KEY)
+        self.stdout.write(self.style.SUCCESS(f"✅ Backfill finished: {saved}/{seen} books embedded."))
+
+        stats = embedding_dedupe_stats()
+        self.stdout.write(
+            f"📊 Text-hash cache: {stats['hits']} hits / {stats['misses']} misses "
+            f"(hit ratio {stats['hit_ratio']:.1%}, ~{stats['estimated_saved_ms'] / 1000:.1f}s of API time saved)"
+        )
@@ -0,0 +1,51 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.books.models import BOOK_DETAIL_DEFERRED, BOOK_PROJECTIONS, Book
+
+
+def _value_bytes(value):
+    """Approximate on-the-wire size of one column value."""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (list, dict)):
+        return len(json.dumps(value))
+    return 8
+
+
+class Command(BaseCommand):
+    help = "Compare bytes fetched per Book row for the full row vs the card / vector / detail projections."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500, help="Books sampled (ordered by google_id).")
+
+    def handle(self, *args, **options):
+        all_fields = [f.attname for f in Book._meta.concrete_fields]
+        variants = {
+            "full row": all_fields,
+            "detail": [f for f in all_fields if f not in BOOK_DETAIL_DEFERRED],
+            **{name: list(fields) for name, fields in BOOK_PROJECTIONS.items()},
+        }
+        ids = list(Book.objects.order_by("google_id").values_list("google_id", flat=True)[:options["limit"]])
+        if not ids:
+            self.stdout.write(self.style.WARNING("No books to benchmark."))
+            return
+
+        baseline = None
+        self.stdout.write(f"📏 {len(ids)} books")
+        for name, fields in variants.items():
+            started = time.perf_counter()
+            rows = Book.objects.filter(google_id__in=ids).values_list(*fields)
+            total = sum(_value_bytes(v) for row in rows for v in row)
+            elapsed = (time.perf_counter() - started) * 1000
+            baseline = baseline or total
+            self.stdout.write(
+                f"  {name:<9} {len(fields):>2} cols  {total / 1024:>10.1f} KiB  "
+                f"{total / len(ids):>9.0f} B/row  {100 * total / baseline:>5.1f}%  {elapsed:>7.1f} ms"
+            )
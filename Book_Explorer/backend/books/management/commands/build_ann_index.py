@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.books import ann
+
+
+class Command(BaseCommand):
+    help = "Build (or rebuild) the IVF nearest-neighbour index over Book embeddings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lists", type=int, default=None, help="Number of IVF lists (default: 4·√N).")
+        parser.add_argument("--sample", type=int, default=20000, help="Books sampled to train centroids.")
+        parser.add_argument("--iterations", type=int, default=8, help="k-means iterations.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = ann.build_index(
+            n_lists=options["lists"],
+            sample_size=options["sample"],
+            iterations=options["iterations"],
+            seed=options["seed"],
+        )
+        elapsed = time.perf_counter() - started
+        if not stats["books"]:
+            self.stdout.write(self.style.WARNING("No embedded books found; index is empty."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Indexed {stats['books']} books into {stats['lists']} lists (dim={stats['dim']}) in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from backend.books.caching import bump_local_epoch, bump_tags
+
+
+class Command(BaseCommand):
+    help = "Invalidate every cached entry under the given tags, e.g. explore, book:<google_id>, user:<id>."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tags", nargs="+")
+        parser.add_argument(
+            "--flush-local", action="store_true",
+            help="Also drop every process's in-memory cache tier now instead of within a few seconds.",
+        )
+
+    def handle(self, *args, **options):
+        bump_tags(*options["tags"])
+        if options["flush_local"]:
+            bump_local_epoch()
+        self.stdout.write(self.style.SUCCESS(f"✅ Bumped {len(options['tags'])} tag(s): {', '.join(options['tags'])}"))
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from backend.books.recommender import rebuild_taste_vector
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute stored per-user taste vectors from their shelved books."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", help="Only rebuild these user ids.")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(interactions__isnull=False).distinct()
+        if options["user"]:
+            users = users.filter(id__in=options["user"])
+
+        rebuilt = 0
+        for user in users.iterator():
+            rebuild_taste_vector(user)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {rebuilt} taste vectors."))
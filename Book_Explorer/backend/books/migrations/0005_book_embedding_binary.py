@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:12
+
+import numpy as np
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def json_to_float32(apps, schema_editor):
+    """Copy JSON float lists into the new float32 bytes column."""
+    Book = apps.get_model("books", "Book")
+    batch = []
+    rows = Book.objects.filter(embedding__isnull=False).only("google_id", "embedding")
+    for book in rows.iterator(chunk_size=BATCH_SIZE):
+        if not isinstance(book.embedding, list) or not book.embedding:
+            continue
+        book.embedding_f32 = np.asarray(book.embedding, dtype="<f4").tobytes()
+        batch.append(book)
+        if len(batch) >= BATCH_SIZE:
+            Book.objects.bulk_update(batch, ["embedding_f32"])
+            batch = []
+    if batch:
+        Book.objects.bulk_update(batch, ["embedding_f32"])
+
+
+def float32_to_json(apps, schema_editor):
+    """Reverse: decode float32 bytes back into JSON float lists."""
+    Book = apps.get_model("books", "Book")
+    batch = []
+    rows = Book.objects.filter(embedding_f32__isnull=False).only("google_id", "embedding_f32")
+    for book in rows.iterator(chunk_size=BATCH_SIZE):
+        book.embedding = np.frombuffer(book.embedding_f32, dtype="<f4").tolist()
+        batch.append(book)
+        if len(batch) >= BATCH_SIZE:
+            Book.objects.bulk_update(batch, ["embedding"])
+            batch = []
+    if batch:
+        Book.objects.bulk_update(batch, ["embedding"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_alter_userbookinteraction_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='embedding_f32',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_float32, float32_to_json),
+        migrations.RemoveField(
+            model_name='book',
+            name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='book',
+            old_name='embedding_f32',
+            new_name='embedding',
+        ),
+    ]
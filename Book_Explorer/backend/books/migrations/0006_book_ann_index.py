@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_book_embedding_binary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingCentroid',
+            fields=[
+                ('list_id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('vector', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='ann_list',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_facets(apps, schema_editor):
+    """Index the authors and categories of every existing book."""
+    Book = apps.get_model("books", "Book")
+    BookFacet = apps.get_model("books", "BookFacet")
+    batch = []
+    for google_id, authors, categories in Book.objects.values_list("google_id", "authors", "categories").iterator():
+        facets = {("A", a[:255]) for a in (authors or []) if a}
+        facets |= {("C", c[:255]) for c in (categories or []) if c}
+        batch.extend(BookFacet(book_id=google_id, kind=k, value=v) for k, v in facets)
+        if len(batch) >= 1000:
+            BookFacet.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        BookFacet.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_usertastevector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('A', 'Author'), ('C', 'Category')], max_length=1)),
+                ('value', models.CharField(max_length=255)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='books.book')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'value'], name='books_bookf_kind_ef66bf_idx')],
+                'unique_together': {('book', 'kind', 'value')},
+            },
+        ),
+        migrations.RunPython(build_facets, migrations.RunPython.noop),
+    ]
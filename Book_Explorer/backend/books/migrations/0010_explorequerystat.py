@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_bookfacet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExploreQueryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('Q', 'Search'), ('G', 'Genre')], max_length=1)),
+                ('value', models.CharField(max_length=255)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('last_requested', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', '-hits'], name='books_explo_kind_c32d30_idx')],
+                'unique_together': {('kind', 'value')},
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:29
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    """Populate the new aggregate columns from existing reviews."""
+    Book = apps.get_model("books", "Book")
+    Review = apps.get_model("books", "Review")
+    aggregates = {
+        "review_count": Count("id"),
+        "rating_sum": Sum("rating"),
+        **{f"rating_{star}": Count("id", filter=Q(rating=star)) for star in range(1, 6)},
+    }
+    rows = Review.objects.order_by().values("book_id").annotate(**aggregates)
+    batch = [Book(google_id=row.pop("book_id"), **row) for row in rows]
+    Book.objects.bulk_update(batch, list(aggregates), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_review_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0012_book_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userbookinteraction',
+            index=models.Index(fields=['user', 'status', 'id'], name='interaction_shelf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbookinteraction',
+            index=models.Index(fields=['user', 'is_favorite', 'id'], name='interaction_favorite_idx'),
+        ),
+    ]
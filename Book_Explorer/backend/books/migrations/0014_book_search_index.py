@@ -0,0 +1,80 @@
+from django.db import migrations
+
+# Full-text search over title / authors / categories / short_description.
+# Postgres: a stored generated tsvector column with a GIN index.
+# SQLite (tests / local dev): an FTS5 table kept in sync by triggers.
+# The column and table are not model fields; books/search.py queries them directly.
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE books_book ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(jsonb_to_tsvector('english', coalesce(authors, '[]'::jsonb), '["string"]'), 'B')
+        || setweight(jsonb_to_tsvector('english', coalesce(categories, '[]'::jsonb), '["string"]'), 'C')
+        || setweight(to_tsvector('english', coalesce(short_description, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX books_book_search_gin ON books_book USING GIN (search_vector)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS books_book_search_gin",
+    "ALTER TABLE books_book DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE books_book_fts USING fts5(
+        google_id UNINDEXED, title, authors, categories, short_description,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    INSERT INTO books_book_fts (google_id, title, authors, categories, short_description)
+    SELECT google_id, title, authors, categories, coalesce(short_description, '') FROM books_book
+    """,
+    """
+    CREATE TRIGGER books_book_fts_insert AFTER INSERT ON books_book BEGIN
+        INSERT INTO books_book_fts (google_id, title, authors, categories, short_description)
+        VALUES (new.google_id, new.title, new.authors, new.categories, coalesce(new.short_description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER books_book_fts_update AFTER UPDATE OF title, authors, categories, short_description ON books_book BEGIN
+        DELETE FROM books_book_fts WHERE google_id = old.google_id;
+        INSERT INTO books_book_fts (google_id, title, authors, categories, short_description)
+        VALUES (new.google_id, new.title, new.authors, new.categories, coalesce(new.short_description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER books_book_fts_delete AFTER DELETE ON books_book BEGIN
+        DELETE FROM books_book_fts WHERE google_id = old.google_id;
+    END
+    """,
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS books_book_fts_insert",
+    "DROP TRIGGER IF EXISTS books_book_fts_update",
+    "DROP TRIGGER IF EXISTS books_book_fts_delete",
+    "DROP TABLE IF EXISTS books_book_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0013_interaction_shelf_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": POSTGRES_REVERSE, "sqlite": SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Author / category membership on Postgres: GIN (jsonb_path_ops) indexes serve
+# `authors @> '["Name"]'` containment, which BookQuerySet.by_author()/in_category()
+# emit there. Other backends keep using the BookFacet (kind, value) index.
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS books_book_authors_gin ON books_book USING GIN (authors jsonb_path_ops)",
+    "CREATE INDEX IF NOT EXISTS books_book_categories_gin ON books_book USING GIN (categories jsonb_path_ops)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS books_book_authors_gin",
+    "DROP INDEX IF EXISTS books_book_categories_gin",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0014_book_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD}),
+            _run({"postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
@@ -1,6 +1,56 @@
 from django.conf import settings
-from django.db import models
+from django.db import connections, models
 from django.core.validators import MinValueValidator, MaxValueValidator
+import numpy as np
+
+# Embeddings are stored as raw little-endian float32 bytes (4 bytes per dimension).
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+
+# ============================================================
+# 🔹 Book Column Projections
+# ============================================================
+# "card": what list views render (BookSerializer + rating)
+# "vector": what scoring needs (embedding + author/category/rating signals)
+# "detail": every column except the embedding / ANN bookkeeping
+BOOK_PROJECTIONS = {
+    "card": (
+        "google_id", "title", "authors", "published_date",
+        "thumbnail_url", "short_description", "average_rating",
+    ),
+    "vector": ("google_id", "authors", "categories", "average_rating", "embedding"),
+}
+BOOK_DETAIL_DEFERRED = ("embedding", "ann_list")
+
+
+def book_fields(projection, prefix=None):
+    """Column names of a projection, optionally for a related lookup (e.g. prefix="book")."""
+    fields = BOOK_PROJECTIONS[projection]
+    return tuple(f"{prefix}__{f}" for f in fields) if prefix else fields
+
+
+class BookQuerySet(models.QuerySet):
+    def card(self, *extra):
+        return self.only(*BOOK_PROJECTIONS["card"], *extra)
+
+    def vector(self, *extra):
+        return self.only(*BOOK_PROJECTIONS["vector"], *extra)
+
+    def detail(self):
+        return self.defer(*BOOK_DETAIL_DEFERRED)
+
+    # Membership lookups: JSON containment (GIN jsonb_path_ops, migration 0015)
+    # on Postgres, the BookFacet (kind, value) index everywhere else.
+    def by_author(self, name):
+        return self._having_facet("authors", BookFacet.Kind.AUTHOR, name)
+
+    def in_category(self, name):
+        return self._having_facet("categories", BookFacet.Kind.CATEGORY, name)
+
+    def _having_facet(self, field, kind, value):
+        if connections[self.db].vendor == "postgresql":
+            return self.filter(**{f"{field}__contains": [value]})
+        return self.filter(facets__kind=kind, facets__value=value[:255])
 
 
 # ============================================================
@@ -18,16 +68,113 @@ class Book(models.Model):
     ai_summary = models.TextField(null=True, blank=True)
     average_rating = models.FloatField(null=True, blank=True)
 
-    # 🔹 Persistent vector embedding for recommendations
-    embedding = models.JSONField(null=True, blank=True)
+    # 🔹 Persistent vector embedding for recommendations (float32 bytes)
+    embedding = models.BinaryField(null=True, blank=True)
+    # 🔹 Nearest IVF list in the ANN index (see books/ann.py)
+    ann_list = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+
+    # 🔹 Review aggregates, kept in step by the Review signals (see recompute_rating_aggregates)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    objects = BookQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    @property
+    def review_average(self):
+        """Mean user rating from the stored aggregates, or None without reviews."""
+        return self.rating_sum / self.review_count if self.review_count else None
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f"rating_{star}") for star in range(1, 6)}
+
     def has_embedding(self):
         """Check if this book has an embedding stored."""
         return bool(self.embedding)
 
+    @staticmethod
+    def embedding_to_bytes(vector) -> bytes:
+        """Encode a vector (list or array) into the stored float32 format."""
+        return np.asarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+    @staticmethod
+    def embedding_from_bytes(raw):
+        """Zero-copy, read-only float32 view over stored embedding bytes."""
+        if not raw:
+            return None
+        return np.frombuffer(raw, dtype=EMBEDDING_DTYPE)
+
+    def get_embedding(self):
+        """Return the embedding as a NumPy view without copying, or None."""
+        return self.embedding_from_bytes(self.embedding)
+
+    def set_embedding(self, vector):
+        """Store a vector as float32 bytes (call save() to persist)."""
+        self.embedding = self.embedding_to_bytes(vector)
+
+
+# ============================================================
+# 🔹 Book Facet Model (author / category inverted index)
+# ============================================================
+class BookFacet(models.Model):
+    """One author or category of a Book; indexed by (kind, value) to find books sharing it."""
+    class Kind(models.TextChoices):
+        AUTHOR = "A", "Author"
+        CATEGORY = "C", "Category"
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="facets")
+    kind = models.CharField(max_length=1, choices=Kind.choices)
+    value = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ("book", "kind", "value")
+        indexes = [models.Index(fields=["kind", "value"])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.value}"
+
+    @classmethod
+    def sync_for_book(cls, book):
+        """Replace a book's facets with its current authors and categories."""
+        cls.objects.filter(book=book).delete()
+        facets = {(cls.Kind.AUTHOR, a[:255]) for a in (book.authors or []) if a}
+        facets |= {(cls.Kind.CATEGORY, c[:255]) for c in (book.categories or []) if c}
+        cls.objects.bulk_create([cls(book=book, kind=k, value=v) for k, v in facets])
+
+
+# ============================================================
+# 🔹 Text Embedding Cache Model
+# ============================================================
+class TextEmbedding(models.Model):
+    """Embedding keyed by the SHA-256 of its exact input text, shared by books with identical text."""
+    text_hash = models.CharField(max_length=64, primary_key=True)
+    vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.text_hash
+
+
+# ============================================================
+# 🔹 ANN Index Centroid Model
+# ============================================================
+class EmbeddingCentroid(models.Model):
+    """One inverted list of the approximate nearest-neighbour index over Book embeddings."""
+    list_id = models.PositiveIntegerField(primary_key=True)
+    vector = models.BinaryField()
+    size = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"IVF list {self.list_id} ({self.size} books)"
+
 
 # ============================================================
 # 🔹 User ↔ Book Interaction Model
@@ -49,10 +196,54 @@ class UserBookInteraction(models.Model):
 
     class Meta:
         unique_together = ("user", "book")
+        # Per-shelf library pages: WHERE user = ? AND status = ? AND id < cursor ORDER BY id DESC.
+        indexes = [
+            models.Index(fields=["user", "status", "id"], name="interaction_shelf_idx"),
+            models.Index(fields=["user", "is_favorite", "id"], name="interaction_favorite_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.name or self.user.email} - {self.book.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted status so signals can tell what a save changed.
+        instance._saved_status = instance.__dict__.get("status")
+        return instance
+
+
+# ============================================================
+# 🔹 User Taste Vector Model
+# ============================================================
+class UserTasteVector(models.Model):
+    """
+    Running sum (float64) of the embeddings of a user's shelved books.
+    Kept up to date incrementally by signals; the taste vector is vector_sum / count.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="taste_vector",
+    )
+    vector_sum = models.BinaryField(null=True, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Taste vector for user {self.user_id} ({self.count} books)"
+
+    def get_sum(self):
+        return np.frombuffer(self.vector_sum, dtype=np.float64) if self.vector_sum else None
+
+    def mean(self):
+        """The user's average book embedding, or None if nothing is counted yet."""
+        total = self.get_sum()
+        if total is None or not self.count:
+            return None
+        return total / self.count
+
 
 # ============================================================
 # 🔹 Review Model
@@ -72,12 +263,44 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ("user", "book")
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "id"]
+        # Keyset pagination of a book's reviews walks this index in order.
+        indexes = [models.Index(fields=["book", "-created_at", "id"], name="review_book_recent_idx")]
 
     def __str__(self):
         return f"Review for {self.book.title} by {self.user.name or self.user.email}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted rating so signals can adjust the Book aggregates.
+        instance._saved_rating = instance.__dict__.get("rating")
+        return instance
+
     @property
     def short_comment(self):
         """Return first 80 chars for previews."""
         return (self.comment[:80] + "...") if self.comment and len(self.comment) > 80 else self.comment
+
+
+# ============================================================
+# 🔹 Explore Query Stats (drives cache warming)
+# ============================================================
+class ExploreQueryStat(models.Model):
+    """How often an Explore search or genre page is requested; the top entries get pre-warmed."""
+
+    class Kind(models.TextChoices):
+        SEARCH = "Q", "Search"
+        GENRE = "G", "Genre"
+
+    kind = models.CharField(max_length=1, choices=Kind.choices)
+    value = models.CharField(max_length=255)
+    hits = models.PositiveIntegerField(default=0)
+    last_requested = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("kind", "value")
+        indexes = [models.Index(fields=["kind", "-hits"])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.value} ({self.hits})"
@@ -3,25 +3,45 @@ from typing import List, Optional, Tuple
 from openai import OpenAI
 from django.conf import settings
 from django.core.cache import cache
-from .models import Book, UserBookInteraction
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Max, Q, Value, When
+from .models import (
+    Book,
+    BookFacet,
+    EMBEDDING_DTYPE,
+    TextEmbedding,
+    UserBookInteraction,
+    UserTasteVector,
+    book_fields,
+)
+from . import ann
 import google.generativeai as genai
+import hashlib
 import math
+import time
+import numpy as np
 
 # Cache timeouts
 RECS_CACHE_TTL = 60 * 60 * 6       # 6 hours
 EMBEDDING_CACHE_TTL = 60 * 60 * 24 * 7  # 7 days
+EMBEDDING_BATCH_SIZE = 64               # texts per provider request
 
+# Shelf statuses that count towards a user's taste
+TASTE_STATUSES = (
+    UserBookInteraction.Status.READ,
+    UserBookInteraction.Status.READING,
+    UserBookInteraction.Status.WILL_READ,
+)
 
-# --- Embedding generation (OpenAI + Gemini fallback) ---
-def generate_book_embedding(book: Book) -> Optional[List[float]]:
-    """
-    Generate and persist embedding for a Book using OpenAI.
-    Fallback to Gemini if OpenAI quota is exceeded or key is invalid.
-    """
-    if book.embedding and isinstance(book.embedding, list):
-        return book.embedding
+# Content-hash dedupe counters
+DEDUPE_HITS_KEY = "embedding_dedupe_hits"
+DEDUPE_MISSES_KEY = "embedding_dedupe_misses"
+DEDUPE_API_MS_KEY = "embedding_dedupe_api_ms"
 
-    text = " ".join(
+
+# --- Embedding generation (OpenAI + Gemini fallback) ---
+def _embedding_text(book: Book) -> str:
+    return " ".join(
         filter(
             None,
             [
@@ -32,47 +52,141 @@ def generate_book_embedding(book: Book) -> Optional[List[float]]:
         )
     )
 
+
+def _embed_texts(texts: List[str]) -> Optional[List[List[float]]]:
+    """
+    Embed many texts with a single provider request.
+    Tries OpenAI first and falls back to Gemini if quota is exceeded or the key is invalid.
+    """
     # --- Attempt OpenAI embedding ---
     try:
         if not getattr(settings, "OPENAI_API_KEY", None):
             raise ValueError("OPENAI_API_KEY missing")
 
         client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        resp = client.embeddings.create(model="text-embedding-3-small", input=text)
-        embedding = resp.data[0].embedding
-
-        book.embedding = embedding
-        book.save(update_fields=["embedding"])
-        cache.set(f"book_embedding_{book.google_id}", embedding, 60 * 60 * 24 * 7)
-        print(f"✅ Saved OpenAI embedding for {book.google_id}")
-        return embedding
+        resp = client.embeddings.create(model="text-embedding-3-small", input=texts)
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
 
     except Exception as e:
-        print(f"⚠️ OpenAI embeddinng failed for {book.google_id}: {e}")
-
-        # --- Gemini fallback ---
-        try:
-            if not getattr(settings, "GEMINI_API_KEY", None):
-                print("⚠️ GEMINI_API_KEY missing. Cannot generate fallback embedding.")
-                return None
-
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            response = genai.embed_content(
-                model="models/embedding-001",
-                content=text,
-            )
-            embedding = response["embedding"]
-
-            book.embedding = embedding
-            book.save(update_fields=["embedding"])
-            cache.set(f"book_embedding_{book.google_id}", embedding, 60 * 60 * 24 * 7)
-            print(f"✅ Fallback Gemini embedding saved for {book.google_id}")
-            return embedding
-
-        except Exception as gem_err:
-            print(f"🔥 Gemini fallback failed for {book.google_id}: {gem_err}")
+        print(f"⚠️ OpenAI embedding failed for batch of {len(texts)}: {e}")
+
+    # --- Gemini fallback ---
+    try:
+        if not getattr(settings, "GEMINI_API_KEY", None):
+            print("⚠️ GEMINI_API_KEY missing. Cannot generate fallback embedding.")
             return None
 
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        response = genai.embed_content(
+            model="models/embedding-001",
+            content=texts,
+        )
+        print(f"✅ Fallback Gemini embeddings generated for batch of {len(texts)}")
+        return response["embedding"]
+
+    except Exception as gem_err:
+        print(f"🔥 Gemini fallback failed for batch of {len(texts)}: {gem_err}")
+        return None
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _incr(key: str, delta: int):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, timeout=None)
+
+
+def embedding_dedupe_stats() -> dict:
+    """Hit ratio of the content-hash embedding cache and the provider time it saved."""
+    hits = cache.get(DEDUPE_HITS_KEY, 0)
+    misses = cache.get(DEDUPE_MISSES_KEY, 0)
+    api_ms = cache.get(DEDUPE_API_MS_KEY, 0)
+    avg_ms = api_ms / misses if misses else 0.0
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "avg_api_ms_per_text": round(avg_ms, 2),
+        "estimated_saved_ms": round(hits * avg_ms),
+    }
+
+
+def generate_book_embeddings(books: List[Book], batch_size: int = EMBEDDING_BATCH_SIZE) -> int:
+    """
+    Generate and persist embeddings for many books.
+    Vectors are keyed by a hash of the exact input text in TextEmbedding, so
+    editions sharing title/author/description reuse one vector without an API
+    round-trip. Remaining texts are sent up to batch_size per provider request
+    and books are written back with bulk_update. Returns the number of books embedded.
+    """
+    pending = [b for b in books if not b.has_embedding()]
+    if not pending:
+        return 0
+
+    texts = {b.google_id: _embedding_text(b) for b in pending}
+    hashes = {gid: _text_hash(text) for gid, text in texts.items()}
+    vectors = dict(
+        TextEmbedding.objects.filter(text_hash__in=set(hashes.values())).values_list("text_hash", "vector")
+    )
+
+    # The first book with an unseen text pays for the call; duplicates are hits.
+    to_embed = {}
+    for gid, h in hashes.items():
+        if h not in vectors and h not in to_embed:
+            to_embed[h] = texts[gid]
+    hits = len(pending) - len(to_embed)
+
+    items = list(to_embed.items())
+    api_ms = 0.0
+    for start in range(0, len(items), batch_size):
+        chunk = items[start:start + batch_size]
+        started = time.perf_counter()
+        result = _embed_texts([text for _, text in chunk])
+        api_ms += (time.perf_counter() - started) * 1000
+        if not result or len(result) != len(chunk):
+            continue
+        rows = [
+            TextEmbedding(text_hash=h, vector=Book.embedding_to_bytes(v))
+            for (h, _), v in zip(chunk, result)
+        ]
+        TextEmbedding.objects.bulk_create(rows, ignore_conflicts=True)
+        vectors.update((row.text_hash, row.vector) for row in rows)
+
+    _incr(DEDUPE_HITS_KEY, hits)
+    _incr(DEDUPE_MISSES_KEY, len(to_embed))
+    _incr(DEDUPE_API_MS_KEY, int(api_ms))
+
+    ready = [b for b in pending if hashes[b.google_id] in vectors]
+    for start in range(0, len(ready), batch_size):
+        batch = ready[start:start + batch_size]
+        for book in batch:
+            book.embedding = bytes(vectors[hashes[book.google_id]])
+        ann.place_books(batch)
+        Book.objects.bulk_update(batch, ["embedding", "ann_list"])
+        add_books_to_tastes(batch)
+        cache.set_many(
+            {f"book_embedding_{b.google_id}": b.embedding for b in batch},
+            EMBEDDING_CACHE_TTL,
+        )
+    if ready:
+        print(f"✅ Saved {len(ready)} embeddings ({hits} reused from text-hash cache)")
+    return len(ready)
+
+
+def generate_book_embedding(book: Book) -> Optional[np.ndarray]:
+    """
+    Generate and persist embedding for a single Book.
+    Returns a float32 view over the stored bytes, or None if every provider failed.
+    """
+    if not book.has_embedding():
+        generate_book_embeddings([book])
+    return book.get_embedding()
+
 
 # --- Vector helpers ---
 def _dot(a: List[float], b: List[float]) -> float:
@@ -90,17 +204,94 @@ def cosine_similarity(a: List[float], b: List[float]) -> float:
     return _dot(a, b) / denom
 
 
+# --- Vectorized scoring engine ---
+def _normalized_matrix(vectors) -> np.ndarray:
+    """Stack vectors into a new float32 matrix whose rows have unit length (zero rows stay zero)."""
+    matrix = np.array(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _rating_bonus(books: List[Book]) -> np.ndarray:
+    ratings = np.array([b.average_rating or 0.0 for b in books], dtype=np.float64)
+    return np.minimum(ratings / 10.0, 0.2)
+
+
+def score_candidates(
+    user_vector: Optional[np.ndarray],
+    candidates: List[Book],
+    candidate_embeddings: List[Optional[np.ndarray]],
+    interacted_books: List[Book],
+) -> np.ndarray:
+    """
+    Score every candidate at once.
+    Candidates whose embedding matches the user vector are ranked with a single
+    matrix-vector product over a pre-normalized float32 matrix; the rest fall back
+    to the scalar cosine / author-genre heuristic exactly as before.
+    """
+    scores = np.zeros(len(candidates), dtype=np.float64)
+    if not candidates:
+        return scores
+
+    dense_rows: List[int] = []
+    if user_vector is not None:
+        dim = user_vector.shape[0]
+        dense_rows = [
+            i for i, emb in enumerate(candidate_embeddings) if emb is not None and len(emb) == dim
+        ]
+
+    if dense_rows:
+        matrix = _normalized_matrix([candidate_embeddings[i] for i in dense_rows])
+        query = _normalized_matrix([user_vector])[0]
+        scores[dense_rows] = (matrix @ query).astype(np.float64)
+
+    dense = set(dense_rows)
+    interacted_authors, interacted_categories = _interest_sets(interacted_books)
+    for i, cand in enumerate(candidates):
+        if i in dense:
+            continue
+        cand_emb = candidate_embeddings[i]
+        if user_vector is not None and cand_emb is not None and len(cand_emb):
+            scores[i] = cosine_similarity(user_vector.tolist(), list(cand_emb))
+        else:
+            scores[i] = _score_by_author_genre(cand, interacted_authors, interacted_categories)
+
+    return scores + _rating_bonus(candidates)
+
+
+def top_k_ids(ids: List[str], scores: np.ndarray, k: int) -> List[str]:
+    """
+    Return the ids of the k highest scores, highest first.
+    Uses argpartition to find the k-th score, then orders only the survivors;
+    ties keep candidate order, matching a stable sorted(..., reverse=True).
+    """
+    n = len(ids)
+    if n == 0 or k <= 0:
+        return []
+    if k < n:
+        kth = scores[np.argpartition(scores, n - k)[n - k]]
+        rows = np.flatnonzero(scores >= kth)
+    else:
+        rows = np.arange(n)
+    order = rows[np.lexsort((rows, -scores[rows]))][:k]
+    return [ids[i] for i in order]
+
+
 # --- Recommendation logic ---
 def _candidate_books(exclude_ids: set, limit: int = 500) -> List[Book]:
-    qs = Book.objects.exclude(google_id__in=exclude_ids).order_by("title")[:limit]
+    qs = Book.objects.vector().exclude(google_id__in=exclude_ids).order_by("title")[:limit]
     return list(qs)
 
 
-def _score_by_author_genre(user, candidate: Book, interacted_books: List[Book]) -> float:
-    score = 0.0
+def _interest_sets(interacted_books: List[Book]) -> Tuple[set, set]:
     interacted_authors = set(a for b in interacted_books for a in (b.authors or []))
     interacted_categories = set(c for b in interacted_books for c in (b.categories or []))
+    return interacted_authors, interacted_categories
+
 
+def _score_by_author_genre(candidate: Book, interacted_authors: set, interacted_categories: set) -> float:
+    score = 0.0
     if any(author in interacted_authors for author in (candidate.authors or [])):
         score += 1.0
     if any(cat in interacted_categories for cat in (candidate.categories or [])):
@@ -109,66 +300,260 @@ def _score_by_author_genre(user, candidate: Book, interacted_books: List[Book])
     return score
 
 
-def _compute_recommendations_for_user(user, top_n: int = 10) -> List[str]:
-    interactions = UserBookInteraction.objects.filter(
+def _heuristic_recommendations(interacted_books: List[Book], exclude_ids: set, top_n: int) -> List[str]:
+    """
+    Author/genre scoring over the BookFacet inverted index, done in SQL.
+    Only books sharing an author (+1.0) or category (+0.5) with the user's shelves
+    are touched; the usual rating bonus is added on top, and the database
+    returns just the top_n rows.
+    """
+    interacted_authors, interacted_categories = _interest_sets(interacted_books)
+    if not interacted_authors and not interacted_categories:
+        return []
+
+    author_hit = Case(When(kind=BookFacet.Kind.AUTHOR, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+    category_hit = Case(When(kind=BookFacet.Kind.CATEGORY, then=Value(0.5)), default=Value(0.0), output_field=FloatField())
+    # Same bonus as score_candidates: min(rating / 10, 0.2), nothing for unrated books.
+    rating_bonus = Case(
+        When(book__average_rating__gt=2.0, then=Value(0.2)),
+        When(book__average_rating__gt=0, then=F("book__average_rating") / 10.0),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    ranked = (
+        BookFacet.objects.filter(
+            Q(kind=BookFacet.Kind.AUTHOR, value__in=interacted_authors)
+            | Q(kind=BookFacet.Kind.CATEGORY, value__in=interacted_categories)
+        )
+        .exclude(book_id__in=exclude_ids)
+        .values("book_id")
+        .annotate(score=Max(author_hit) + Max(category_hit) + Max(rating_bonus))
+        .order_by("-score", "book_id")
+        .values_list("book_id", flat=True)[:top_n]
+    )
+    return list(ranked)
+
+
+def _cached_embeddings(books: List[Book]) -> List[Optional[np.ndarray]]:
+    """Look up embeddings for many books with one cache round trip, falling back to the DB field."""
+    cached = cache.get_many([f"book_embedding_{b.google_id}" for b in books])
+    return [
+        Book.embedding_from_bytes(cached.get(f"book_embedding_{b.google_id}") or b.embedding)
+        for b in books
+    ]
+
+
+# --- Per-user taste vector ---
+def _dominant_dim_sum(raw_vectors) -> Tuple[Optional[np.ndarray], int]:
+    vecs = [np.frombuffer(raw, dtype=EMBEDDING_DTYPE) for raw in raw_vectors if raw]
+    if not vecs:
+        return None, 0
+    dims, counts = np.unique([len(v) for v in vecs], return_counts=True)
+    dim = dims[np.argmax(counts)]
+    same = [v for v in vecs if len(v) == dim]
+    return np.sum(same, axis=0, dtype=np.float64), len(same)
+
+
+def rebuild_taste_vector(user) -> UserTasteVector:
+    """Recompute a user's running-sum taste vector from scratch (O(k·d))."""
+    rows = Book.objects.filter(
+        interactions__user=user,
+        interactions__status__in=TASTE_STATUSES,
+        embedding__isnull=False,
+    ).values_list("embedding", flat=True)
+    total, count = _dominant_dim_sum(rows)
+    taste, _ = UserTasteVector.objects.update_or_create(
         user=user,
-        status__in=[
-            UserBookInteraction.Status.READ,
-            UserBookInteraction.Status.READING,
-            UserBookInteraction.Status.WANT_TO_READ,
-        ],
-    ).select_related("book")
+        defaults={"vector_sum": total.tobytes() if total is not None else None, "count": count},
+    )
+    return taste
+
+
+def apply_taste_delta(user_id, raw_vectors: List[bytes], sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) book embeddings from a user's running sum.
+    Users without a stored taste vector are skipped; it is built lazily on their next job.
+    """
+    with transaction.atomic():
+        taste = UserTasteVector.objects.select_for_update().filter(user_id=user_id).first()
+        if taste is None:
+            return
+        total = taste.get_sum()
+        total = total.copy() if total is not None else None
+        count = taste.count
+        for raw in raw_vectors:
+            if not raw:
+                continue
+            vec = np.frombuffer(raw, dtype=EMBEDDING_DTYPE)
+            if total is None:
+                if sign < 0:
+                    continue
+                total = np.zeros(len(vec), dtype=np.float64)
+            if len(vec) != len(total):
+                continue
+            total += sign * vec
+            count += sign
+        if count <= 0:
+            taste.vector_sum, taste.count = None, 0
+        else:
+            taste.vector_sum, taste.count = total.tobytes(), count
+        taste.save(update_fields=["vector_sum", "count", "updated_at"])
+
+
+def add_books_to_tastes(books: List[Book]) -> None:
+    """Fold freshly embedded books into the taste vectors of users who already shelved them."""
+    raw_by_id = {b.google_id: b.embedding for b in books if b.embedding}
+    per_user = {}
+    shelved = UserBookInteraction.objects.filter(
+        book_id__in=list(raw_by_id), status__in=TASTE_STATUSES
+    ).values_list("user_id", "book_id")
+    for user_id, book_id in shelved:
+        per_user.setdefault(user_id, []).append(raw_by_id[book_id])
+    for user_id, raws in per_user.items():
+        apply_taste_delta(user_id, raws, 1)
+
+
+def _queue_missing_embeddings(google_ids) -> None:
+    google_ids = list(google_ids)
+    if google_ids:
+        from .tasks import generate_embeddings_batch_task
+        generate_embeddings_batch_task.delay(google_ids)
+
+
+def _compute_recommendations_for_user(user, top_n: int = 10) -> List[str]:
+    interactions = (
+        UserBookInteraction.objects.filter(user=user, status__in=TASTE_STATUSES)
+        .select_related("book")
+        .only("book", *book_fields("card", "book"), "book__categories")
+    )
 
     if not interactions.exists():
-        qs = Book.objects.order_by("?")[:top_n]
-        return [b.google_id for b in qs]
+        return list(Book.objects.order_by("?").values_list("google_id", flat=True)[:top_n])
 
     interacted_books = [i.book for i in interactions]
     interacted_ids = {b.google_id for b in interacted_books}
-    candidates = _candidate_books(exclude_ids=interacted_ids, limit=1000)
-    if not candidates:
-        return []
 
-    emb_cache = {}
-    for b in interacted_books:
-        emb = cache.get(f"book_embedding_{b.google_id}") or (
-            b.embedding if isinstance(b.embedding, list) else None
+    # Start from the stored running sum (O(d)); only rebuild it the first time.
+    taste = UserTasteVector.objects.filter(user=user).first() or rebuild_taste_vector(user)
+    user_vector = taste.mean()
+    use_embedding = user_vector is not None
+
+    # Never block on providers: embed missing books in the background and
+    # score with whatever vectors already exist.
+    if taste.count < len(interacted_ids):
+        _queue_missing_embeddings(
+            Book.objects.filter(google_id__in=interacted_ids, embedding__isnull=True)
+            .values_list("google_id", flat=True)
         )
-        if not emb:
-            emb = generate_book_embedding(b)
-        if emb:
-            emb_cache[b.google_id] = emb
 
-    use_embedding = bool(emb_cache)
-    user_vector = None
+    if not use_embedding:
+        top_ids = _heuristic_recommendations(interacted_books, interacted_ids, top_n)
+        if top_ids:
+            return top_ids
+
+    # Catalog-wide retrieval through the ANN index; title-ordered scan until it is built.
+    candidates = ann.candidate_books(user_vector, exclude_ids=interacted_ids) if use_embedding else []
+    if not candidates:
+        candidates = _candidate_books(exclude_ids=interacted_ids, limit=1000)
+    if not candidates:
+        return []
+
+    candidate_embeddings = _cached_embeddings(candidates)
     if use_embedding:
-        vecs = list(emb_cache.values())
-        length = len(vecs)
-        if length:
-            user_vector = [sum(col) / length for col in zip(*vecs)]
-
-    scored: List[Tuple[str, float]] = []
-    for cand in candidates:
-        cand_emb = cache.get(f"book_embedding_{cand.google_id}") or (
-            cand.embedding if isinstance(cand.embedding, list) else None
-        )
-        if not cand_emb and use_embedding:
-            cand_emb = generate_book_embedding(cand)
+        _queue_missing_embeddings(c.google_id for c, emb in zip(candidates, candidate_embeddings) if emb is None)
 
-        score = 0.0
-        if user_vector and cand_emb:
-            score = cosine_similarity(user_vector, cand_emb)
-        else:
-            score = _score_by_author_genre(user, cand, interacted_books)
+    scores = score_candidates(user_vector, candidates, candidate_embeddings, interacted_books)
+    return top_k_ids([c.google_id for c in candidates], scores, top_n)
+
+
+# --- Batch scoring (one shared candidate matrix per worker process) ---
+# Books embedded after a load are not candidates until the next reload, so a
+# long-lived worker can lag the catalog by up to this TTL. Each nightly precompute
+# run passes its start time, which forces one reload per worker per run.
+CANDIDATE_MATRIX_TTL = 60 * 30   # reload the shared matrix every 30 minutes
+USER_SCORING_BATCH = 32           # users scored per matrix-matrix product
+
+_candidate_matrix = {"loaded_at": 0.0, "ids": None, "matrix": None, "bonus": None, "row_of": None}
 
-        if cand.average_rating:
-            score += min(cand.average_rating / 10.0, 0.2)
 
-        scored.append((cand.google_id, score))
+def _shared_candidate_matrix(loaded_after: float = 0.0):
+    """
+    All embedded books as one pre-normalized float32 matrix (dominant dimension only),
+    loaded once per worker process and reused across users and tasks.
+    Reloads when older than CANDIDATE_MATRIX_TTL or loaded before `loaded_after` (epoch seconds).
+    """
+    state = _candidate_matrix
+    now = time.time()
+    if (
+        state["matrix"] is not None
+        and now - state["loaded_at"] < CANDIDATE_MATRIX_TTL
+        and state["loaded_at"] >= loaded_after
+    ):
+        return state
+
+    ids, raws, ratings = [], [], []
+    rows = Book.objects.filter(embedding__isnull=False).values_list("google_id", "embedding", "average_rating")
+    for google_id, raw, rating in rows.iterator(chunk_size=2000):
+        ids.append(google_id)
+        raws.append(bytes(raw))
+        ratings.append(rating or 0.0)
+
+    dims, counts = np.unique([len(r) for r in raws], return_counts=True) if raws else ([], [])
+    if len(dims):
+        nbytes = dims[np.argmax(counts)]
+        keep = [i for i, r in enumerate(raws) if len(r) == nbytes]
+        ids = [ids[i] for i in keep]
+        matrix = np.frombuffer(b"".join(raws[i] for i in keep), dtype=EMBEDDING_DTYPE).reshape(len(keep), -1)
+        state["matrix"] = _normalized_matrix(matrix)
+        state["bonus"] = np.minimum(np.array([ratings[i] for i in keep], dtype=np.float64) / 10.0, 0.2)
+    else:
+        state["matrix"], state["bonus"] = np.zeros((0, 0), dtype=np.float32), np.zeros(0)
+    state["ids"] = ids
+    state["row_of"] = {gid: i for i, gid in enumerate(ids)}
+    state["loaded_at"] = now
+    return state
+
+
+def recommend_for_users(users, top_n: int = 10, loaded_after: float = 0.0) -> dict:
+    """
+    Compute recommendations for many users against the shared candidate matrix.
+    Users are scored USER_SCORING_BATCH at a time with one matrix-matrix product;
+    users without a usable taste vector take the single-user path.
+    Returns {user_id: [google_id, ...]}.
+    """
+    state = _shared_candidate_matrix(loaded_after)
+    matrix, bonus, ids, row_of = state["matrix"], state["bonus"], state["ids"], state["row_of"]
+    user_ids = [u.id for u in users]
+
+    shelved = {}
+    for user_id, book_id in UserBookInteraction.objects.filter(
+        user_id__in=user_ids, status__in=TASTE_STATUSES
+    ).values_list("user_id", "book_id"):
+        shelved.setdefault(user_id, set()).add(book_id)
+    tastes = {t.user_id: t for t in UserTasteVector.objects.filter(user_id__in=user_ids)}
+
+    results, dense = {}, []
+    for user in users:
+        taste = tastes.get(user.id)
+        if taste is None and user.id in shelved:
+            taste = rebuild_taste_vector(user)
+        vector = taste.mean() if taste else None
+        if vector is None or not len(ids) or len(vector) != matrix.shape[1]:
+            results[user.id] = _compute_recommendations_for_user(user, top_n=top_n)
+        else:
+            dense.append((user, vector))
 
-    scored_sorted = sorted(scored, key=lambda x: x[1], reverse=True)
-    top_ids = [gid for gid, s in scored_sorted[:top_n]]
-    return top_ids
+    for start in range(0, len(dense), USER_SCORING_BATCH):
+        batch = dense[start:start + USER_SCORING_BATCH]
+        queries = _normalized_matrix([v for _, v in batch])
+        all_scores = (matrix @ queries.T).astype(np.float64) + bonus[:, None]
+        for col, (user, _) in enumerate(batch):
+            scores = all_scores[:, col]
+            excluded = [row_of[g] for g in shelved.get(user.id, ()) if g in row_of]
+            scores[excluded] = -np.inf
+            own = shelved.get(user.id, set())
+            results[user.id] = [g for g in top_k_ids(ids, scores, top_n) if g not in own]
+    return results
 
 
 def get_user_recommendations(user, top_n=10):
@@ -180,7 +565,7 @@ def get_user_recommendations(user, top_n=10):
     cache_key = f"user_recommendations_{user.id}"
     cached = cache.get(cache_key)
     if cached:
-        books = list(Book.objects.filter(google_id__in=cached))
+        books = list(Book.objects.card().filter(google_id__in=cached))
         id_to_book = {b.google_id: b for b in books}
         ordered_books = [id_to_book[g] for g in cached if g in id_to_book]
         return {"status": "ready", "books": ordered_books}
@@ -0,0 +1,99 @@
+# books/search.py
+"""
+Local full-text search over persisted Books.
+
+Postgres ranks with ts_rank_cd over the generated, GIN-indexed
+books_book.search_vector column (title > authors > categories > description).
+SQLite uses the FTS5 table books_book_fts with BM25 using the same column
+weights. Both are created by migration 0014; other backends fall back to
+a title icontains scan.
+"""
+import re
+
+from django.db import connection
+
+from .models import Book
+
+LOCAL_SEARCH_MIN_RESULTS = 8   # fewer local hits than this → ask Google Books instead
+LOCAL_SEARCH_MAX_TERMS = 8
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Same semantics as the FTS5 query: every term required, the last one as a prefix.
+# plainto_tsquery() never parses operators; the prefix term is \w+ only, so to_tsquery() can't either.
+_POSTGRES_TSQUERY = "(plainto_tsquery('english', %s) && to_tsquery('english', %s))"
+_POSTGRES_SQL = f"""
+    SELECT google_id FROM books_book, {_POSTGRES_TSQUERY} AS q
+    WHERE search_vector @@ q
+    ORDER BY ts_rank_cd(search_vector, q) DESC, google_id
+    LIMIT %s OFFSET %s
+"""
+_POSTGRES_COUNT_SQL = f"SELECT count(*) FROM books_book WHERE search_vector @@ {_POSTGRES_TSQUERY}"
+# bm25() weights follow the column order: google_id, title, authors, categories, short_description.
+_SQLITE_SQL = """
+    SELECT google_id FROM books_book_fts WHERE books_book_fts MATCH %s
+    ORDER BY bm25(books_book_fts, 0.0, 10.0, 5.0, 3.0, 1.0), google_id
+    LIMIT %s OFFSET %s
+"""
+_SQLITE_COUNT_SQL = "SELECT count(*) FROM books_book_fts WHERE books_book_fts MATCH %s"
+
+
+def _terms(query):
+    return _TERM_RE.findall(query.lower())[:LOCAL_SEARCH_MAX_TERMS]
+
+
+def _fts5_match(terms):
+    # Quote every term so user input can never be parsed as FTS5 syntax; the last one is a prefix.
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _postgres_query_params(terms):
+    # "or" / "-x" are plain words here, unlike websearch_to_tsquery().
+    return [" ".join(terms[:-1]), f"{terms[-1]}:*"]
+
+
+def search_book_ids(query, limit=20, offset=0):
+    """Return (ranked google_ids for the page, total matches) for a free-text query."""
+    terms = _terms(query or "")
+    if not terms:
+        return [], 0
+
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == "postgresql":
+            params = _postgres_query_params(terms)
+            cursor.execute(_POSTGRES_SQL, [*params, limit, offset])
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(_POSTGRES_COUNT_SQL, params)
+            return ids, cursor.fetchone()[0]
+        if vendor == "sqlite":
+            match = _fts5_match(terms)
+            cursor.execute(_SQLITE_SQL, [match, limit, offset])
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(_SQLITE_COUNT_SQL, [match])
+            return ids, cursor.fetchone()[0]
+
+    qs = Book.objects.filter(title__icontains=" ".join(terms)).order_by("title")
+    return list(qs.values_list("google_id", flat=True)[offset:offset + limit]), qs.count()
+
+
+def book_to_result(book):
+    """A persisted Book in the same shape as normalize_google_book()."""
+    return {
+        "google_id": book.google_id,
+        "title": book.title,
+        "authors": book.authors or [],
+        "published_date": book.published_date,
+        "categories": book.categories or [],
+        "thumbnail": book.thumbnail_url,
+        "description": book.short_description,
+        "average_rating": book.average_rating,
+    }
+
+
+def search_local_books(query, limit=20, offset=0):
+    """Return (result dicts in rank order, total matches)."""
+    ids, total = search_book_ids(query, limit=limit, offset=offset)
+    books = {b.google_id: b for b in Book.objects.card("categories").filter(google_id__in=ids)}
+    return [book_to_result(books[g]) for g in ids if g in books], total
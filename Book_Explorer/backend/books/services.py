@@ -2,20 +2,37 @@ from numpy import sort
 import requests
 import os
 import time
+import base64
+import binascii
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
 from urllib.parse import quote
 from math import ceil
 import google.generativeai as genai
 from openai import OpenAI
 from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Avg
+from django.db import connections
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
 from sympy import limit
 
-from .models import Review, Book, UserBookInteraction
+from . import http_client
+from .caching import (
+    bump_tags,
+    local_get,
+    local_set,
+    normalized_key,
+    single_flight,
+    swr_builder,
+    swr_get,
+    tagged_key,
+)
+from .models import Review, Book, UserBookInteraction, book_fields
+from .search import LOCAL_SEARCH_MIN_RESULTS, book_to_result, search_local_books
 from .serializers import (
     BookDetailSerializer,
     ReviewMiniSerializer,
-    UserBookInteractionMiniSerializer,
 )
 import io
 from typing import List
@@ -34,8 +51,15 @@ except Exception:
 def search_google_books(query, max_results=20, start_index=0):
     """
     Query the Google Books API safely with pagination support.
-    start_index controls pagination offset.
+    start_index controls pagination offset. Identical concurrent searches
+    share a single upstream request.
     """
+    max_results = min(max_results, 40)
+    key = normalized_key("gb_search", query, max_results, start_index)
+    return single_flight(key, lambda: _search_google_books_upstream(query, max_results, start_index))
+
+
+def _search_google_books_upstream(query, max_results, start_index):
     url = "https://www.googleapis.com/books/v1/volumes"
     max_results = min(max_results, 40)  # Google Books max is 40
 
@@ -49,11 +73,11 @@ def search_google_books(query, max_results=20, start_index=0):
     }
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = http_client.get(url, params=params)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code if e.response else None
+        status_code = e.response.status_code if e.response is not None else None
         if status_code == 401:
             return {
                 "error": "Google Books API returned 401 Unauthorized. Invalid or expired API key.",
@@ -77,11 +101,16 @@ def search_google_books(query, max_results=20, start_index=0):
     
 
 def fetch_google_book_by_id(google_id):
-    """Get details for a specific book by Google ID from the API."""
+    """Get details for a specific book by Google ID from the API (coalesced per ID)."""
+    key = f"gb_volume_{google_id}"  # volume IDs are case-sensitive, so no normalization
+    return single_flight(key, lambda: _fetch_google_book_upstream(google_id))
+
+
+def _fetch_google_book_upstream(google_id):
     url = f"https://www.googleapis.com/books/v1/volumes/{google_id}"
     params = {"key": getattr(settings, "GOOGLE_BOOKS_API_KEY", None)}
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = http_client.get(url, params=params)
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
@@ -89,6 +118,69 @@ def fetch_google_book_by_id(google_id):
         return None
 
 
+# -------------------------------
+# Concurrent fan-out
+# -------------------------------
+FANOUT_MAX_WORKERS = 12
+FANOUT_DEADLINE = 12  # seconds for a whole fan-out, slightly above one request timeout
+# A fan-out whose calls fan out again (home sections building curated sections
+# inline, plus their popular-now fallback) waits out two inner rounds with headroom.
+NESTED_FANOUT_DEADLINE = 2 * FANOUT_DEADLINE + 6
+
+
+def _call_and_release(fn, args):
+    try:
+        return fn(*args)
+    finally:
+        # Worker threads get their own DB connections; don't leak them.
+        connections.close_all()
+
+
+def run_in_parallel(calls, deadline=FANOUT_DEADLINE):
+    """
+    Run {key: (fn, *args)} concurrently and return {key: result}.
+    Calls that fail or miss the overall deadline are left out, so callers
+    get partial results instead of waiting on the slowest upstream.
+    """
+    if not calls:
+        return {}
+
+    executor = ThreadPoolExecutor(max_workers=min(len(calls), FANOUT_MAX_WORKERS))
+    futures = {
+        executor.submit(_call_and_release, fn, args): key
+        for key, (fn, *args) in calls.items()
+    }
+    results = {}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(f"⚠️ Parallel fetch '{key}' failed: {e}")
+    except FuturesTimeout:
+        print(f"⏱️ Parallel fetch deadline hit: {len(results)}/{len(calls)} finished in {deadline}s")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def search_google_books_many(queries, deadline=FANOUT_DEADLINE):
+    """
+    Concurrent search_google_books for {key: (query, max_results)}.
+    Returns {key: [normalized books]} for queries that succeeded in time.
+    """
+    raw = run_in_parallel(
+        {key: (search_google_books, query, max_results) for key, (query, max_results) in queries.items()},
+        deadline=deadline,
+    )
+    return {
+        key: [normalize_google_book(item) for item in data["items"]]
+        for key, data in raw.items()
+        if data and "items" in data
+    }
+
+
 def get_nyt_bestsellers():
     """Fetch bestseller list from NYT API if valid key is available."""
     api_key = getattr(settings, "NYT_API_KEY", None)
@@ -99,7 +191,7 @@ def get_nyt_bestsellers():
     url = "https://api.nytimes.com/svc/books/v3/lists/current/hardcover-fiction.json"
     params = {"api-key": api_key}
     try:
-        r = requests.get(url, params=params, timeout=10)
+        r = http_client.get(url, params=params)
         r.raise_for_status()
         data = r.json().get("results", {}).get("books", [])
         return [
@@ -164,7 +256,7 @@ def get_or_create_book_details(google_id):
     and save a complete record.
     """
     try:
-        return Book.objects.get(google_id=google_id)
+        return Book.objects.detail().get(google_id=google_id)
     except Book.DoesNotExist:
         data = fetch_google_book_by_id(google_id)
         if not data:
@@ -177,6 +269,7 @@ def get_or_create_book_details(google_id):
             defaults={
                 "title": normalized_data.get("title", "Unknown Title"),
                 "authors": normalized_data.get("authors", []),
+                "categories": normalized_data.get("categories", []),
                 "published_date": normalized_data.get("published_date"),
                 "thumbnail_url": normalized_data.get("thumbnail"),
                 "short_description": normalized_data.get("description"),
@@ -188,6 +281,16 @@ def get_or_create_book_details(google_id):
 # High-level business logic (with caching)
 # -------------------------------
 
+# Curated sections are fresh for CURATED_SOFT_TTL, then served stale while a
+# Celery task rebuilds them; they only disappear after CURATED_HARD_TTL.
+CURATED_SOFT_TTL = 60 * 60 * 6
+CURATED_HARD_TTL = 60 * 60 * 48
+CURATED_BUILD_LIMIT = 20  # builders keep this many; getters slice to the caller's limit
+HOME_SOFT_TTL = 60 * 60
+HOME_HARD_TTL = 60 * 60 * 24
+HOME_SECTIONS = ("carousel", "recent", "bestsellers")
+
+
 # ADDED: Caching for performance
 # ============================================================
 # 🔹 Genre Top Books (Improved for Carousel)
@@ -196,13 +299,14 @@ def get_genre_top_books(limit=10):
     """
     Improved version that pulls visually rich, relevant books from
     curated high-interest genres for carousel display.
-    Caches results for 6 hours.
+    Fresh for 6 hours, then served stale while a background refresh runs.
     """
-    cache_key = "genre_top_books_curated"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
+    books, _ = swr_get("genre_top_books_curated")
+    return books[:limit]
 
+
+@swr_builder("genre_top_books_curated", soft_ttl=CURATED_SOFT_TTL, hard_ttl=CURATED_HARD_TTL)
+def _build_genre_top_books():
     # 🎯 Curated high-engagement genres (fiction-heavy & trending)
     curated_genres = [
         "bestseller fiction",
@@ -217,18 +321,12 @@ def get_genre_top_books(limit=10):
         "young adult fiction"
     ]
 
-    books = []
-    for genre in curated_genres[:limit]:
-        data = search_google_books(f"subject:{genre}", max_results=1)
-        if data and "items" in data:
-            normalized = [normalize_google_book(i) for i in data["items"]]
-            books.extend(normalized)
+    results = search_google_books_many({g: (f"subject:{g}", 1) for g in curated_genres})
+    books = [book for genre in curated_genres for book in results.get(genre, [])]
 
     # fallback: if Google Books fails, reuse from popular_now
     if not books:
         books = get_popular_now_books(limit=10)
-
-    cache.set(cache_key, books, timeout=60 * 60 * 6)  # 6h
     return books
 
 
@@ -239,13 +337,15 @@ def get_genre_top_books(limit=10):
 def get_recent_books(limit=10):
     """
     Fetch recent, high-quality books instead of random low-quality results.
-    Focuses on fiction & trending genres. Cached for 6 hours.
+    Focuses on fiction & trending genres. Fresh for 6 hours, then served stale
+    while a background refresh runs.
     """
-    cache_key = "recent_books_curated"
-    cached_books = cache.get(cache_key)
-    if cached_books:
-        return cached_books
+    books, _ = swr_get("recent_books_curated")
+    return books[:limit]
+
 
+@swr_builder("recent_books_curated", soft_ttl=CURATED_SOFT_TTL, hard_ttl=CURATED_HARD_TTL)
+def _build_recent_books():
     # Target genres that constantly have new titles
     queries = [
         "new fiction releases",
@@ -255,18 +355,11 @@ def get_recent_books(limit=10):
         "recent sci-fi releases"
     ]
 
-    books = []
-    for q in queries:
-        data = search_google_books(q, max_results=3)
-        if data and "items" in data:
-            normalized = [normalize_google_book(item) for item in data["items"]]
-            books.extend(normalized)
+    results = search_google_books_many({q: (q, 3) for q in queries})
+    books = [book for q in queries for book in results.get(q, [])]
 
-    books = books[:limit]
     if not books:
-        books = get_popular_now_books(limit=limit)
-
-    cache.set(cache_key, books, 60 * 60 * 6)
+        books = get_popular_now_books(limit=CURATED_BUILD_LIMIT)
     return books
 
 # ADDED: Caching for performance
@@ -276,12 +369,14 @@ def get_bestsellers(limit=10):
     1️⃣ Try NYT API
     2️⃣ Fallback to Google Books “bestseller OR popular books”
     3️⃣ Fallback to local DB (top-rated)
+    Served stale past its soft expiry while a background refresh runs.
     """
-    cache_key = "bestsellers_combined"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached[:limit]
+    books, _ = swr_get("bestsellers_combined")
+    return books[:limit]
+
 
+@swr_builder("bestsellers_combined", soft_ttl=CURATED_SOFT_TTL, hard_ttl=CURATED_HARD_TTL)
+def _build_bestsellers(limit=CURATED_BUILD_LIMIT):
     books = []
 
     # 1️⃣ Try NYT API
@@ -315,8 +410,6 @@ def get_bestsellers(limit=10):
                 .values("google_id", "title", "authors", "thumbnail_url", "average_rating")
             )
             books = list(local_books)
-
-    cache.set(cache_key, books, timeout=60 * 60 * 6)
     return books
 
 # -------------------------------
@@ -419,8 +512,8 @@ def fetch_author_details(author_name: str):
 
     # --- Try Open Library API ---
     try:
-        response = requests.get(
-            f"https://openlibrary.org/search/authors.json?q={author_name}", timeout=10
+        response = http_client.get(
+            "https://openlibrary.org/search/authors.json", params={"q": author_name}
         )
         response.raise_for_status()
         data = response.json()
@@ -473,6 +566,36 @@ def fetch_author_details(author_name: str):
     return author_info
 
 
+# ============================================================
+# 🔹 More From Author (indexed DB lookup first, Google Books to fill in)
+# ============================================================
+MORE_FROM_AUTHOR_LIMIT = 10
+MORE_FROM_AUTHOR_LOCAL_MIN = 5  # this many persisted books → answer without calling Google
+
+
+def get_more_from_author(author_name, limit=MORE_FROM_AUTHOR_LIMIT):
+    """
+    Books by `author_name`: persisted ones via the author membership index,
+    topped up from Google Books only when the catalog has too few.
+    """
+    local = [
+        book_to_result(b)
+        for b in Book.objects.by_author(author_name).card("categories").order_by("-review_count", "title")[:limit]
+    ]
+    if len(local) >= min(MORE_FROM_AUTHOR_LOCAL_MIN, limit):
+        return {"books": local, "source": "local"}
+
+    data = search_google_books(f"inauthor:{author_name}", max_results=limit)
+    seen = {b["google_id"] for b in local}
+    books = list(local)
+    for item in (data or {}).get("items", []):
+        book = normalize_google_book(item)
+        if book.get("google_id") not in seen:
+            seen.add(book.get("google_id"))
+            books.append(book)
+    return {"books": books[:limit], "source": "google" if not local else "mixed"}
+
+
 
 def paginate_list(items, page=1, page_size=10):
     """
@@ -497,175 +620,349 @@ def paginate_list(items, page=1, page_size=10):
 
 
 # ============================================================
-# 🔹 Explore Page Handler (Unified Logic)
+# 🔹 Curated Section Builders (parallel fan-out)
 # ============================================================
-def get_explore_books(query=None, genre=None, sort=None, limit=50, page=1, page_size=10):
+def build_explore_sections(genres, per_genre=6, curated_limit=8):
     """
-    Unified backend handler for the Explore page (search, genre, sorting) with pagination.
-    Default mode returns curated multi-genre sections (Fiction, Novel, Mystery, etc.),
-    along with Recent and Popular (Bestseller) sections.
+    Default Explore sections: one Google query per genre plus the curated
+    recent / popular lists, all fetched concurrently. Failed sections are omitted.
     """
+    calls = {
+        g.lower().replace(" ", "_"): (search_google_books, f"subject:{g}", per_genre)
+        for g in genres
+    }
+    calls["recent"] = (get_recent_books, curated_limit)
+    calls["popular"] = (get_bestsellers, curated_limit)
+    results = run_in_parallel(calls)
+
+    sections = {}
+    for key in calls:
+        if key not in results:
+            continue
+        data = results[key]
+        if key in ("recent", "popular"):
+            sections[key] = data
+        elif data and "items" in data:
+            sections[key] = [normalize_google_book(item) for item in data["items"]]
+    return sections
+
+
+@swr_builder("home_books_combined_v2", soft_ttl=HOME_SOFT_TTL, hard_ttl=HOME_HARD_TTL)
+def build_home_books():
+    """
+    Carousel, recent and popular-now sections built concurrently for the home page.
+    Returns None if any section failed or came back empty, so a refresh keeps
+    the previous (complete) copy instead of caching a page with holes for an hour.
+    """
+    results = run_in_parallel({
+        "carousel": (get_genre_top_books, 10),
+        "recent": (get_recent_books, 10),
+        "bestsellers": (get_popular_now_books, 10),  # kept key same for frontend compatibility
+    }, deadline=NESTED_FANOUT_DEADLINE)
+    sections = {key: results.get(key) for key in HOME_SECTIONS}
+    missing = [key for key, books in sections.items() if not books]
+    if missing:
+        print(f"⚠️ Home build incomplete, missing: {', '.join(missing)}")
+        return None
+    return sections
 
-    # Unique cache key per mode and page
-    cache_key = f"explore_{query or genre or sort or 'default'}_{page}_{page_size}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
 
-    # ==============================
-    # 1️⃣ SEARCH MODE — Paginated Search Results
-    # ==============================
+# ============================================================
+# 🔹 Explore Pages (shared by ExploreBooksView and cache warming)
+# ============================================================
+EXPLORE_PAGE_TTL = 60 * 60 * 6  # tagged "explore"; top pages are re-warmed by Celery beat
+EXPLORE_LOCAL_PAGE_TTL = 60 * 5  # also tagged "explore:catalog", bumped whenever searchable Book data changes
+EXPLORE_DEFAULT_GENRES = ["Fiction", "Novel", "Mystery", "History", "Science", "Science Fiction"]
+
+
+def normalize_explore_term(value):
+    """Canonical Explore search/genre text: trimmed, single-spaced, lowercase."""
+    return " ".join((value or "").split()).lower()
+
+
+def explore_cache_key(query=None, genre=None, sort=None, page=1, page_size=12, local=False):
+    """
+    Google-sourced pages only depend on the "explore" tag; pages answered
+    from the local catalog live under their own key that also follows
+    "explore:catalog", so new or edited books invalidate just those.
+    """
+    base = f"explore_{query or genre or sort or 'default'}_{page}_{page_size}"
+    if local:
+        return tagged_key(f"{base}_local", "explore", "explore:catalog")
+    return tagged_key(base, "explore")
+
+
+def get_cached_explore_page(query=None, genre=None, page=1, page_size=12):
+    """Cached search / genre page (local-catalog answer first), or None."""
+    keys = [explore_cache_key(query, genre, None, page, page_size)]
     if query:
-        # true pagination: Google Books supports startIndex
-        start_index = (page - 1) * page_size
-        data = search_google_books(query, max_results=page_size, start_index=start_index)  # ✅ FIXED HERE
-
-        books = [
-            normalize_google_book(item) for item in data.get("items", [])
-        ] if data and "items" in data else []
-
-        total_items = min(data.get("totalItems", len(books)), 200)  # cap to avoid massive counts
-        total_pages = max(1, (total_items + page_size - 1) // page_size)
-        next_page = page + 1 if page < total_pages else None
-
-        result = {
-            "mode": "search",
-            "page": page,
-            "next_page": next_page,
-            "total_items": total_items,
-            "results": books,
-        }
+        keys.insert(0, explore_cache_key(query, genre, None, page, page_size, local=True))
+    found = cache.get_many(keys)
+    return next((found[k] for k in keys if found.get(k)), None)
 
-        cache.set(cache_key, result, timeout=60 * 60)  # 1-hour cache
-        return result
-
-    # ==============================
-    # 2️⃣ GENRE MODE — Paginated by Subject
-    # ==============================
-    if genre:
-        start_index = (page - 1) * page_size
-        data = search_google_books(f"subject:{genre}", max_results=page_size, start_index=start_index)  # ✅ FIXED HERE
-
-        books = [
-            normalize_google_book(item) for item in data.get("items", [])
-        ] if data and "items" in data else []
-
-        total_items = min(data.get("totalItems", len(books)), 200)
-        total_pages = max(1, (total_items + page_size - 1) // page_size)
-        next_page = page + 1 if page < total_pages else None
-
-        result = {
-            "mode": "genre",
-            "page": page,
-            "next_page": next_page,
-            "total_items": total_items,
-            "results": books,
-        }
 
-        cache.set(cache_key, result, timeout=60 * 60)
-        return result
+def cache_explore_page(query, genre, page, page_size, result):
+    local = result.get("source") == "local"
+    cache.set(
+        explore_cache_key(query, genre, None, page, page_size, local=local),
+        result,
+        timeout=EXPLORE_LOCAL_PAGE_TTL if local else EXPLORE_PAGE_TTL,
+    )
 
-    # ==============================
-    # 3️⃣ SORT MODE — Newest / Bestsellers
-    # ==============================
-    if sort == "newest":
-        books = get_recent_books(limit=limit)
-    elif sort == "bestsellers":
-        books = get_bestsellers(limit=limit)
-    else:
-        books = []
-
-    if books:
-        total_items = len(books)
-        total_pages = max(1, (total_items + page_size - 1) // page_size)
-        next_page = page + 1 if page < total_pages else None
-
-        result = {
-            "mode": "sorted",
-            "page": page,
-            "next_page": next_page,
-            "total_items": total_items,
-            "results": books,
-        }
 
-        cache.set(cache_key, result, timeout=60 * 60)
-        return result
+def build_explore_page(query=None, genre=None, page=1, page_size=12):
+    """
+    One paginated page of search (query) or subject (genre) results for Explore.
+    A search page is answered from the local catalog only when local matches
+    fill it completely; a short or missing local page goes to Google Books, so
+    paging past the end of the local matches keeps returning results.
+    """
+    start_index = (page - 1) * page_size
+    if query:
+        local_books, local_total = search_local_books(query, limit=page_size, offset=start_index)
+        if local_total >= max(LOCAL_SEARCH_MIN_RESULTS, start_index + page_size):
+            return {
+                "page": page,
+                # Always offer the next page: more local matches or, past them, Google's.
+                "next_page": page + 1,
+                "total_items": local_total,
+                "results": local_books,
+                "source": "local",
+            }
 
-    # ==============================
-    # 4️⃣ DEFAULT MODE — BOOKEX-CORE HOME (NO CAROUSEL)
-    # ==============================
-    print("✨ Building default Explore multi-genre view...")
+    data = search_google_books(query or f"subject:{genre}", max_results=page_size, start_index=start_index)
 
-    sections = {}
-    genres = ["Fiction", "Novel", "Mystery", "History", "Science", "Science Fiction"]
+    books = [normalize_google_book(item) for item in data.get("items", [])] if data and "items" in data else []
+    total_items = min(data.get("totalItems", len(books)), 200)  # cap to avoid massive counts
+    total_pages = max(1, (total_items + page_size - 1) // page_size)
+    next_page = page + 1 if page < total_pages else None
 
-    for g in genres:
-        data = search_google_books(f"subject:{g}", max_results=7)
-        if data and "items" in data:
-            sections[g.lower().replace(" ", "_")] = [
-                normalize_google_book(item) for item in data["items"]
-            ]
+    return {
+        "page": page,
+        "next_page": next_page,
+        "total_items": total_items,
+        "results": books,
+    }
 
-    # Add curated sections
-    sections["recent"] = get_recent_books(limit=7)
-    sections["popular"] = get_bestsellers(limit=7)
 
-    result = {
+@swr_builder("explore_default_sections", soft_ttl=60 * 60 * 3, hard_ttl=CURATED_HARD_TTL)
+def build_explore_default():
+    """Default curated Explore view (multi-genre sections plus recent / popular)."""
+    return {
         "mode": "default",
-        "sections": sections,
+        "sections": build_explore_sections(EXPLORE_DEFAULT_GENRES, per_genre=6, curated_limit=8),
     }
 
-    cache.set(cache_key, result, timeout=60 * 60 * 3)  # 3-hour cache
-    return result
 
+# ============================================================
+# 🔹 BOOK DETAIL (FULL) SERVICE
+# ============================================================
+
+BOOK_DETAIL_TTL = 60 * 60 * 6
+REVIEW_PAGE_SIZE = 10
+REVIEW_MAX_PAGE_SIZE = 50
 
 
 # ============================================================
-# 🔹 BOOK DETAIL (FULL) SERVICE
+# 🔹 Rating Aggregates (denormalized on Book)
 # ============================================================
+def rating_aggregate_expressions():
+    """Aggregates over Review rows that mirror Book's stored rating fields."""
+    return {
+        "review_count": Count("id"),
+        "rating_sum": Sum("rating"),
+        **{f"rating_{star}": Count("id", filter=Q(rating=star)) for star in range(1, 6)},
+    }
 
-def get_full_book_details(book_id, user=None):
+
+def apply_rating_change(book_id, old_rating=None, new_rating=None):
     """
-    Return complete book details with average rating, reviews,
-    and user-specific interaction status.
-    Cached for 30 minutes for performance.
+    Atomically shift a book's aggregates by one review's change: add
+    (old=None), remove (new=None) or re-rate. Runs as a single UPDATE with F().
+    Decrements are clamped at zero, so aggregates that drifted (fixed later by
+    recompute_rating_aggregates) never trip the non-negative CHECK constraints.
     """
-    cache_key = f"book_full_detail_{book_id}_{user.id if user else 'anon'}"
-    cached = cache.get(cache_key)
+    if old_rating == new_rating:
+        return
+    updates = {"rating_sum": Greatest(F("rating_sum") + (new_rating or 0) - (old_rating or 0), 0)}
+    if old_rating is None:
+        updates["review_count"] = F("review_count") + 1
+    if new_rating is None:
+        updates["review_count"] = Greatest(F("review_count") - 1, 0)
+    if old_rating:
+        updates[f"rating_{old_rating}"] = Greatest(F(f"rating_{old_rating}") - 1, 0)
+    if new_rating:
+        updates[f"rating_{new_rating}"] = F(f"rating_{new_rating}") + 1
+    Book.objects.filter(google_id=book_id).update(**updates)
+
+
+def recompute_rating_aggregates(batch_size=500):
+    """
+    Rebuild every book's rating aggregates from Review rows; returns books updated.
+    bulk_update() sends no signals, so the detail caches of books whose totals
+    actually changed are invalidated here.
+    """
+    fields = list(rating_aggregate_expressions())
+    rows = Review.objects.order_by().values("book_id").annotate(**rating_aggregate_expressions())
+    changed_ids = []
+
+    def flush(batch):
+        stored = {
+            row.pop("google_id"): row
+            for row in Book.objects.filter(google_id__in=list(batch)).values("google_id", *fields)
+        }
+        changed = [Book(google_id=g, **totals) for g, totals in batch.items() if stored.get(g, totals) != totals]
+        Book.objects.bulk_update(changed, fields)
+        changed_ids.extend(b.google_id for b in changed)
+
+    batch = {}
+    for row in rows.iterator():
+        batch[row.pop("book_id")] = row
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = {}
+    if batch:
+        flush(batch)
+
+    # Books whose reviews have all gone.
+    zeroed = list(Book.objects.filter(review_count__gt=0, reviews__isnull=True).values_list("google_id", flat=True))
+    Book.objects.filter(google_id__in=zeroed).update(**{f: 0 for f in fields})
+    changed_ids.extend(zeroed)
+
+    for book_id in changed_ids:
+        clear_book_detail_cache(book_id)
+    return len(changed_ids)
+
+
+# ============================================================
+# 🔹 Library Shelves (keyset-paginated per shelf)
+# ============================================================
+LIBRARY_PAGE_SIZE = 24
+LIBRARY_MAX_PAGE_SIZE = 100
+LIBRARY_SHELVES = {
+    "will_read": Q(status=UserBookInteraction.Status.WILL_READ),
+    "reading": Q(status=UserBookInteraction.Status.READING),
+    "read": Q(status=UserBookInteraction.Status.READ),
+    "favorites": Q(is_favorite=True),
+}
+# Only the columns UserBookInteractionSerializer renders; skips descriptions, summaries and embeddings.
+LIBRARY_FIELDS = ("id", "status", "is_favorite", "user", "user__name", "book", *book_fields("card", "book"))
+
+
+def library_shelf_page(user, shelf, cursor=None, page_size=LIBRARY_PAGE_SIZE):
+    """
+    One page of a library shelf, newest first, seeking on the (user, status, id)
+    or (user, is_favorite, id) index. `cursor` is the previous page's
+    next_cursor (an interaction id). Returns (interactions, next_cursor).
+    """
+    page_size = max(1, min(page_size, LIBRARY_MAX_PAGE_SIZE))
+    interactions = (
+        UserBookInteraction.objects.filter(LIBRARY_SHELVES[shelf], user=user)
+        .select_related("user", "book")
+        .only(*LIBRARY_FIELDS)
+        .order_by("-id")
+    )
+    if cursor:
+        interactions = interactions.filter(id__lt=int(cursor))
+    page = list(interactions[:page_size + 1])
+    next_cursor = str(page[page_size - 1].id) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+# ============================================================
+# 🔹 Review Keyset Pagination
+# ============================================================
+def encode_review_cursor(review):
+    raw = f"{review.created_at.isoformat()}|{review.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_review_cursor(cursor):
+    """Return (created_at, id) from a cursor; raises ValueError if it is malformed."""
+    try:
+        created_at, review_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(review_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def paginate_reviews(book_id, cursor=None, page_size=REVIEW_PAGE_SIZE, queryset=None):
+    """
+    One page of a book's reviews, newest first, in (-created_at, id) order.
+    Seeks past the cursor on the (book, -created_at, id) index instead of
+    counting an OFFSET, so every page costs the same. Returns (reviews, next_cursor).
+    """
+    page_size = max(1, min(page_size, REVIEW_MAX_PAGE_SIZE))
+    reviews = (queryset if queryset is not None else Review.objects.all()).filter(book_id=book_id)
+    if cursor:
+        created_at, review_id = decode_review_cursor(cursor)
+        reviews = reviews.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=review_id)
+        )
+    page = list(reviews.order_by("-created_at", "id")[:page_size + 1])
+    next_cursor = encode_review_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+def book_detail_cache_key(book_id):
+    """The shared detail payload is cached once per book, tagged book:<id>."""
+    return tagged_key(f"book_full_detail_{book_id}", f"book:{book_id}")
+
+
+def _shared_book_details(book_id):
+    """Book, reviews and rating — identical for every viewer, cached once per book."""
+    cache_key = book_detail_cache_key(book_id)
+    cached = local_get(cache_key)
     if cached:
         return cached
 
     try:
-        book = Book.objects.get(google_id=book_id)
+        book = Book.objects.detail().get(google_id=book_id)
     except Book.DoesNotExist:
-        return {"error": "Book not found."}
+        return None
 
     # Base book data
     book_data = BookDetailSerializer(book).data
 
-    # Reviews and average rating
-    reviews = Review.objects.filter(book=book).order_by("-created_at")
-    review_data = ReviewMiniSerializer(reviews, many=True).data
-    avg_rating = reviews.aggregate(avg=Avg("rating"))["avg"]
+    # First page of reviews (the rest via the review list endpoint); rating from stored aggregates
+    first_page, next_cursor = paginate_reviews(book_id, queryset=Review.objects.select_related("user"))
+    review_data = ReviewMiniSerializer(first_page, many=True).data
+    avg_rating = book.review_average
     book_data["average_rating"] = avg_rating or book.average_rating
 
-    # User interaction (if logged in)
-    user_interaction_data = None
-    if user and user.is_authenticated:
-        interaction = UserBookInteraction.objects.filter(user=user, book=book).first()
-        if interaction:
-            user_interaction_data = UserBookInteractionMiniSerializer(interaction).data
-
-    result = {
+    shared = {
         "book": book_data,
         "reviews": review_data,
+        "reviews_next_cursor": next_cursor,
         "average_rating": avg_rating or 0,
-        "user_interaction": user_interaction_data,
+        "review_count": book.review_count,
+        "rating_histogram": book.rating_histogram,
     }
+    local_set(cache_key, shared, timeout=BOOK_DETAIL_TTL)
+    return shared
 
-    # Cache for 30 minutes
-    cache.set(cache_key, result, timeout=60 * 30)
-    return result
+
+def get_full_book_details(book_id, user=None):
+    """
+    Return complete book details with average rating, reviews,
+    and user-specific interaction status.
+    The shared part is cached for 6 hours (and held in the in-process tier);
+    the per-user overlay is one indexed lookup on (user, book) per request.
+    """
+    shared = _shared_book_details(book_id)
+    if shared is None:
+        return {"error": "Book not found."}
+
+    # User interaction (if logged in)
+    user_interaction_data = None
+    if user and user.is_authenticated:
+        user_interaction_data = (
+            UserBookInteraction.objects.filter(user=user, book_id=book_id)
+            .values("status", "is_favorite")
+            .first()
+        )
+
+    return {**shared, "user_interaction": user_interaction_data}
 
 # ============================================================
 # 🔹 CACHE INVALIDATION HELPERS
@@ -673,11 +970,24 @@ def get_full_book_details(book_id, user=None):
 
 def clear_book_detail_cache(book_id, user_id=None):
     """
-    Clears all cached versions of book detail (both user-specific and anonymous).
+    Invalidates the cached detail payload of a book, plus everything tagged
+    with `user_id` when given.
+    """
+    bump_tags(f"book:{book_id}", *([f"user:{user_id}"] if user_id else []))
+
+
+def clear_user_cache(user_id):
+    """Invalidates every cached payload that embeds this user's own data."""
+    bump_tags(f"user:{user_id}")
+
+
+def clear_explore_cache(catalog_only=False):
+    """
+    Drops every cached Explore search / genre page, or with catalog_only just
+    the pages answered from the local catalog (Google-sourced pages don't
+    depend on our Book table).
     """
-    cache.delete(f"book_full_detail_{book_id}_anon")
-    if user_id:
-        cache.delete(f"book_full_detail_{book_id}_{user_id}")
+    bump_tags("explore:catalog" if catalog_only else "explore")
 
 # books/services.py (append near bottom, before cache helpers if you want)
 
@@ -928,25 +1238,17 @@ def summarize_user_text(text: str, max_summary_words: int = 250) -> dict:
 # 🔹 Popular Now Books (Uniform with Carousel)
 # ============================================================
 def get_popular_now_books(limit=10):
+    """Trending picks across broad genres, served stale-while-revalidate."""
+    books, _ = swr_get("popular_now_books")
+    return books[:limit]
 
-    cache_key = "popular_now_books"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
 
+@swr_builder("popular_now_books", soft_ttl=CURATED_SOFT_TTL, hard_ttl=CURATED_HARD_TTL)
+def _build_popular_now_books():
     trending_queries = [
         "fiction", "thriller", "fantasy", "romance",
         "science fiction", "mystery", "biography", "history"
     ]
 
-    books = []
-    for q in trending_queries:
-        data = search_google_books(f"subject:{q}", max_results=2)
-        if data and "items" in data:
-            normalized = [normalize_google_book(i) for i in data["items"]]
-            books.extend(normalized)
-
-    # Trim list to desired limit
-    books = books[:limit]
-    cache.set(cache_key, books, timeout=60 * 60 * 6)  # 6 hours
-    return books
+    results = search_google_books_many({q: (f"subject:{q}", 2) for q in trending_queries})
+    return [book for q in trending_queries for book in results.get(q, [])]
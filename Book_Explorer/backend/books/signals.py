@@ -1,7 +1,40 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Review, UserBookInteraction
-from .services import clear_book_detail_cache
+from . import ann
+from .autocomplete import schedule_index_update
+from .models import Book, BookFacet, Review, UserBookInteraction
+from .services import apply_rating_change, clear_book_detail_cache, clear_explore_cache, clear_user_cache
+from .recommender import TASTE_STATUSES, apply_taste_delta
+
+# Book columns indexed by the local full-text search or shown on its result cards.
+SEARCHABLE_BOOK_FIELDS = {
+    "title", "authors", "categories", "short_description",
+    "published_date", "thumbnail_url", "average_rating",
+}
+
+
+# ------------------------------------------------------------
+# 🔹 When a review changes → update the Book's rating aggregates
+#    (connected before the cache receivers so rebuilt caches see new totals)
+# ------------------------------------------------------------
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    # Instances loaded from the DB already carry _saved_rating (Review.from_db).
+    if instance.pk and not hasattr(instance, "_saved_rating"):
+        instance._saved_rating = Review.objects.filter(pk=instance.pk).values_list("rating", flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_aggregates_on_save(sender, instance, created, **kwargs):
+    old_rating = None if created else getattr(instance, "_saved_rating", None)
+    apply_rating_change(instance.book_id, old_rating, instance.rating)
+    instance._saved_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_aggregates_on_delete(sender, instance, **kwargs):
+    apply_rating_change(instance.book_id, getattr(instance, "_saved_rating", instance.rating), None)
 
 
 # ------------------------------------------------------------
@@ -9,9 +42,8 @@ from .services import clear_book_detail_cache
 # ------------------------------------------------------------
 @receiver([post_save, post_delete], sender=Review)
 def clear_cache_on_review_change(sender, instance, **kwargs):
-    book_id = instance.book.google_id
-    user_id = instance.user.id
-    clear_book_detail_cache(book_id, user_id=None)
+    # Reviews and ratings show up in every user's view of the book, and in the author's profile stats.
+    clear_book_detail_cache(instance.book_id, user_id=instance.user_id)
 
 
 # ------------------------------------------------------------
@@ -19,6 +51,83 @@ def clear_cache_on_review_change(sender, instance, **kwargs):
 # ------------------------------------------------------------
 @receiver([post_save, post_delete], sender=UserBookInteraction)
 def clear_cache_on_interaction_change(sender, instance, **kwargs):
-    book_id = instance.book.google_id
-    user_id = instance.user.id
-    clear_book_detail_cache(book_id, user_id)
+    # Only this user's own views embed the interaction.
+    clear_user_cache(instance.user_id)
+
+
+# ------------------------------------------------------------
+# 🔹 When a book's own fields change → clear cache
+# ------------------------------------------------------------
+@receiver(post_save, sender=Book)
+def clear_cache_on_book_change(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"embedding", "ann_list"}:
+        return
+    clear_book_detail_cache(instance.google_id)
+    # Local Explore search pages list new books and show these fields.
+    if created or not update_fields or SEARCHABLE_BOOK_FIELDS & set(update_fields):
+        clear_explore_cache(catalog_only=True)
+
+
+@receiver(post_delete, sender=Book)
+def clear_cache_on_book_delete(sender, instance, **kwargs):
+    clear_book_detail_cache(instance.google_id)
+    clear_explore_cache(catalog_only=True)
+
+
+# ------------------------------------------------------------
+# 🔹 When a book is saved, renamed or deleted → update autocomplete
+#    (after commit, so the worker reads the committed row)
+# ------------------------------------------------------------
+@receiver(post_save, sender=Book)
+def update_autocomplete_on_book_save(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or not update_fields or {"title", "authors"} & set(update_fields):
+        google_id = instance.google_id
+        transaction.on_commit(lambda: schedule_index_update(google_id))
+
+
+@receiver(post_delete, sender=Book)
+def update_autocomplete_on_book_delete(sender, instance, **kwargs):
+    google_id = instance.google_id
+    transaction.on_commit(lambda: schedule_index_update(google_id))
+
+
+# ------------------------------------------------------------
+# 🔹 When a book is deleted → shrink its IVF list
+#    (pre_delete, so a deferred ann_list can still be loaded)
+# ------------------------------------------------------------
+@receiver(pre_delete, sender=Book)
+def release_ann_list_on_delete(sender, instance, **kwargs):
+    if instance.ann_list is not None:
+        ann.adjust_list_sizes({instance.ann_list: -1})
+
+
+# ------------------------------------------------------------
+# 🔹 When a book is shelved / unshelved → update taste vector
+# ------------------------------------------------------------
+def _book_embedding(book_id):
+    return Book.objects.filter(google_id=book_id).values_list("embedding", flat=True).first()
+
+
+@receiver(post_save, sender=UserBookInteraction)
+def update_taste_vector_on_save(sender, instance, created, **kwargs):
+    was_shelved = getattr(instance, "_saved_status", None) in TASTE_STATUSES
+    is_shelved = instance.status in TASTE_STATUSES
+    instance._saved_status = instance.status
+    if was_shelved != is_shelved:
+        apply_taste_delta(instance.user_id, [_book_embedding(instance.book_id)], 1 if is_shelved else -1)
+
+
+@receiver(post_delete, sender=UserBookInteraction)
+def update_taste_vector_on_delete(sender, instance, **kwargs):
+    if getattr(instance, "_saved_status", instance.status) in TASTE_STATUSES:
+        apply_taste_delta(instance.user_id, [_book_embedding(instance.book_id)], -1)
+
+
+# ------------------------------------------------------------
+# 🔹 When a book's authors / categories change → refresh facets
+# ------------------------------------------------------------
+@receiver(post_save, sender=Book)
+def sync_facets_on_book_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {"authors", "categories"} & set(update_fields):
+        return
+    BookFacet.sync_for_book(instance)
@@ -1,13 +1,26 @@
-from celery import shared_task
+import time
+from datetime import timedelta
+from celery import chord, group, shared_task
 from django.core.cache import cache
-from django.db import transaction
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from .autocomplete import AUTOCOMPLETE_LOCK_TTL, update_index as update_autocomplete_index
+from .caching import release_refresh_lock, swr_refresh
 from .models import Book
+from .warming import WARMING_LAST_RUN_KEY, warm_caches
 from .services import generate_and_cache_ai_summary
-from .recommender import generate_book_embedding, _compute_recommendations_for_user
+from .recommender import (
+    RECS_CACHE_TTL,
+    generate_book_embedding,
+    generate_book_embeddings,
+    recommend_for_users,
+    _compute_recommendations_for_user,
+)
 
 User = get_user_model()
 
+AUTOCOMPLETE_UPDATE_RETRIES = 10  # 2+4+8+16+32 s, then 60 s each: ~6 minutes of lock contention
+
 
 # ===========================================================
 # 🧠 AI Summary Generation Task
@@ -51,12 +64,8 @@ def generate_book_embedding_task(self, google_id):
 
     try:
         vector = generate_book_embedding(book)
-        if vector:
-            with transaction.atomic():
-                book.embedding = vector
-                book.save(update_fields=["embedding"])
-                cache.set(f"book_embedding_{google_id}", vector, 60 * 60 * 24 * 7)
-                print(f"✅ [Celery] Embedding saved for '{book.title}' ({google_id})")
+        if vector is not None:
+            print(f"✅ [Celery] Embedding saved for '{book.title}' ({google_id})")
         else:
             print(f"⚠️ [Celery] Embedding not generated for {google_id}. Possibly API key or quota issue.")
     except Exception as e:
@@ -64,6 +73,23 @@ def generate_book_embedding_task(self, google_id):
         self.retry(exc=e, countdown=30)
 
 
+@shared_task(bind=True, max_retries=2)
+def generate_embeddings_batch_task(self, google_ids):
+    """Embed many books with batched provider requests and bulk DB writes."""
+    books = list(Book.objects.filter(google_id__in=google_ids, embedding__isnull=True))
+    if not books:
+        return 0
+
+    print(f"🧩 [Celery] Generating embeddings for {len(books)} books...")
+    try:
+        saved = generate_book_embeddings(books)
+        print(f"✅ [Celery] Saved {saved}/{len(books)} embeddings")
+        return saved
+    except Exception as e:
+        print(f"🔥 [Celery] Batch embedding generation failed: {e}")
+        self.retry(exc=e, countdown=30)
+
+
 # ===========================================================
 # 🎯 Recommendation Generation Task
 # ===========================================================
@@ -103,3 +129,120 @@ def generate_recommendations_task(self, user_id, top_n=10):
     except Exception as exc:
         print(f"🔥 [Celery] Recommendation generation failed for {user.email}: {exc}")
         raise self.retry(exc=exc, countdown=60)
+
+
+# ===========================================================
+# 🌙 Nightly Bulk Recommendation Precompute
+# ===========================================================
+PRECOMPUTE_ACTIVE_DAYS = 7      # matches the refresh-token lifetime
+PRECOMPUTE_CHUNK_SIZE = 200     # users per Celery task
+PRECOMPUTE_LAST_RUN_KEY = "recommendations_precompute_last_run"
+
+
+@shared_task
+def precompute_recommendations_task(active_days=PRECOMPUTE_ACTIVE_DAYS, chunk_size=PRECOMPUTE_CHUNK_SIZE, top_n=10):
+    """
+    Recompute user_recommendations_{id} for every recently active user.
+    Users are split into chunks that run as a Celery group; a chord callback
+    reports throughput once every chunk has finished.
+    """
+    since = timezone.now() - timedelta(days=active_days)
+    user_ids = list(User.objects.filter(last_login__gte=since).order_by("id").values_list("id", flat=True))
+    if not user_ids:
+        print("🌙 [Celery] No recently active users to precompute recommendations for.")
+        return 0
+
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    started_at = time.time()
+    print(f"🌙 [Celery] Precomputing recommendations for {len(user_ids)} users in {len(chunks)} chunks...")
+    chord(
+        group(precompute_recommendations_chunk_task.s(chunk, top_n, started_at) for chunk in chunks)
+    )(report_precompute_throughput_task.s(started_at=started_at, total_users=len(user_ids)))
+    return len(user_ids)
+
+
+@shared_task(bind=True, max_retries=2)
+def precompute_recommendations_chunk_task(self, user_ids, top_n=10, run_started_at=0.0):
+    """
+    Score one chunk of users against this worker's shared candidate matrix and cache results in bulk.
+    The matrix is reloaded once if it predates the run, so every chunk sees the catalog as of run start.
+    """
+    try:
+        users = list(User.objects.filter(id__in=user_ids))
+        results = recommend_for_users(users, top_n=top_n, loaded_after=run_started_at)
+        cache.set_many(
+            {f"user_recommendations_{user_id}": top_ids for user_id, top_ids in results.items()},
+            timeout=RECS_CACHE_TTL,
+        )
+        return len(results)
+    except Exception as exc:
+        print(f"🔥 [Celery] Recommendation precompute chunk failed: {exc}")
+        raise self.retry(exc=exc, countdown=60)
+
+
+@shared_task
+def report_precompute_throughput_task(chunk_counts, started_at, total_users):
+    done = sum(chunk_counts)
+    elapsed = max(time.time() - started_at, 1e-6)
+    summary = {
+        "users": done,
+        "requested": total_users,
+        "seconds": round(elapsed, 2),
+        "users_per_second": round(done / elapsed, 2),
+        "finished_at": timezone.now().isoformat(),
+    }
+    cache.set(PRECOMPUTE_LAST_RUN_KEY, summary, timeout=None)
+    print(
+        f"✅ [Celery] Precomputed recommendations for {done}/{total_users} users "
+        f"in {summary['seconds']}s ({summary['users_per_second']} users/s)"
+    )
+    return summary
+
+
+# ===========================================================
+# ♻️ Stale-While-Revalidate Refresh
+# ===========================================================
+@shared_task
+def refresh_cached_section_task(key):
+    """Rebuild a stale curated section in the background (builders register in services)."""
+    try:
+        value = swr_refresh(key)
+        if value:
+            print(f"♻️ [Celery] Refreshed {key} ({len(value)} entries)")
+        else:
+            print(f"⚠️ [Celery] Refresh of {key} came back empty; keeping the previous copy")
+    finally:
+        release_refresh_lock(key)
+
+
+# ===========================================================
+# 🔥 Scheduled Cache Warming
+# ===========================================================
+@shared_task
+def warm_caches_task():
+    """Keep home / Explore caches hot; the last run's summary is kept for inspection."""
+    summary = warm_caches()
+    cache.set(WARMING_LAST_RUN_KEY, summary, timeout=None)
+    print(
+        f"🔥 [Celery] Cache warming: refreshed {len(summary['refreshed'])} sections "
+        f"({len(summary['fresh'])} still fresh, {len(summary['failed'])} failed), "
+        f"{summary['explore_pages']} explore pages ({summary['explore_failed']} upstream misses) "
+        f"in {summary['seconds']}s"
+    )
+    return summary
+
+
+# ===========================================================
+# 🔤 Autocomplete Index Maintenance
+# ===========================================================
+@shared_task(bind=True, max_retries=AUTOCOMPLETE_UPDATE_RETRIES)
+def update_autocomplete_index_task(self, google_ids=None):
+    """Publish saved or deleted books as an autocomplete delta (None = full rebuild)."""
+    stats = update_autocomplete_index(google_ids)
+    if stats is None:
+        # Another worker is updating the index (a full rebuild can hold the lock for
+        # AUTOCOMPLETE_LOCK_TTL); back off 2s, 4s, 8s ... capped at the lock TTL, so the
+        # retries span several lock lifetimes. The nightly rebuild catches anything left.
+        raise self.retry(countdown=min(2 ** (self.request.retries + 1), AUTOCOMPLETE_LOCK_TTL))
+    print(f"🔤 [Celery] Autocomplete index now {stats['records']} entries ({stats['keys']} keys)")
+    return stats
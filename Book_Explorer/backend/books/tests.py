@@ -1,3 +1,1730 @@
-from django.test import TestCase
+import importlib
+import io
+import os
+import pickle
+import random
+import threading
+import unittest
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisSerializer
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.books import ann, autocomplete, caching, http_client, recommender, search, services, warming
+from backend.books.admin import BookAdmin
+from backend.books.autocomplete import PrefixIndex
+from backend.books.models import (
+    Book,
+    EmbeddingCentroid,
+    ExploreQueryStat,
+    EMBEDDING_DTYPE,
+    Review,
+    TextEmbedding,
+    UserBookInteraction,
+    UserTasteVector,
+)
+from backend.books.recommender import (
+    add_books_to_tastes,
+    generate_book_embeddings,
+    rebuild_taste_vector,
+    recommend_for_users,
+    cosine_similarity,
+    score_candidates,
+    top_k_ids,
+    _compute_recommendations_for_user,
+    _heuristic_recommendations,
+    _interest_sets,
+    _score_by_author_genre,
+)
+from backend.books.services import (
+    book_detail_cache_key,
+    build_explore_page,
+    cache_explore_page,
+    clear_explore_cache,
+    decode_review_cursor,
+    encode_review_cursor,
+    explore_cache_key,
+    get_cached_explore_page,
+    get_full_book_details,
+    library_shelf_page,
+    paginate_reviews,
+    recompute_rating_aggregates,
+)
+from backend.books.serializers import BookDetailSerializer, BookSerializer
+from backend.books.tasks import PRECOMPUTE_LAST_RUN_KEY, precompute_recommendations_task
+from backend.config.cache_serializers import COMPRESS_MIN_BYTES, CompressedPickleSerializer
+
+
+# Tests never need the Redis server; signals and services get a process-local cache.
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class CacheIsolationMixin:
+    """Fresh shared cache and in-process tier for every test."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        with caching._local_lock:
+            caching._local.clear()
+        caching._epoch_checked_at = 0.0
+
+
+class VectorizedScoringParityTests(SimpleTestCase):
+    """The NumPy engine must rank candidates exactly like the scalar cosine + rating bonus loop."""
+
+    # float32 matrix vs float64 scalar loop: scores agree to about 1e-7.
+    EPSILON = 1e-5
+
+    def _reference_scores(self, user_vector, candidates, embeddings, interacted):
+        scores = []
+        authors, categories = _interest_sets(interacted)
+        for cand, emb in zip(candidates, embeddings):
+            if user_vector and emb:
+                score = cosine_similarity(user_vector, emb)
+            else:
+                score = _score_by_author_genre(cand, authors, categories)
+            if cand.average_rating:
+                score += min(cand.average_rating / 10.0, 0.2)
+            scores.append(score)
+        return np.array(scores)
+
+    def _random_case(self, seed, n=300, dim=64):
+        rng = random.Random(seed)
+        interacted = [Book(google_id="seed", title="Seed", authors=["A"], categories=["Fiction"])]
+        candidates, embeddings = [], []
+        for i in range(n):
+            candidates.append(Book(
+                google_id=f"b{i}",
+                title=f"Book {i}",
+                authors=[rng.choice(["A", "B", "C"])],
+                categories=[rng.choice(["Fiction", "History"])],
+                average_rating=rng.choice([None, 1.0, 3.5, 4.8]),
+            ))
+            # A few books without embeddings exercise the heuristic fallback.
+            embeddings.append(None if i % 37 == 0 else [rng.uniform(-1, 1) for _ in range(dim)])
+        user_vector = [rng.uniform(-1, 1) for _ in range(dim)]
+        return user_vector, candidates, embeddings, interacted
+
+    def test_scores_match_scalar_cosine(self):
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                user_vector, candidates, embeddings, interacted = self._random_case(seed)
+                expected = self._reference_scores(user_vector, candidates, embeddings, interacted)
+                scores = score_candidates(np.array(user_vector), candidates, embeddings, interacted)
+                np.testing.assert_allclose(scores, expected, rtol=0, atol=self.EPSILON)
+
+    def test_top_k_agrees_with_reference_outside_near_ties(self):
+        k = 25
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                user_vector, candidates, embeddings, interacted = self._random_case(seed)
+                ids = [c.google_id for c in candidates]
+                reference = dict(zip(ids, self._reference_scores(user_vector, candidates, embeddings, interacted)))
+                top = top_k_ids(ids, score_candidates(np.array(user_vector), candidates, embeddings, interacted), k)
+
+                # Order may only differ between candidates whose reference scores are within 2 * EPSILON.
+                self.assertEqual(len(top), k)
+                for higher, lower in zip(top, top[1:]):
+                    self.assertGreater(reference[higher], reference[lower] - 2 * self.EPSILON)
+                kth = min(reference[g] for g in top)
+                left_out = max(reference[g] for g in set(ids) - set(top))
+                self.assertLess(left_out, kth + 2 * self.EPSILON)
+
+    def test_near_ties_keep_clear_winners(self):
+        # Two candidates a hair apart, one clearly ahead: only the clear gap is asserted.
+        user_vector = [1.0, 0.0]
+        candidates = [Book(google_id=g, title=g) for g in ("tie1", "tie2", "clear")]
+        embeddings = [[1.0, 0.5], [1.0, 0.5 + 1e-7], [1.0, 0.0]]
+        scores = score_candidates(np.array(user_vector), candidates, embeddings, [])
+        top = top_k_ids([c.google_id for c in candidates], scores, 3)
+        self.assertEqual(top[0], "clear")
+        self.assertEqual(set(top[1:]), {"tie1", "tie2"})
+
+    def test_top_k_keeps_candidate_order_on_ties(self):
+        ids = ["a", "b", "c", "d"]
+        scores = np.array([0.5, 0.9, 0.5, 0.5])
+        self.assertEqual(top_k_ids(ids, scores, 3), ["b", "a", "c"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class EmbeddingStorageTests(CacheIsolationMixin, TestCase):
+    """Embeddings are stored as little-endian float32 bytes and read back without copying."""
+
+    def test_round_trip_through_the_database(self):
+        vector = [0.25, -1.5, 3.0, 1e-3]
+        book = Book(google_id="emb", title="Embedded")
+        book.set_embedding(vector)
+        book.save()
+
+        stored = Book.objects.get(google_id="emb")
+        self.assertEqual(len(bytes(stored.embedding)), 4 * len(vector))
+        np.testing.assert_array_equal(stored.get_embedding(), np.asarray(vector, dtype=EMBEDDING_DTYPE))
+        self.assertEqual(stored.get_embedding().dtype, EMBEDDING_DTYPE)
+        self.assertFalse(stored.get_embedding().flags.writeable)
+
+    def test_missing_embedding(self):
+        book = Book(google_id="none", title="No vector")
+        self.assertFalse(book.has_embedding())
+        self.assertIsNone(book.get_embedding())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class EmbeddingMigrationTests(CacheIsolationMixin, TransactionTestCase):
+    """0005 converts the old JSON float lists into float32 bytes (and back)."""
+
+    before = [("books", "0004_alter_userbookinteraction_status")]
+    after = [("books", "0005_book_embedding_binary")]
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_json_embeddings_become_float32_bytes(self):
+        apps = self._migrate(self.before)
+        OldBook = apps.get_model("books", "Book")
+        OldBook.objects.create(google_id="j1", title="JSON", embedding=[0.5, -2.0, 4.25])
+        OldBook.objects.create(google_id="j2", title="Empty", embedding=None)
+
+        apps = self._migrate(self.after)
+        NewBook = apps.get_model("books", "Book")
+        raw = NewBook.objects.get(google_id="j1").embedding
+        np.testing.assert_array_equal(np.frombuffer(raw, dtype="<f4"), [0.5, -2.0, 4.25])
+        self.assertIsNone(NewBook.objects.get(google_id="j2").embedding)
+
+        apps = self._migrate(self.before)
+        self.assertEqual(apps.get_model("books", "Book").objects.get(google_id="j1").embedding, [0.5, -2.0, 4.25])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnnIndexTests(CacheIsolationMixin, TestCase):
+    """IVF build assigns every embedded book to its nearest centroid; queries probe the closest lists."""
+
+    def setUp(self):
+        super().setUp()
+        ann._state.update(version=None, ids=None, matrix=None)
+        rng = np.random.default_rng(3)
+        # Three well separated clusters in 8 dimensions.
+        self.centers = np.eye(8, dtype=np.float32)[:3] * 10
+        books = []
+        for c, center in enumerate(self.centers):
+            for i in range(20):
+                vec = center + rng.normal(scale=0.1, size=8)
+                books.append(Book(google_id=f"c{c}-{i}", title=f"Cluster {c} #{i}", embedding=Book.embedding_to_bytes(vec)))
+        Book.objects.bulk_create(books)
+        Book.objects.create(google_id="plain", title="No embedding")
+
+    def test_build_assigns_every_embedded_book(self):
+        stats = ann.build_index(n_lists=3, seed=1)
+
+        self.assertEqual(stats, {"books": 60, "lists": 3, "dim": 8})
+        self.assertFalse(Book.objects.filter(embedding__isnull=False, ann_list__isnull=True).exists())
+        self.assertIsNone(Book.objects.get(google_id="plain").ann_list)
+        self.assertEqual(sum(EmbeddingCentroid.objects.values_list("size", flat=True)), 60)
+        # Each cluster lands in a single list.
+        for c in range(3):
+            lists = set(Book.objects.filter(google_id__startswith=f"c{c}-").values_list("ann_list", flat=True))
+            self.assertEqual(len(lists), 1)
+
+    def test_candidates_come_from_the_nearest_list(self):
+        ann.build_index(n_lists=3, seed=1)
+
+        found = ann.candidate_books(self.centers[1], exclude_ids={"c1-0"}, n_probe=1)
+        self.assertEqual({b.google_id for b in found}, {f"c1-{i}" for i in range(1, 20)})
+
+    def test_place_books_joins_the_nearest_list(self):
+        ann.build_index(n_lists=3, seed=1)
+        target = Book.objects.get(google_id="c2-0").ann_list
+        size = EmbeddingCentroid.objects.get(list_id=target).size
+
+        book = Book(google_id="new", title="Newcomer", embedding=Book.embedding_to_bytes(self.centers[2]))
+        ann.place_books([book])
+
+        self.assertEqual(book.ann_list, target)
+        self.assertEqual(EmbeddingCentroid.objects.get(list_id=target).size, size + 1)
+
+    def test_re_embedded_book_moves_between_lists(self):
+        ann.build_index(n_lists=3, seed=1)
+        book = Book.objects.get(google_id="c0-0")
+        old_list, new_list = book.ann_list, Book.objects.get(google_id="c1-0").ann_list
+        sizes = dict(EmbeddingCentroid.objects.values_list("list_id", "size"))
+
+        book.embedding = Book.embedding_to_bytes(self.centers[1])
+        ann.place_books([book])
+        Book.objects.bulk_update([book], ["embedding", "ann_list"])
+
+        self.assertEqual(book.ann_list, new_list)
+        after = dict(EmbeddingCentroid.objects.values_list("list_id", "size"))
+        self.assertEqual(after[old_list], sizes[old_list] - 1)
+        self.assertEqual(after[new_list], sizes[new_list] + 1)
+        self.assertEqual(sum(after.values()), 60)
+
+    def test_deleting_books_shrinks_their_list(self):
+        ann.build_index(n_lists=3, seed=1)
+        target = Book.objects.get(google_id="c2-0").ann_list
+
+        Book.objects.only("google_id").get(google_id="c2-0").delete()
+        Book.objects.filter(google_id__in=["c2-1", "c2-2"]).delete()
+
+        self.assertEqual(EmbeddingCentroid.objects.get(list_id=target).size, 17)
+
+    def test_sizes_never_go_negative(self):
+        ann.build_index(n_lists=3, seed=1)
+        EmbeddingCentroid.objects.update(size=0)
+
+        Book.objects.filter(google_id="c0-0").delete()
+
+        self.assertEqual(set(EmbeddingCentroid.objects.values_list("size", flat=True)), {0})
+
+    def test_sample_is_fetched_in_chunks(self):
+        with mock.patch.object(ann, "SAMPLE_FETCH_CHUNK", 7):
+            stats = ann.build_index(n_lists=3, seed=1)
+        self.assertEqual(stats["books"], 60)
+
+    def test_no_index_means_no_candidates(self):
+        self.assertEqual(ann.candidate_books(self.centers[0], exclude_ids=set()), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BackfillEmbeddingsTests(CacheIsolationMixin, TransactionTestCase):
+    """Books the provider skips on the first pass are retried, and remembered if they still fail."""
+
+    def setUp(self):
+        super().setUp()
+        for gid in ("a", "b", "c"):
+            Book.objects.create(google_id=gid, title=f"Backfill {gid}")
+
+    @staticmethod
+    def _provider(fail_times):
+        """Fake provider: a batch containing "Backfill b" fails `fail_times` times, the rest succeed."""
+        failures = []
+
+        def embed(texts):
+            if any("Backfill b" in t for t in texts) and len(failures) < fail_times:
+                failures.append(1)
+                return None
+            return [[1.0, float(len(t))] for t in texts]
+        return embed
+
+    def _run(self, provider, **options):
+        with mock.patch("backend.books.recommender._embed_texts", side_effect=provider):
+            call_command("backfill_embeddings", batch_size=1, concurrency=1, stdout=io.StringIO(), **options)
+
+    def test_failed_books_are_retried_at_the_end(self):
+        self._run(self._provider(fail_times=1))
+
+        self.assertFalse(Book.objects.filter(embedding__isnull=True).exists())
+        self.assertIsNone(cache.get("backfill_embeddings_failed"))
+        self.assertIsNone(cache.get("backfill_embeddings_cursor"))
+
+    def test_persistent_failures_are_kept_for_the_next_run(self):
+        self._run(self._provider(fail_times=2))
+
+        self.assertEqual(list(Book.objects.filter(embedding__isnull=True).values_list("google_id", flat=True)), ["b"])
+        self.assertEqual(cache.get("backfill_embeddings_failed"), ["b"])
+
+        self._run(self._provider(fail_times=0))
+        self.assertFalse(Book.objects.filter(embedding__isnull=True).exists())
+        self.assertIsNone(cache.get("backfill_embeddings_failed"))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class EmbeddingDedupeTests(CacheIsolationMixin, TestCase):
+    """Books with identical embedding text share one TextEmbedding row and one provider call."""
+
+    def _fake_embed(self, texts):
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+    def _book(self, google_id, title):
+        return Book.objects.create(google_id=google_id, title=title, authors=["Ann Author"], short_description="Same blurb")
+
+    def test_duplicate_texts_are_embedded_once(self):
+        books = [self._book("ed1", "Dune"), self._book("ed2", "Dune"), self._book("other", "Middlemarch")]
+
+        with mock.patch("backend.books.recommender._embed_texts", side_effect=self._fake_embed) as embed:
+            saved = generate_book_embeddings(books)
+
+        self.assertEqual(saved, 3)
+        embed.assert_called_once()
+        self.assertEqual(len(embed.call_args.args[0]), 2)
+        self.assertEqual(TextEmbedding.objects.count(), 2)
+        stored = {b.google_id: bytes(b.embedding) for b in Book.objects.all()}
+        self.assertEqual(stored["ed1"], stored["ed2"])
+        self.assertNotEqual(stored["ed1"], stored["other"])
+
+    def test_known_text_skips_the_provider(self):
+        with mock.patch("backend.books.recommender._embed_texts", side_effect=self._fake_embed):
+            generate_book_embeddings([self._book("ed1", "Dune")])
+
+        with mock.patch("backend.books.recommender._embed_texts") as embed:
+            saved = generate_book_embeddings([self._book("ed2", "Dune")])
+
+        self.assertEqual(saved, 1)
+        embed.assert_not_called()
+        self.assertTrue(Book.objects.get(google_id="ed2").has_embedding())
+
+    def test_failed_provider_saves_nothing(self):
+        book = self._book("ed1", "Dune")
+
+        with mock.patch("backend.books.recommender._embed_texts", return_value=None):
+            self.assertEqual(generate_book_embeddings([book]), 0)
+
+        self.assertFalse(TextEmbedding.objects.exists())
+        self.assertFalse(Book.objects.get(google_id="ed1").has_embedding())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TasteVectorTests(CacheIsolationMixin, TestCase):
+    """Shelving signals keep the running taste sum equal to a full rebuild."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(email="reader@example.com", password="pw")
+        self.vectors = {
+            "a": np.array([1.0, 0.0, 2.0], dtype=EMBEDDING_DTYPE),
+            "b": np.array([0.0, 3.0, 1.0], dtype=EMBEDDING_DTYPE),
+        }
+        for gid, vec in self.vectors.items():
+            Book.objects.create(google_id=gid, title=gid.upper(), embedding=Book.embedding_to_bytes(vec))
+        rebuild_taste_vector(self.user)
+
+    def _taste(self):
+        return UserTasteVector.objects.get(user=self.user)
+
+    def _shelve(self, gid, status=UserBookInteraction.Status.READ):
+        return UserBookInteraction.objects.create(user=self.user, book_id=gid, status=status)
+
+    def test_shelving_adds_embeddings(self):
+        self._shelve("a")
+        self._shelve("b", UserBookInteraction.Status.WILL_READ)
+
+        taste = self._taste()
+        self.assertEqual(taste.count, 2)
+        np.testing.assert_allclose(taste.get_sum(), self.vectors["a"] + self.vectors["b"])
+        np.testing.assert_allclose(taste.mean(), (self.vectors["a"] + self.vectors["b"]) / 2)
+
+    def test_unshelving_and_deleting_remove_embeddings(self):
+        first = self._shelve("a")
+        second = self._shelve("b")
+
+        first.status = None
+        first.save()
+        taste = self._taste()
+        self.assertEqual(taste.count, 1)
+        np.testing.assert_allclose(taste.get_sum(), self.vectors["b"])
+
+        second.delete()
+        taste = self._taste()
+        self.assertEqual(taste.count, 0)
+        self.assertIsNone(taste.get_sum())
+
+    def test_moving_between_shelves_changes_nothing(self):
+        interaction = self._shelve("a", UserBookInteraction.Status.READING)
+        interaction = UserBookInteraction.objects.get(pk=interaction.pk)
+        interaction.status = UserBookInteraction.Status.READ
+        interaction.save()
+
+        self.assertEqual(self._taste().count, 1)
+
+    def test_running_sum_matches_rebuild(self):
+        self._shelve("a")
+        interaction = self._shelve("b")
+        interaction.delete()
+        self._shelve("b", UserBookInteraction.Status.READING)
+        incremental = self._taste()
+
+        rebuilt = rebuild_taste_vector(self.user)
+        self.assertEqual(incremental.count, rebuilt.count)
+        np.testing.assert_allclose(incremental.get_sum(), rebuilt.get_sum())
+
+    def test_late_embedding_is_folded_in(self):
+        Book.objects.create(google_id="c", title="C")
+        self._shelve("c")
+        self.assertEqual(self._taste().count, 0)
+
+        book = Book.objects.get(google_id="c")
+        book.embedding = Book.embedding_to_bytes(np.ones(3))
+        add_books_to_tastes([book])
+
+        taste = self._taste()
+        self.assertEqual(taste.count, 1)
+        np.testing.assert_allclose(taste.get_sum(), np.ones(3))
+
+    def test_users_without_taste_vector_are_skipped(self):
+        other = get_user_model().objects.create_user(email="new@example.com", password="pw")
+        UserBookInteraction.objects.create(user=other, book_id="a", status=UserBookInteraction.Status.READ)
+
+        self.assertFalse(UserTasteVector.objects.filter(user=other).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class HeuristicRecommendationTests(CacheIsolationMixin, TestCase):
+    """The SQL facet ranking must match the Python author/genre scorer plus rating bonus."""
+
+    def test_sql_ranking_matches_python_scoring(self):
+        rng = random.Random(11)
+        authors = ["A", "B", "C", "D"]
+        categories = ["Fiction", "History", "Poetry"]
+        ratings = [None, 0.0, 1.5, 3.0, 4.2]
+        books = [
+            Book.objects.create(
+                google_id=f"h{i:02d}",
+                title=f"Book {i}",
+                authors=rng.sample(authors, rng.randint(0, 2)),
+                categories=rng.sample(categories, rng.randint(0, 2)),
+                average_rating=rng.choice(ratings),
+            )
+            for i in range(40)
+        ]
+        interacted = [Book(google_id="seed", authors=["A", "B"], categories=["Poetry"])]
+        exclude = {"h00", "h01"}
+
+        interacted_authors, interacted_categories = _interest_sets(interacted)
+        expected = []
+        for book in books:
+            score = _score_by_author_genre(book, interacted_authors, interacted_categories)
+            if book.google_id in exclude or not score:
+                continue
+            if book.average_rating:
+                score += min(book.average_rating / 10.0, 0.2)
+            expected.append((-score, book.google_id))
+        expected = [gid for _, gid in sorted(expected)[:10]]
+
+        self.assertEqual(_heuristic_recommendations(interacted, exclude, top_n=10), expected)
+
+    def test_no_interests_means_no_recommendations(self):
+        Book.objects.create(google_id="x", title="X", authors=["A"])
+        self.assertEqual(_heuristic_recommendations([Book(google_id="seed")], set(), top_n=5), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BatchRecommendationTests(CacheIsolationMixin, TestCase):
+    """Batched scoring against the shared matrix ranks like the single-user path."""
+
+    def setUp(self):
+        super().setUp()
+        ann._state.update(version=None, ids=None, matrix=None)
+        recommender._candidate_matrix.update(loaded_at=0.0, ids=None, matrix=None, bonus=None, row_of=None)
+        rng = np.random.default_rng(11)
+        Book.objects.bulk_create([
+            Book(
+                google_id=f"r{i}",
+                title=f"Ranked {i}",
+                average_rating=[None, 1.0, 3.5, 4.8][i % 4],
+                embedding=Book.embedding_to_bytes(rng.normal(size=8)),
+            )
+            for i in range(80)
+        ])
+        User = get_user_model()
+        # More users than USER_SCORING_BATCH, so at least two matrix products run.
+        self.users = [User.objects.create_user(email=f"batch{i}@example.com", password=None) for i in range(40)]
+        for user in self.users:
+            for gid in rng.choice(80, size=3, replace=False):
+                UserBookInteraction.objects.create(user=user, book_id=f"r{gid}", status=UserBookInteraction.Status.READ)
+
+    def test_batched_ranking_matches_single_user_path(self):
+        results = recommend_for_users(self.users, top_n=10)
+
+        self.assertEqual(set(results), {u.id for u in self.users})
+        for user in self.users:
+            with self.subTest(user=user.email):
+                shelved = set(UserBookInteraction.objects.filter(user=user).values_list("book_id", flat=True))
+                self.assertFalse(shelved & set(results[user.id]))
+                self.assertEqual(results[user.id], _compute_recommendations_for_user(user, top_n=10))
+
+    def test_matrix_is_reused_until_a_newer_run_starts(self):
+        recommend_for_users(self.users[:1])
+        target = UserTasteVector.objects.get(user=self.users[0]).mean()
+        Book.objects.create(
+            google_id="late", title="Embedded mid-run", average_rating=4.8,
+            embedding=Book.embedding_to_bytes(target),
+        )
+
+        self.assertNotIn("late", recommend_for_users(self.users[:1])[self.users[0].id])
+        fresh = recommend_for_users(self.users[:1], loaded_after=time.time())
+        self.assertEqual(fresh[self.users[0].id][0], "late")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PrecomputeRecommendationsTaskTests(CacheIsolationMixin, TestCase):
+    """The nightly task picks recently active users, chunks them and reports throughput."""
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        now = timezone.now()
+        User.objects.bulk_create(
+            [User(email=f"active{i}@example.com", last_login=now) for i in range(450)]
+            + [User(email=f"idle{i}@example.com", last_login=now - timedelta(days=30)) for i in range(5)]
+            + [User(email=f"never{i}@example.com") for i in range(3)]
+        )
+        self.active_ids = set(User.objects.filter(email__startswith="active").values_list("id", flat=True))
+
+    def test_active_users_are_chunked_and_reported(self):
+        chunks = []
+
+        def fake_recommend(users, top_n, loaded_after):
+            chunks.append([u.id for u in users])
+            return {u.id: [f"pick-{u.id}"] for u in users}
+
+        with mock.patch("backend.books.tasks.recommend_for_users", side_effect=fake_recommend):
+            queued = precompute_recommendations_task()
+
+        self.assertEqual(queued, 450)
+        self.assertEqual(sorted(len(c) for c in chunks), [50, 200, 200])
+        self.assertEqual({uid for c in chunks for uid in c}, self.active_ids)
+        # LocMem culls past 300 keys; the last chunk written is always still there.
+        last_id = max(self.active_ids)
+        self.assertEqual(cache.get(f"user_recommendations_{last_id}"), [f"pick-{last_id}"])
+
+        summary = cache.get(PRECOMPUTE_LAST_RUN_KEY)
+        self.assertEqual((summary["users"], summary["requested"]), (450, 450))
+        self.assertIn("users_per_second", summary)
+
+    def test_no_active_users_is_a_no_op(self):
+        get_user_model().objects.filter(email__startswith="active").delete()
+
+        with mock.patch("backend.books.tasks.recommend_for_users") as recommend:
+            self.assertEqual(precompute_recommendations_task(), 0)
+
+        recommend.assert_not_called()
+        self.assertIsNone(cache.get(PRECOMPUTE_LAST_RUN_KEY))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SingleFlightTests(CacheIsolationMixin, SimpleTestCase):
+    """Concurrent identical calls share one upstream call; failures are never shared through the cache."""
+
+    def _counting(self, result, delay=0.0):
+        calls = []
+
+        def fn():
+            calls.append(1)
+            time.sleep(delay)
+            return result
+        return fn, calls
+
+    def test_concurrent_threads_share_one_call(self):
+        fn, calls = self._counting({"items": [1]}, delay=0.2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(caching.single_flight("k", fn))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"items": [1]}] * 5)
+
+    def test_successful_result_is_reused_across_processes(self):
+        fn, calls = self._counting(["ok"])
+        caching.single_flight("k", fn)
+        self.assertEqual(caching.single_flight("k", fn), ["ok"])
+        self.assertEqual(len(calls), 1)
+
+    def test_error_results_are_not_published(self):
+        for n, result in enumerate(({"error": "quota"}, None, [])):
+            fn, calls = self._counting(result)
+            caching.single_flight(f"k{n}", fn)
+            self.assertEqual(caching.single_flight(f"k{n}", fn), result)
+            self.assertEqual(len(calls), 2)
+
+    def test_follower_waits_for_other_process_leader(self):
+        cache.add("sf_lock_k", "other-process", 30)
+        fn, calls = self._counting("mine")
+
+        def publish():
+            time.sleep(0.1)
+            cache.set("sf_result_k", {"value": "theirs"}, 30)
+        threading.Thread(target=publish).start()
+
+        self.assertEqual(caching.single_flight("k", fn, wait=2), "theirs")
+        self.assertEqual(calls, [])
+
+    def test_follower_calls_upstream_when_leader_gives_up(self):
+        cache.add("sf_lock_k", "other-process", 30)
+        fn, calls = self._counting("mine")
+        threading.Timer(0.1, cache.delete, args=["sf_lock_k"]).start()
+
+        self.assertEqual(caching.single_flight("k", fn, wait=2), "mine")
+        self.assertEqual(len(calls), 1)
+
+    def test_lock_ttl_covers_worst_case_http_call(self):
+        with override_settings(OUTBOUND_HTTP={}):
+            # Request budget: (1.5 + 3) x 2 attempts + 0.25 backoff = 9.25s.
+            self.assertEqual(caching.single_flight_lock_ttl(), 10 + caching.SINGLE_FLIGHT_LOCK_MARGIN)
+            # Background budget: (3.05 + 10) x 4 attempts + 0.5 + 1 + 2 backoff = 55.7s.
+            with mock.patch.object(http_client, "_profile", http_client.BACKGROUND):
+                self.assertEqual(caching.single_flight_lock_ttl(), 56 + caching.SINGLE_FLIGHT_LOCK_MARGIN)
+        with override_settings(OUTBOUND_HTTP={"REQUEST": {"TIMEOUT": 2, "RETRIES": 1, "BACKOFF_FACTOR": 1}}):
+            self.assertEqual(caching.single_flight_lock_ttl(), 5 + caching.SINGLE_FLIGHT_LOCK_MARGIN)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StaleWhileRevalidateTests(CacheIsolationMixin, SimpleTestCase):
+    """Cold keys build inline; stale keys are served at once and refreshed in the background."""
+
+    KEY = "test_swr_section"
+
+    def setUp(self):
+        super().setUp()
+        self.builds = []
+        caching.swr_builder(self.KEY, soft_ttl=60, hard_ttl=600)(self._build)
+        patcher = mock.patch("backend.books.tasks.refresh_cached_section_task.delay")
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(caching._swr_registry.pop, self.KEY, None)
+
+    def _build(self):
+        self.builds.append(1)
+        return ["fresh"]
+
+    def test_cold_key_is_built_inline_once(self):
+        self.assertEqual(caching.swr_get(self.KEY), (["fresh"], False))
+        self.assertEqual(caching.swr_get(self.KEY), (["fresh"], True))
+        self.assertEqual(len(self.builds), 1)
+        self.delay.assert_not_called()
+
+    def test_stale_value_is_served_and_refreshed_once(self):
+        cache.set(self.KEY, {"value": ["stale"], "soft_expires": time.time() - 1}, 600)
+
+        self.assertEqual(caching.swr_get(self.KEY), (["stale"], True))
+        self.assertEqual(caching.swr_get(self.KEY), (["stale"], True))
+        self.delay.assert_called_once_with(self.KEY)
+        self.assertEqual(self.builds, [])
+
+    def test_refresh_task_rebuilds_and_releases_lock(self):
+        from backend.books.tasks import refresh_cached_section_task
+
+        cache.set(self.KEY, {"value": ["stale"], "soft_expires": time.time() - 1}, 600)
+        caching.swr_get(self.KEY)
+        refresh_cached_section_task(self.KEY)
+
+        self.assertEqual(caching.swr_get(self.KEY), (["fresh"], True))
+        self.assertIsNone(cache.get(f"swr_refresh_{self.KEY}"))
+        self.assertGreater(cache.get(self.KEY)["soft_expires"], time.time())
+
+
+    def test_empty_refresh_keeps_the_previous_copy(self):
+        cache.set(self.KEY, {"value": ["stale"], "soft_expires": time.time() - 1}, 600)
+        self._build = lambda: []
+        caching.swr_builder(self.KEY, soft_ttl=60, hard_ttl=600)(self._build)
+
+        self.assertEqual(caching.swr_refresh(self.KEY), [])
+        self.assertEqual(cache.get(self.KEY)["value"], ["stale"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class HomeBuildDeadlineTests(CacheIsolationMixin, SimpleTestCase):
+    """A home build with a missing section is never cached as fresh."""
+
+    def _sections(self, slow=()):
+        def section(name):
+            def fetch(limit):
+                if name in slow:
+                    time.sleep(0.5)
+                return [{"title": name}]
+            return fetch
+        return mock.patch.multiple(
+            "backend.books.services",
+            get_genre_top_books=section("carousel"),
+            get_recent_books=section("recent"),
+            get_popular_now_books=section("bestsellers"),
+        )
+
+    def test_outer_deadline_leaves_headroom_for_inner_fan_outs(self):
+        self.assertGreater(services.NESTED_FANOUT_DEADLINE, 2 * services.FANOUT_DEADLINE)
+
+    def test_complete_build_has_every_section(self):
+        with self._sections():
+            home = services.build_home_books()
+        self.assertEqual(set(home), set(services.HOME_SECTIONS))
+
+    def test_section_past_the_deadline_keeps_the_previous_copy(self):
+        previous = {"carousel": ["old"], "recent": ["old"], "bestsellers": ["old"]}
+        cache.set("home_books_combined_v2", {"value": previous, "soft_expires": time.time() - 1}, 600)
+
+        with self._sections(slow={"recent"}), mock.patch.object(services, "NESTED_FANOUT_DEADLINE", 0.1):
+            self.assertIsNone(services.build_home_books())
+            self.assertIsNone(caching.swr_refresh("home_books_combined_v2"))
+
+        self.assertEqual(cache.get("home_books_combined_v2")["value"], previous)
+
+
+class HttpClientTests(SimpleTestCase):
+    """Request threads get a short retry budget; Celery workers a long one; sessions never cross a fork."""
+
+    def setUp(self):
+        self.addCleanup(setattr, http_client, "_profile", http_client._profile)
+        self.addCleanup(http_client._sessions.clear)
+        http_client._profile = http_client.REQUEST
+        http_client._sessions.clear()
+
+    @staticmethod
+    def _retry(session):
+        return session.get_adapter("https://www.googleapis.com").max_retries
+
+    def test_request_budget_stays_under_ten_seconds(self):
+        self.assertLess(http_client.max_request_seconds(profile=http_client.REQUEST), 10)
+        self.assertGreater(
+            http_client.max_request_seconds(profile=http_client.BACKGROUND),
+            http_client.max_request_seconds(profile=http_client.REQUEST),
+        )
+
+    def test_max_request_seconds_adds_attempts_and_backoff(self):
+        with override_settings(OUTBOUND_HTTP={"TIMEOUT": (1, 2), "RETRIES": 2, "BACKOFF_FACTOR": 0.5}):
+            # 3 attempts x 3s + 0.5s + 1s of backoff
+            self.assertEqual(http_client.max_request_seconds(profile=http_client.BACKGROUND), 10.5)
+            self.assertEqual(http_client.max_request_seconds(timeout=4, profile=http_client.BACKGROUND), 13.5)
+
+    def test_request_threads_never_retry_429_or_sleep_on_retry_after(self):
+        retry = self._retry(http_client.get_session())
+
+        self.assertNotIn(429, retry.status_forcelist)
+        self.assertFalse(retry.respect_retry_after_header)
+        self.assertEqual(retry.total, http_client._config()["RETRIES"])
+
+    def test_background_budget_retries_rate_limits(self):
+        http_client.use_background_budget()
+        retry = self._retry(http_client.get_session())
+
+        self.assertIn(429, retry.status_forcelist)
+        self.assertTrue(retry.respect_retry_after_header)
+        self.assertEqual(http_client._config()["TIMEOUT"], settings.OUTBOUND_HTTP["TIMEOUT"])
+
+    def test_one_session_per_process(self):
+        first = http_client.get_session()
+        self.assertIs(http_client.get_session(), first)
+
+        with mock.patch("backend.books.http_client.os.getpid", return_value=-1):
+            forked = http_client.get_session()
+        self.assertIsNot(forked, first)
+
+    def test_get_uses_the_current_budget_timeout(self):
+        with mock.patch.object(http_client.requests.Session, "get") as session_get:
+            http_client.get("https://example.com", params={"q": "x"})
+        session_get.assert_called_once_with(
+            "https://example.com", params={"q": "x"}, timeout=http_client._config()["TIMEOUT"]
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocalTierTests(CacheIsolationMixin, SimpleTestCase):
+    """The per-process LRU hands out copies, evicts oldest entries and honours the shared epoch."""
+
+    def test_callers_get_independent_copies(self):
+        caching.local_set("k", {"items": [1, 2]}, timeout=60)
+
+        first = caching.local_get("k")
+        first["items"].append(3)
+
+        self.assertEqual(caching.local_get("k"), {"items": [1, 2]})
+        self.assertIsNot(caching.local_get("k"), caching.local_get("k"))
+
+    def test_serves_local_copy_without_shared_cache(self):
+        caching.local_set("k", "v", timeout=60)
+        cache.delete("k")
+        self.assertEqual(caching.local_get("k"), "v")
+
+    def test_read_through_fills_local_tier(self):
+        cache.set("k", "shared", 60)
+        self.assertEqual(caching.local_get("k"), "shared")
+        self.assertIn("k", caching._local)
+        self.assertEqual(caching.local_get("missing", "default"), "default")
+
+    def test_evicts_least_recently_used(self):
+        with mock.patch.object(caching, "LOCAL_CACHE_MAX_ENTRIES", 2):
+            caching.local_set("a", 1, timeout=60)
+            caching.local_set("b", 2, timeout=60)
+            caching.local_get("a")
+            caching.local_set("c", 3, timeout=60)
+
+        self.assertEqual(list(caching._local), ["a", "c"])
+
+    def test_epoch_bump_drops_local_copies(self):
+        caching.local_set("k", "old", timeout=60)
+        cache.set("k", "new", 60)
+
+        caching.bump_local_epoch()
+
+        self.assertEqual(caching.local_get("k"), "new")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TagInvalidationTests(CacheIsolationMixin, TestCase):
+    """Bumping a tag retires every key built on it without touching unrelated entries."""
+
+    def test_bump_changes_only_dependent_keys(self):
+        book_key = caching.tagged_key("detail", "book:1")
+        both_key = caching.tagged_key("detail", "book:1", "user:7")
+        other_key = caching.tagged_key("detail", "book:2")
+
+        caching.bump_tags("book:1")
+
+        self.assertNotEqual(caching.tagged_key("detail", "book:1"), book_key)
+        self.assertNotEqual(caching.tagged_key("detail", "book:1", "user:7"), both_key)
+        self.assertEqual(caching.tagged_key("detail", "book:2"), other_key)
+
+    def test_bump_from_another_process_is_seen_at_once(self):
+        key = caching.tagged_key("detail", "book:1")
+        caching.local_set(key, "old", timeout=60)
+
+        # Another process bumps the tag: only the shared cache changes.
+        cache.incr(caching._tag_version_key("book:1"))
+
+        fresh_key = caching.tagged_key("detail", "book:1")
+        self.assertNotEqual(fresh_key, key)
+        self.assertIsNone(caching.local_get(fresh_key))
+
+    def test_bump_keeps_other_local_entries_warm(self):
+        caching.local_set("unrelated", "warm", timeout=60)
+        cache.delete("unrelated")
+
+        caching.bump_tags("book:1")
+
+        self.assertEqual(caching.local_get("unrelated"), "warm")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheWarmingTests(CacheIsolationMixin, TestCase):
+    """Warming refreshes sections about to go stale and re-fetches the most requested Explore pages."""
+
+    def setUp(self):
+        super().setUp()
+        self.built = []
+        for key in ("warm_fresh", "warm_due", "warm_cold"):
+            caching.swr_builder(key, soft_ttl=3600, hard_ttl=7200)(lambda key=key: self.built.append(key) or [key])
+            self.addCleanup(caching._swr_registry.pop, key, None)
+
+    def _warm(self, **config):
+        config = {"KEYS": ["warm_fresh", "warm_due", "warm_cold"], "REFRESH_AHEAD_SECONDS": 600, **config}
+        with override_settings(CACHE_WARMING=config):
+            return warming.warm_caches()
+
+    def test_only_sections_inside_the_refresh_ahead_window_are_rebuilt(self):
+        cache.set("warm_fresh", {"value": ["old"], "soft_expires": time.time() + 3000}, 7200)
+        cache.set("warm_due", {"value": ["old"], "soft_expires": time.time() + 300}, 7200)
+
+        summary = self._warm()
+
+        self.assertEqual(summary["fresh"], ["warm_fresh"])
+        self.assertEqual(summary["refreshed"], ["warm_due", "warm_cold"])
+        self.assertEqual(self.built, ["warm_due", "warm_cold"])
+
+    def test_top_requested_pages_are_warmed_and_misses_counted(self):
+        for value, hits in [("dune", 9), ("emma", 5), ("ulysses", 3), ("stale", 50)]:
+            ExploreQueryStat.objects.create(kind=ExploreQueryStat.Kind.SEARCH, value=value, hits=hits)
+        ExploreQueryStat.objects.filter(value="stale").update(last_requested=timezone.now() - timedelta(days=30))
+        pages = {
+            "dune": {"results": [{"title": "Dune"}]},
+            "emma": {"results": [{"title": "Emma"}], "source": "local"},
+            "ulysses": {"results": []},
+        }
+
+        with mock.patch.object(warming, "build_explore_page", side_effect=lambda q, g, p, s: pages[q]) as build:
+            summary = self._warm(KEYS=[], TOP_QUERIES=3, TOP_GENRES=0)
+
+        self.assertEqual(sorted(c.args[0] for c in build.call_args_list), ["dune", "emma", "ulysses"])
+        self.assertEqual((summary["explore_pages"], summary["explore_local"], summary["explore_failed"]), (1, 1, 1))
+        self.assertEqual(cache.get(explore_cache_key(query="dune", page=1, page_size=12)), pages["dune"])
+        self.assertIsNone(cache.get(explore_cache_key(query="ulysses", page=1, page_size=12)))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExploreStatsTests(CacheIsolationMixin, TestCase):
+    """Request counts go to per-minute cache buckets and are folded into the DB once settled."""
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1_000_000.0
+        patcher = mock.patch("backend.books.warming.time.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _hits(self):
+        return dict(ExploreQueryStat.objects.values_list("value", "hits"))
+
+    def test_settled_buckets_are_flushed_once(self):
+        for _ in range(3):
+            warming.record_explore_request(ExploreQueryStat.Kind.SEARCH, "  Dune ")
+        warming.record_explore_request(ExploreQueryStat.Kind.GENRE, "History")
+        self.now += 60
+        warming.record_explore_request(ExploreQueryStat.Kind.SEARCH, "dune")
+
+        # Nothing has settled yet: requests never write to the DB themselves.
+        self.assertEqual(warming.flush_explore_stats(), 0)
+        self.assertEqual(self._hits(), {})
+
+        self.now += 3 * 60
+        warming.flush_explore_stats()
+        self.assertEqual(self._hits(), {"dune": 4, "history": 1})
+
+        warming.flush_explore_stats()
+        self.assertEqual(self._hits(), {"dune": 4, "history": 1})
+
+        warming.record_explore_request(ExploreQueryStat.Kind.SEARCH, "dune")
+        self.now += 3 * 60
+        warming.flush_explore_stats()
+        self.assertEqual(self._hits(), {"dune": 5, "history": 1})
+
+    def test_concurrent_flush_is_skipped(self):
+        warming.record_explore_request(ExploreQueryStat.Kind.SEARCH, "dune")
+        self.now += 3 * 60
+        cache.add(warming.STATS_FLUSH_LOCK_KEY, True, 60)
+
+        self.assertEqual(warming.flush_explore_stats(), 0)
+        self.assertEqual(self._hits(), {})
+
+
+class CompressedPickleSerializerTests(SimpleTestCase):
+    """Redis values round-trip; ints stay raw for INCR and large pickles are zlib-compressed."""
+
+    def setUp(self):
+        self.serializer = CompressedPickleSerializer()
+
+    def _round_trip(self, value):
+        return self.serializer.loads(self.serializer.dumps(value))
+
+    def test_ints_are_stored_raw(self):
+        for value in (0, 7, -3, 2 ** 40):
+            with self.subTest(value=value):
+                self.assertIs(self.serializer.dumps(value), value)
+                # redis-py hands INCR'd values back as bytes.
+                self.assertEqual(self.serializer.loads(str(value).encode()), value)
+        # bool is an int subclass but must keep its type.
+        self.assertIs(self._round_trip(True), True)
+
+    def test_small_values_are_plain_pickles(self):
+        value = {"title": "Dune", "authors": ["Frank Herbert"]}
+        data = self.serializer.dumps(value)
+
+        self.assertTrue(data.startswith(b"P"))
+        self.assertEqual(pickle.loads(data[1:]), value)
+        self.assertEqual(self._round_trip(value), value)
+
+    def test_compression_starts_at_the_threshold(self):
+        below = "x" * (COMPRESS_MIN_BYTES - 100)
+        above = "x" * (COMPRESS_MIN_BYTES + 100)
+
+        self.assertTrue(self.serializer.dumps(below).startswith(b"P"))
+        packed = self.serializer.dumps(above)
+        self.assertTrue(packed.startswith(b"Z"))
+        self.assertLess(len(packed), COMPRESS_MIN_BYTES)
+        self.assertEqual(self._round_trip(above), above)
+
+    def test_incompressible_values_stay_plain(self):
+        value = os.urandom(4 * COMPRESS_MIN_BYTES)
+        self.assertTrue(self.serializer.dumps(value).startswith(b"P"))
+        self.assertEqual(self._round_trip(value), value)
+
+    def test_reads_entries_written_by_the_default_serializer(self):
+        value = {"results": ["a"] * 500}
+        self.assertEqual(self.serializer.loads(RedisSerializer().dumps(value)), value)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SharedBookDetailTests(CacheIsolationMixin, TestCase):
+    """Every viewer shares one cached detail payload; shelf status is overlaid per request."""
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.alice = User.objects.create_user(email="alice@example.com", password=None)
+        self.bob = User.objects.create_user(email="bob@example.com", password=None)
+        self.book = Book.objects.create(google_id="shared", title="Shared")
+        UserBookInteraction.objects.create(
+            user=self.alice, book=self.book, status=UserBookInteraction.Status.READING, is_favorite=True,
+        )
+
+    def test_users_share_one_entry_without_each_others_overlay(self):
+        alice_view = get_full_book_details("shared", user=self.alice)
+        with self.assertNumQueries(1):  # only Bob's overlay lookup
+            bob_view = get_full_book_details("shared", user=self.bob)
+
+        self.assertEqual(
+            alice_view["user_interaction"], {"status": UserBookInteraction.Status.READING, "is_favorite": True}
+        )
+        self.assertIsNone(bob_view["user_interaction"])
+        self.assertEqual(bob_view["book"], alice_view["book"])
+
+        shared = cache.get(book_detail_cache_key("shared"))
+        self.assertNotIn("user_interaction", shared)
+        self.assertNotIn("is_favorite", str(shared))
+
+    def test_one_viewers_changes_never_reach_another(self):
+        alice_view = get_full_book_details("shared", user=self.alice)
+        alice_view["book"]["title"] = "Mutated"
+
+        bob_view = get_full_book_details("shared", user=self.bob)
+        anonymous_view = get_full_book_details("shared")
+
+        self.assertEqual(bob_view["book"]["title"], "Shared")
+        self.assertIsNone(anonymous_view["user_interaction"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReviewPaginationTests(CacheIsolationMixin, TestCase):
+    """Keyset pages walk every review once, newest first, even across equal timestamps."""
+
+    def setUp(self):
+        super().setUp()
+        self.book = Book.objects.create(google_id="rev", title="Reviewed")
+        User = get_user_model()
+        start = timezone.now()
+        for i in range(25):
+            user = User.objects.create_user(email=f"r{i}@example.com", password=None)
+            review = Review.objects.create(user=user, book=self.book, rating=1 + i % 5)
+            # Groups of three share a timestamp, so the id tie-breaker matters.
+            Review.objects.filter(pk=review.pk).update(created_at=start - timezone.timedelta(minutes=i // 3))
+
+    def test_cursor_round_trip(self):
+        review = Review.objects.first()
+        self.assertEqual(decode_review_cursor(encode_review_cursor(review)), (review.created_at, review.id))
+
+    def test_pages_cover_every_review_in_order(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = paginate_reviews(self.book.pk, cursor=cursor, page_size=10)
+            seen.extend(r.id for r in page)
+            if cursor is None:
+                break
+
+        expected = list(Review.objects.filter(book=self.book).order_by("-created_at", "id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_last_full_page_has_no_cursor(self):
+        page, cursor = paginate_reviews(self.book.pk, page_size=25)
+        self.assertEqual(len(page), 25)
+        self.assertIsNone(cursor)
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ("not-base64!", "bm9waXBl", encode_review_cursor(Review.objects.first())[:-4]):
+            with self.assertRaises(ValueError):
+                decode_review_cursor(cursor)
+
+        client = APIClient()
+        response = client.get(f"/api/v1/create-review/{self.book.pk}/", {"cursor": "bm9waXBl"})
+        self.assertEqual(response.status_code, 400)
+
+        response = client.get(f"/api/v1/create-review/{self.book.pk}/", {"page_size": 5})
+        self.assertEqual(len(response.json()["results"]), 5)
+        self.assertIsNotNone(response.json()["next_cursor"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RatingAggregateTests(CacheIsolationMixin, TestCase):
+    """Review signals keep Book's stored count, sum and histogram equal to the Review rows."""
+
+    def setUp(self):
+        super().setUp()
+        self.book = Book.objects.create(google_id="agg", title="Aggregated")
+        User = get_user_model()
+        self.users = [User.objects.create_user(email=f"a{i}@example.com", password=None) for i in range(3)]
+
+    def _assert_totals(self, count, total, histogram):
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.review_count, count)
+        self.assertEqual(self.book.rating_sum, total)
+        self.assertEqual(self.book.rating_histogram, {star: histogram.get(star, 0) for star in range(1, 6)})
+
+    def test_create_rerate_and_delete(self):
+        first = Review.objects.create(user=self.users[0], book=self.book, rating=5)
+        Review.objects.create(user=self.users[1], book=self.book, rating=3)
+        self._assert_totals(2, 8, {5: 1, 3: 1})
+        self.assertEqual(self.book.review_average, 4.0)
+
+        first.rating = 2
+        first.save()
+        self._assert_totals(2, 5, {2: 1, 3: 1})
+
+        # Re-rating an instance that wasn't loaded from the DB.
+        stale = Review(pk=first.pk, user=self.users[0], book=self.book, rating=4, created_at=first.created_at)
+        stale.save()
+        self._assert_totals(2, 7, {4: 1, 3: 1})
+
+        Review.objects.get(pk=first.pk).delete()
+        self._assert_totals(1, 3, {3: 1})
+
+    def test_saving_without_rating_change_keeps_totals(self):
+        review = Review.objects.create(user=self.users[0], book=self.book, rating=4)
+        review.comment = "Still a four."
+        review.save()
+        self._assert_totals(1, 4, {4: 1})
+
+    def test_removing_from_drifted_aggregates_clamps_at_zero(self):
+        review = Review.objects.create(user=self.users[0], book=self.book, rating=3)
+        Book.objects.filter(pk=self.book.pk).update(review_count=0, rating_sum=1, rating_3=0)
+
+        review.rating = 4
+        review.save()
+        self._assert_totals(0, 2, {4: 1})
+
+        review.delete()
+        self._assert_totals(0, 0, {})
+
+    def test_recompute_fixes_drift_and_busts_detail_cache(self):
+        Review.objects.create(user=self.users[0], book=self.book, rating=5)
+        Review.objects.create(user=self.users[1], book=self.book, rating=1)
+        empty = Book.objects.create(google_id="empty", title="Empty")
+        Book.objects.filter(pk=self.book.pk).update(review_count=9, rating_sum=1, rating_5=0)
+        Book.objects.filter(pk=empty.pk).update(review_count=2, rating_sum=6, rating_3=2)
+        untouched = Book.objects.create(google_id="fine", title="Fine")
+        Review.objects.create(user=self.users[2], book=untouched, rating=4)
+        detail_key = book_detail_cache_key(self.book.pk)
+        fine_key = book_detail_cache_key(untouched.pk)
+
+        self.assertEqual(recompute_rating_aggregates(batch_size=1), 2)
+
+        self._assert_totals(2, 6, {5: 1, 1: 1})
+        empty.refresh_from_db()
+        self.assertEqual((empty.review_count, empty.rating_sum, empty.rating_3), (0, 0, 0))
+        self.assertNotEqual(book_detail_cache_key(self.book.pk), detail_key)
+        self.assertEqual(book_detail_cache_key(untouched.pk), fine_key)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LibraryShelfPageTests(CacheIsolationMixin, TestCase):
+    """Each shelf pages newest first by interaction id; the API pages one shelf at a time."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(email="shelf@example.com", password=None)
+        for i in range(7):
+            book = Book.objects.create(google_id=f"l{i}", title=f"Library {i}")
+            status = UserBookInteraction.Status.READ if i % 2 else UserBookInteraction.Status.WILL_READ
+            UserBookInteraction.objects.create(user=self.user, book=book, status=status, is_favorite=i < 3)
+
+    def _walk(self, shelf, page_size):
+        ids, cursor = [], None
+        while True:
+            page, cursor = library_shelf_page(self.user, shelf, cursor=cursor, page_size=page_size)
+            ids.extend(i.book_id for i in page)
+            if cursor is None:
+                return ids
+
+    def test_shelves_walk_newest_first(self):
+        self.assertEqual(self._walk("will_read", 2), ["l6", "l4", "l2", "l0"])
+        self.assertEqual(self._walk("read", 2), ["l5", "l3", "l1"])
+        self.assertEqual(self._walk("favorites", 3), ["l2", "l1", "l0"])
+        self.assertEqual(self._walk("reading", 5), [])
+
+    def test_api_pages_a_single_shelf(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        first = client.get("/api/v1/my-library/", {"page_size": 2}).json()
+        self.assertEqual([i["book"]["google_id"] for i in first["library"]["will_read"]], ["l6", "l4"])
+        self.assertIsNone(first["next_cursors"]["reading"])
+
+        cursor = first["next_cursors"]["will_read"]
+        more = client.get("/api/v1/my-library/", {"shelf": "will_read", "cursor": cursor, "page_size": 2}).json()
+        self.assertEqual(list(more["library"]), ["will_read"])
+        self.assertEqual([i["book"]["google_id"] for i in more["library"]["will_read"]], ["l2", "l0"])
+
+    def test_api_rejects_bad_shelf_and_cursor(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        self.assertEqual(client.get("/api/v1/my-library/", {"shelf": "unknown"}).status_code, 400)
+        self.assertEqual(client.get("/api/v1/my-library/", {"shelf": "read", "cursor": "abc"}).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BookProjectionTests(CacheIsolationMixin, TestCase):
+    """Named projections fetch exactly what their readers use: no deferred column is loaded lazily."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(email="proj@example.com", password=None)
+        self._add_books(range(3))
+
+    def _add_books(self, numbers):
+        for i in numbers:
+            book = Book.objects.create(
+                google_id=f"p{i}", title=f"Projected {i}", authors=["A"], categories=["Fiction"],
+                average_rating=4.0, embedding=Book.embedding_to_bytes([1.0, float(i)]),
+            )
+            UserBookInteraction.objects.create(user=self.user, book=book, status=UserBookInteraction.Status.READ)
+
+    def test_card_projection_serializes_in_one_query(self):
+        with self.assertNumQueries(1):
+            books = list(Book.objects.card())
+            BookSerializer(books, many=True).data
+        self.assertIn("embedding", books[0].get_deferred_fields())
+
+    def test_detail_projection_serializes_in_one_query(self):
+        with self.assertNumQueries(1):
+            BookDetailSerializer(Book.objects.detail().get(google_id="p0")).data
+
+    def test_vector_projection_covers_scoring_inputs(self):
+        with self.assertNumQueries(1):
+            books = list(Book.objects.vector())
+            for book in books:
+                book.authors, book.categories, book.average_rating, book.get_embedding()
+
+    def test_library_queries_do_not_grow_with_shelf_size(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(client.get("/api/v1/my-library/").status_code, 200)
+        self._add_books(range(3, 9))
+        with CaptureQueriesContext(connection) as large:
+            client.get("/api/v1/my-library/")
+
+        self.assertEqual(len(large), len(small))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExploreCatalogInvalidationTests(CacheIsolationMixin, TestCase):
+    """Catalog edits drop only the Explore pages answered from the local index."""
+
+    def _cache_pages(self):
+        cache_explore_page("dune", None, 1, 12, {"source": "local", "results": ["local"]})
+        cache_explore_page("dune", None, 2, 12, {"source": "google", "results": ["google"]})
+
+    def _pages(self):
+        return get_cached_explore_page("dune", None, 1, 12), get_cached_explore_page("dune", None, 2, 12)
+
+    def test_catalog_changes_drop_only_local_explore_pages(self):
+        self._cache_pages()
+        book = Book.objects.create(google_id="new", title="Dune Messiah")
+
+        local_page, google_page = self._pages()
+        self.assertIsNone(local_page)
+        self.assertEqual(google_page["results"], ["google"])
+
+        self._cache_pages()
+        book.delete()
+        self.assertEqual(self._pages()[0], None)
+
+    def test_non_search_fields_keep_explore_pages(self):
+        book = Book.objects.create(google_id="new", title="Dune Messiah")
+        self._cache_pages()
+
+        book.embedding = Book.embedding_to_bytes(np.ones(3))
+        book.save(update_fields=["embedding"])
+        book.review_count = 4
+        book.save(update_fields=["review_count"])
+
+        self.assertEqual(self._pages()[0]["results"], ["local"])
+
+    def test_clear_explore_cache_drops_every_page(self):
+        self._cache_pages()
+        clear_explore_cache()
+        self.assertEqual(self._pages(), (None, None))
+
+
+class SearchQueryBuildingTests(SimpleTestCase):
+    """User input becomes quoted terms with a prefix on the last one, never query syntax."""
+
+    def test_terms_are_lowercased_words_only(self):
+        self.assertEqual(search._terms('Tolkien: "The" -Hobbit OR*'), ["tolkien", "the", "hobbit", "or"])
+        self.assertEqual(len(search._terms("word " * 20)), search.LOCAL_SEARCH_MAX_TERMS)
+
+    def test_fts5_match_quotes_terms_and_prefixes_last(self):
+        self.assertEqual(search._fts5_match(["lord", "of", "the", "ri"]), '"lord" "of" "the" "ri"*')
+        self.assertEqual(search._fts5_match(["near"]), '"near"*')
+
+    def test_postgres_params_mirror_fts5(self):
+        self.assertEqual(search._postgres_query_params(["lord", "of", "ri"]), ["lord of", "ri:*"])
+        self.assertEqual(search._postgres_query_params(["dune"]), ["", "dune:*"])
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "FTS5 search is SQLite-only")
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocalFullTextSearchTests(CacheIsolationMixin, TestCase):
+    """The FTS5 index follows Book rows and ranks title hits above description hits."""
+
+    def setUp(self):
+        super().setUp()
+        Book.objects.create(google_id="desc", title="Sand Planets", short_description="A study of Dune and its ecology.")
+        Book.objects.create(google_id="title", title="Dune", authors=["Frank Herbert"])
+        Book.objects.create(google_id="hobbit", title="The Hobbit", authors=["J. R. R. Tolkien"])
+
+    def test_title_hits_rank_first(self):
+        self.assertEqual(search.search_book_ids("dune"), (["title", "desc"], 2))
+
+    def test_last_term_is_a_prefix(self):
+        self.assertEqual(search.search_book_ids("tolk"), (["hobbit"], 1))
+        self.assertEqual(search.search_book_ids("frank herb"), (["title"], 1))
+        self.assertEqual(search.search_book_ids("herbert fra"), (["title"], 1))
+        self.assertEqual(search.search_book_ids("herb frank"), ([], 0))
+
+    def test_operators_are_plain_words(self):
+        # "or" / "near" / "and" must be present as words, so nothing matches.
+        for query in ("dune OR hobbit", "NEAR(dune hobbit)", "hobbit AND dune"):
+            self.assertEqual(search.search_book_ids(query), ([], 0), query)
+        self.assertEqual(search.search_book_ids('"dune -sand*')[1], 1)
+
+    def test_index_follows_updates_and_deletes(self):
+        book = Book.objects.get(google_id="hobbit")
+        book.title = "There and Back Again"
+        book.save()
+        self.assertEqual(search.search_book_ids("hobbit"), ([], 0))
+        self.assertEqual(search.search_book_ids("back ag"), (["hobbit"], 1))
+
+        book.delete()
+        self.assertEqual(search.search_book_ids("back ag"), ([], 0))
+
+    def test_results_keep_rank_order_and_paging(self):
+        results, total = search.search_local_books("dune", limit=1, offset=1)
+        self.assertEqual(total, 2)
+        self.assertEqual([r["google_id"] for r in results], ["desc"])
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "FTS5 search is SQLite-only")
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExplorePageSourceTests(CacheIsolationMixin, TestCase):
+    """Local matches answer only the pages they fill; later pages come from Google Books."""
+
+    def setUp(self):
+        super().setUp()
+        Book.objects.bulk_create([Book(google_id=f"d{i:02d}", title=f"Dune {i}") for i in range(30)])
+        patcher = mock.patch(
+            "backend.books.services.search_google_books",
+            return_value={"totalItems": 100, "items": [{"id": "g1", "volumeInfo": {"title": "Google Dune"}}]},
+        )
+        self.google = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_local_pages_are_served_locally(self):
+        first = build_explore_page(query="dune", page=1, page_size=12)
+        second = build_explore_page(query="dune", page=2, page_size=12)
+
+        self.assertEqual((first["source"], len(first["results"]), first["next_page"]), ("local", 12, 2))
+        self.assertEqual((second["source"], second["next_page"]), ("local", 3))
+        self.google.assert_not_called()
+
+    def test_page_past_the_local_matches_goes_to_google(self):
+        third = build_explore_page(query="dune", page=3, page_size=12)
+
+        self.assertNotIn("source", third)
+        self.assertEqual([r["google_id"] for r in third["results"]], ["g1"])
+        self.assertEqual(third["next_page"], 4)
+        self.google.assert_called_once_with("dune", max_results=12, start_index=24)
+
+    def test_few_local_matches_never_hide_google(self):
+        Book.objects.filter(google_id__gte="d05").delete()
+
+        page = build_explore_page(query="dune", page=1, page_size=12)
+
+        self.assertEqual([r["google_id"] for r in page["results"]], ["g1"])
+
+
+class PostgresSearchSqlTests(SimpleTestCase):
+    """The Postgres path can't run here; pin the SQL it sends and the migration that backs it."""
+
+    def _postgres_cursor(self):
+        cursor = mock.MagicMock()
+        cursor.fetchall.return_value = [("b1",), ("b2",)]
+        cursor.fetchone.return_value = (2,)
+        fake = mock.MagicMock(vendor="postgresql")
+        fake.cursor.return_value.__enter__.return_value = cursor
+        return fake, cursor
+
+    def test_search_uses_tsvector_with_plainto_tsquery(self):
+        fake, cursor = self._postgres_cursor()
+        with mock.patch.object(search, "connection", fake):
+            self.assertEqual(search.search_book_ids("Lord of the ri", limit=5, offset=10), (["b1", "b2"], 2))
+
+        (page_sql, page_params), (count_sql, count_params) = [c.args for c in cursor.execute.call_args_list]
+        self.assertIn("search_vector @@ q", page_sql)
+        self.assertIn("plainto_tsquery('english', %s) && to_tsquery('english', %s)", page_sql)
+        self.assertIn("ORDER BY ts_rank_cd(search_vector, q) DESC, google_id", page_sql)
+        self.assertEqual(page_params, ["lord of the", "ri:*", 5, 10])
+        self.assertIn("WHERE search_vector @@ (plainto_tsquery", count_sql)
+        self.assertEqual(count_params, ["lord of the", "ri:*"])
+
+    def test_migration_adds_generated_column_and_gin_index(self):
+        migration = importlib.import_module("backend.books.migrations.0014_book_search_index")
+        forward = " ".join(migration.POSTGRES_FORWARD)
+        self.assertIn("ADD COLUMN search_vector tsvector GENERATED ALWAYS AS", forward)
+        for column, weight in [("title", "A"), ("authors", "B"), ("categories", "C"), ("short_description", "D")]:
+            self.assertRegex(forward, rf"{column}.*'{weight}'")
+        self.assertIn("USING GIN (search_vector)", forward)
+
+        editor = mock.MagicMock()
+        editor.connection.vendor = "postgresql"
+        migration.Migration.operations[0].code(None, editor)
+        self.assertEqual([c.args[0] for c in editor.execute.call_args_list], migration.POSTGRES_FORWARD)
+
+
+class PrefixIndexTests(SimpleTestCase):
+    """Title and author prefixes, weights that count each book once, and the cached snapshot."""
+
+    ROWS = [
+        ("lotr", "The Lord of the Rings", ["J. R. R. Tolkien"], 40),
+        ("hobbit", "The Hobbit", ["J. R. R. Tolkien"], 25),
+        ("jane", "Jane Eyre", ["Charlotte Brontë"], 10),
+        ("lord", "Lord Jim", ["Joseph Conrad"], 2),
+    ]
+
+    def _texts(self, index, prefix, limit=8):
+        return [r["text"] for r in index.search(prefix, limit=limit)]
+
+    def _author_weight(self, index, name):
+        return index.weights[index.texts.index(name)]
+
+    def test_prefix_matching(self):
+        index = PrefixIndex.from_rows(self.ROWS)
+
+        self.assertEqual(self._texts(index, "lord of"), ["The Lord of the Rings"])
+        self.assertEqual(self._texts(index, "tolk"), ["J. R. R. Tolkien"])
+        self.assertEqual(self._texts(index, "BRONTE"), ["Charlotte Brontë"])
+        self.assertEqual(self._texts(index, "the h"), ["The Hobbit"])
+        self.assertEqual(self._texts(index, "xyz"), [])
+
+    def test_heavier_records_rank_first(self):
+        index = PrefixIndex.from_rows(self.ROWS)
+        self.assertEqual(self._texts(index, "lord"), ["The Lord of the Rings", "Lord Jim"])
+        self.assertEqual(index.search("lord", limit=1)[0], {"type": "title", "text": "The Lord of the Rings", "google_id": "lotr"})
+
+    def test_author_weight_counts_books_once(self):
+        index = PrefixIndex.from_rows(self.ROWS)
+        self.assertEqual(self._author_weight(index, "J. R. R. Tolkien"), 2)
+
+        index.add_book("hobbit", "The Hobbit", ["J. R. R. Tolkien"], 26)
+        index.add_book("hobbit", "The Hobbit", ["J. R. R. Tolkien"], 27)
+        self.assertEqual(self._author_weight(index, "J. R. R. Tolkien"), 2)
+
+        index.add_book("hobbit", "The Hobbit", ["Someone Else"], 27)
+        self.assertEqual(self._author_weight(index, "J. R. R. Tolkien"), 1)
+        self.assertEqual(self._author_weight(index, "Someone Else"), 1)
+
+    def test_incremental_adds_match_bulk_build(self):
+        incremental = PrefixIndex()
+        for row in self.ROWS + self.ROWS:
+            incremental.add_book(*row)
+        bulk = PrefixIndex.from_rows(self.ROWS)
+
+        for prefix in ("lo", "the", "tolk", "jo", "ja", "char"):
+            self.assertEqual(incremental.search(prefix), bulk.search(prefix), prefix)
+        self.assertEqual(sorted(incremental.keys), bulk.keys)
+
+    def test_snapshot_round_trip(self):
+        index = PrefixIndex.from_rows(self.ROWS)
+        restored = PrefixIndex.from_snapshot(index.to_snapshot())
+
+        self.assertEqual(restored.search("lo"), index.search("lo"))
+        restored.add_book("hobbit", "The Hobbit", ["J. R. R. Tolkien"], 30)
+        self.assertEqual(self._author_weight(restored, "J. R. R. Tolkien"), 2)
+
+    def test_rename_drops_the_old_title_keys(self):
+        index = PrefixIndex.from_rows(self.ROWS)
+        self.assertEqual(self._texts(index, "hob"), ["The Hobbit"])
+
+        index.add_book("hobbit", "There and Back Again", ["J. R. R. Tolkien"], 25)
+
+        self.assertEqual(self._texts(index, "hob"), [])
+        self.assertEqual(self._texts(index, "there"), ["There and Back Again"])
+        self.assertEqual(sorted(index.keys), PrefixIndex.from_rows(
+            [("hobbit", "There and Back Again", ["J. R. R. Tolkien"], 25)] + self.ROWS[:1] + self.ROWS[2:]
+        ).keys)
+
+    def test_removed_books_and_bookless_authors_stop_matching(self):
+        index = PrefixIndex.from_rows(self.ROWS)
+        index.remove_book("lord")
+
+        self.assertEqual(self._texts(index, "lord"), ["The Lord of the Rings"])
+        self.assertEqual(self._texts(index, "conr"), [])
+        index.apply([("lord", "Lord Jim", ["Joseph Conrad"], 2), ("jane", None, None, 0)])
+        self.assertEqual(self._texts(index, "conr"), ["Joseph Conrad"])
+        self.assertEqual(self._texts(index, "ja"), [])
+
+    def test_ranking_covers_the_whole_prefix_range(self):
+        # A heavy title sorting after hundreds of lighter ones on the same prefix still wins.
+        rows = [(f"b{i}", f"Ba {i:04d}", [], 1) for i in range(600)] + [("top", "Bazaar", [], 90)]
+        index = PrefixIndex.from_rows(rows)
+
+        self.assertEqual(self._texts(index, "ba", limit=1), ["Bazaar"])
+        self.assertEqual(self._texts(index, "baz", limit=1), ["Bazaar"])
+        self.assertEqual(self._texts(index, "ba 05", limit=1), ["Ba 0500"])
+
+    def test_memoized_short_prefixes_follow_updates(self):
+        index = PrefixIndex.from_rows(self.ROWS)
+        self.assertEqual(self._texts(index, "lo"), ["The Lord of the Rings", "Lord Jim"])
+
+        index.add_book("lord", "Lord Jim", ["Joseph Conrad"], 99)
+        self.assertEqual(self._texts(index, "lo"), ["Lord Jim", "The Lord of the Rings"])
+        index.add_book("lord", "Nostromo", ["Joseph Conrad"], 99)
+        self.assertEqual(self._texts(index, "lo"), ["The Lord of the Rings"])
+
+    def test_older_snapshot_formats_are_rejected(self):
+        snapshot = PrefixIndex.from_rows(self.ROWS).to_snapshot()
+        self.assertIsNone(PrefixIndex.from_snapshot((autocomplete.SNAPSHOT_FORMAT - 1, *snapshot[1:])))
+        self.assertIsNone(PrefixIndex.from_snapshot(snapshot[1:]))
+        self.assertIsNone(PrefixIndex.from_snapshot(None))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AutocompleteIndexUpdateTests(CacheIsolationMixin, TestCase):
+    """Saved books are published as deltas under the update lock; readers catch up without a reload."""
+
+    def setUp(self):
+        super().setUp()
+        self._reset_process()
+        Book.objects.create(google_id="dune", title="Dune", authors=["Frank Herbert"])
+
+    def _reset_process(self):
+        autocomplete._state.update(version=None, index=None, checked_at=0.0)
+
+    def test_update_publishes_a_delta_not_a_snapshot(self):
+        autocomplete.update_index()
+        snapshot = cache.get(autocomplete.AUTOCOMPLETE_SNAPSHOT_KEY)
+        Book.objects.create(google_id="messiah", title="Dune Messiah", authors=["Frank Herbert"])
+
+        self.assertEqual(autocomplete.update_index(["messiah"]), {"records": 3, "keys": 4})
+        self.assertEqual(cache.get(autocomplete.AUTOCOMPLETE_SNAPSHOT_KEY), snapshot)
+        self.assertEqual(cache.get(autocomplete.AUTOCOMPLETE_VERSION_KEY), 2)
+        self.assertEqual(
+            cache.get(autocomplete.AUTOCOMPLETE_DELTA_KEY.format(2)),
+            [("messiah", "Dune Messiah", ["Frank Herbert"], 0)],
+        )
+        self.assertEqual([r["text"] for r in autocomplete.suggest("dune")], ["Dune", "Dune Messiah"])
+
+    def _publish_elsewhere(self, google_ids):
+        """Run an update as another process would: with its own copy of the index."""
+        with mock.patch.dict(autocomplete._state, version=None, index=None, checked_at=0.0):
+            autocomplete.update_index(google_ids)
+
+    def test_readers_apply_deltas_in_place(self):
+        autocomplete.update_index()
+        self._reset_process()
+        autocomplete.suggest("du")
+        reader_index = autocomplete._state["index"]
+
+        Book.objects.filter(google_id="dune").update(title="Children of Dune")
+        Book.objects.create(google_id="messiah", title="Dune Messiah", authors=["Frank Herbert"])
+        self._publish_elsewhere(["dune", "messiah"])
+        autocomplete._state["checked_at"] = 0.0
+
+        with mock.patch.object(PrefixIndex, "from_snapshot", side_effect=AssertionError("reloaded")):
+            self.assertEqual([r["text"] for r in autocomplete.suggest("dune")], ["Dune Messiah"])
+            self.assertEqual([r["text"] for r in autocomplete.suggest("chil")], ["Children of Dune"])
+        self.assertIs(autocomplete._state["index"], reader_index)
+        self.assertEqual(autocomplete._state["version"], 2)
+
+    def test_deleted_books_are_published_as_removals(self):
+        autocomplete.update_index()
+        Book.objects.filter(google_id="dune").delete()
+
+        autocomplete.update_index(["dune"])
+        self._reset_process()
+        self.assertEqual(autocomplete.suggest("dune"), [])
+        self.assertEqual(autocomplete.suggest("herb"), [])
+
+    def test_new_process_loads_the_snapshot_plus_deltas(self):
+        autocomplete.update_index()
+        Book.objects.create(google_id="messiah", title="Dune Messiah", authors=["Frank Herbert"])
+        self._publish_elsewhere(["messiah"])
+        self._reset_process()
+
+        self.assertEqual([r["text"] for r in autocomplete.suggest("dune")], ["Dune", "Dune Messiah"])
+        self.assertEqual(autocomplete._state["version"], 2)
+
+    def test_expired_delta_keeps_the_old_copy_and_queues_a_build(self):
+        autocomplete.update_index()
+        self._reset_process()
+        autocomplete.suggest("du")
+        Book.objects.create(google_id="messiah", title="Dune Messiah", authors=["Frank Herbert"])
+        self._publish_elsewhere(["messiah"])
+        cache.delete(autocomplete.AUTOCOMPLETE_DELTA_KEY.format(2))
+        autocomplete._state["checked_at"] = 0.0
+
+        with mock.patch.object(autocomplete, "schedule_index_update") as schedule:
+            self.assertEqual([r["text"] for r in autocomplete.suggest("dune")], ["Dune"])
+        schedule.assert_called_once_with(None)
+        self.assertEqual(autocomplete._state["version"], 1)
+
+    def test_long_delta_log_is_compacted(self):
+        autocomplete.update_index()
+        with mock.patch.object(autocomplete, "AUTOCOMPLETE_COMPACT_EVERY", 2):
+            autocomplete.update_index(["dune"])
+            autocomplete.update_index(["dune"])
+            self.assertEqual(cache.get(autocomplete.AUTOCOMPLETE_BASE_VERSION_KEY), 1)
+            autocomplete.update_index(["dune"])
+
+        self.assertEqual(cache.get(autocomplete.AUTOCOMPLETE_BASE_VERSION_KEY), 4)
+        self.assertEqual(cache.get(autocomplete.AUTOCOMPLETE_VERSION_KEY), 4)
+
+    def test_book_changes_queue_an_update_after_commit(self):
+        book = Book.objects.get(google_id="dune")
+        with mock.patch("backend.books.signals.schedule_index_update") as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                book.save(update_fields=["ai_summary"])
+            schedule.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                book.title = "Dune (1965)"
+                book.save(update_fields=["title"])
+            with self.captureOnCommitCallbacks(execute=True):
+                book.delete()
+        self.assertEqual(schedule.call_args_list, [mock.call("dune"), mock.call("dune")])
+
+    def test_stale_snapshot_format_triggers_rebuild(self):
+        cache.set(autocomplete.AUTOCOMPLETE_SNAPSHOT_KEY, (1, [], b"", "", [], [], b""), timeout=None)
+
+        self.assertEqual(autocomplete.update_index(["dune"]), {"records": 2, "keys": 3})
+
+    def test_locked_update_asks_for_retry(self):
+        cache.add(autocomplete.AUTOCOMPLETE_LOCK_KEY, "other-worker", 60)
+        self.assertIsNone(autocomplete.update_index(["dune"]))
+        self.assertEqual(cache.get(autocomplete.AUTOCOMPLETE_LOCK_KEY), "other-worker")
+
+    def test_suggest_reads_the_published_snapshot(self):
+        autocomplete.update_index()
+        self.assertEqual(autocomplete.suggest("herb"), [{"type": "author", "text": "Frank Herbert", "google_id": None}])
+        self.assertEqual(autocomplete.suggest("d"), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BookAdminSearchTests(CacheIsolationMixin, TestCase):
+    """Admin search matches titles, whole author names and the start of author names."""
+
+    def setUp(self):
+        super().setUp()
+        Book.objects.create(google_id="hobbit", title="The Hobbit", authors=["J. R. R. Tolkien"])
+        Book.objects.create(google_id="silm", title="The Silmarillion", authors=["J. R. R. Tolkien", "Christopher Tolkien"])
+        Book.objects.create(google_id="dune", title="Dune", authors=["Frank Herbert"])
+        self.admin = BookAdmin(Book, AdminSite())
+        self.request = RequestFactory().get("/admin/books/book/")
+
+    def _search(self, term):
+        results, _ = self.admin.get_search_results(self.request, Book.objects.all(), term)
+        return sorted(results.distinct().values_list("google_id", flat=True))
+
+    def test_title_and_author_matches(self):
+        self.assertEqual(self._search("dune"), ["dune"])
+        self.assertEqual(self._search("Frank Herbert"), ["dune"])
+        self.assertEqual(self._search("j. r. r."), ["hobbit", "silm"])
+        self.assertEqual(self._search("christopher"), ["silm"])
+        self.assertEqual(self._search("nobody"), [])
+
+    def test_author_matches_use_the_facet_index(self):
+        # Name prefixes only: a mid-name fragment would need a scan.
+        self.assertEqual(self._search("tolkien"), [])
+        results, _ = self.admin.get_search_results(self.request, Book.objects.all(), "frank")
+        self.assertNotIn('"books_bookfacet"."value" LIKE', str(results.query))
+
+    def test_respects_the_filtered_queryset(self):
+        results, _ = self.admin.get_search_results(self.request, Book.objects.exclude(google_id="silm"), "J. R. R.")
+        self.assertEqual(list(results.distinct().values_list("google_id", flat=True)), ["hobbit"])
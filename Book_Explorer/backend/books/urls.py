@@ -1,5 +1,6 @@
 from django.urls import path
 from .views import (
+    AutocompleteView,
     BookDetailView,
     BookSummaryView,
     DeleteReviewView,
@@ -22,6 +23,7 @@ from .views import (
 
 urlpatterns = [
     path("explore/", ExploreBooksView.as_view(), name="explore-books"),
+    path("autocomplete/", AutocompleteView.as_view(), name="autocomplete"),
     path("details/<str:google_id>/", BookDetailView.as_view(), name="book-detail"),
     path("details-full/<str:google_id>/", BookDetailFullView.as_view(), name="book-detail-full"),
     path("summary/<str:google_id>/", BookSummaryView.as_view(), name="book-summary"),
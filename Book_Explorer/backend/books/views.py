@@ -1,10 +1,9 @@
-import requests
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, generics
 from django.shortcuts import get_object_or_404
 from django.core.cache import cache
-from .models import Book, UserBookInteraction, Review
+from .models import Book, UserBookInteraction, Review, ExploreQueryStat
 from .recommender import get_user_recommendations
 from django.conf import settings
 from django.db.models import Avg
@@ -24,10 +23,24 @@ from .services import (
     get_recent_books,
     get_bestsellers,
     fetch_author_details,
-    get_explore_books,
+    get_more_from_author,
     get_popular_now_books,
-
+    build_explore_page,
+    cache_explore_page,
+    get_cached_explore_page,
+    normalize_explore_term,
+    REVIEW_PAGE_SIZE,
+    paginate_reviews,
+    LIBRARY_PAGE_SIZE,
+    LIBRARY_FIELDS,
+    LIBRARY_SHELVES,
+    library_shelf_page,
+    HOME_SECTIONS,
 )
+from . import http_client
+from .autocomplete import AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, suggest
+from .caching import swr_get
+from .warming import record_explore_request
 from .permissions import IsOwnerOrReadOnly
 from .tasks import generate_summary_task, generate_book_embedding_task
 from rest_framework.permissions import IsAuthenticated
@@ -50,64 +63,35 @@ class ExploreBooksView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        query = request.query_params.get("q")
-        genre = request.query_params.get("genre")
+        # Normalized once: the stats the warmer reads and the cache key must agree.
+        query = normalize_explore_term(request.query_params.get("q"))
+        genre = normalize_explore_term(request.query_params.get("genre"))
         sort = request.query_params.get("sort")
         page = int(request.query_params.get("page", 1))
         page_size = int(request.query_params.get("page_size", 12))
         limit = int(request.query_params.get("limit", 50))
 
-        cache_key = f"explore_{query or genre or sort or 'default'}_{page}_{page_size}"
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached, status=status.HTTP_200_OK)
-
         # ===========================
-        # 1️⃣ SEARCH MODE
+        # 1️⃣ SEARCH MODE / 2️⃣ GENRE MODE
         # ===========================
-        if query:
-            start_index = (page - 1) * page_size
-            data = search_google_books(query, max_results=page_size, start_index=start_index)
-
-            books = [normalize_google_book(item) for item in data.get("items", [])] if data and "items" in data else []
-            total_items = min(data.get("totalItems", len(books)), 200)
-            total_pages = max(1, (total_items + page_size - 1) // page_size)
-            next_page = page + 1 if page < total_pages else None
-
-            result = {
-                "page": page,
-                "next_page": next_page,
-                "total_items": total_items,
-                "results": books,
-            }
-
-            cache.set(cache_key, result, timeout=60 * 60)  # cache 1h
+        if query or genre:
+            if query:
+                record_explore_request(ExploreQueryStat.Kind.SEARCH, query)
+            else:
+                record_explore_request(ExploreQueryStat.Kind.GENRE, genre)
+
+            cached = get_cached_explore_page(query, genre, page, page_size)
+            if cached:
+                return Response(cached, status=status.HTTP_200_OK)
+
+            result = build_explore_page(query=query, genre=genre, page=page, page_size=page_size)
+            # An empty page is usually a failed upstream call; don't pin it for hours.
+            if result["results"]:
+                cache_explore_page(query, genre, page, page_size, result)
             return Response(result, status=status.HTTP_200_OK)
 
         # ===========================
-        # 2️⃣ GENRE MODE
-        # ===========================
-        if genre:
-            start_index = (page - 1) * page_size
-            data = search_google_books(f"subject:{genre}", max_results=page_size, start_index=start_index)
-            books = [normalize_google_book(item) for item in data.get("items", [])] if data and "items" in data else []
-
-            total_items = min(data.get("totalItems", len(books)), 200)
-            total_pages = max(1, (total_items + page_size - 1) // page_size)
-            next_page = page + 1 if page < total_pages else None
-
-            result = {
-                "page": page,
-                "next_page": next_page,
-                "total_items": total_items,
-                "results": books,
-            }
-
-            cache.set(cache_key, result, timeout=60 * 60)
-            return Response(result, status=status.HTTP_200_OK)
-
-        # ===========================
-        # 3️⃣ SORT MODE
+        # 3️⃣ SORT MODE (built from the already-cached curated lists)
         # ===========================
         if sort == "newest":
             books = get_recent_books(limit=limit)
@@ -123,30 +107,28 @@ class ExploreBooksView(APIView):
                 "total_items": len(books),
                 "results": books,
             }
-            cache.set(cache_key, result, timeout=60 * 60)
             return Response(result, status=status.HTTP_200_OK)
 
         # ===========================
-        # 4️⃣ DEFAULT CURATED MODE
+        # 4️⃣ DEFAULT CURATED MODE (stale-while-revalidate, kept warm by Celery beat)
         # ===========================
-        genres = ["Fiction", "Novel", "Mystery", "History", "Science", "Science Fiction"]
-        sections = {}
-
-        for g in genres:
-            data = search_google_books(f"subject:{g}", max_results=6)
-            if data and "items" in data:
-                sections[g.lower().replace(" ", "_")] = [normalize_google_book(item) for item in data["items"]]
+        result, _ = swr_get("explore_default_sections")
+        return Response(result, status=status.HTTP_200_OK)
+# ============================================================
+# 🔤 Typeahead Suggestions (in-memory prefix index, no upstream calls)
+# ============================================================
+class AutocompleteView(APIView):
+    permission_classes = [permissions.AllowAny]
 
-        sections["recent"] = get_recent_books(limit=8)
-        sections["popular"] = get_bestsellers(limit=8)
+    def get(self, request):
+        prefix = request.query_params.get("q", "")
+        try:
+            limit = min(max(int(request.query_params.get("limit", AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"query": prefix, "suggestions": suggest(prefix, limit=limit)}, status=status.HTTP_200_OK)
 
-        result = {
-            "mode": "default",
-            "sections": sections,
-        }
 
-        cache.set(cache_key, result, timeout=60 * 60 * 3)
-        return Response(result, status=status.HTTP_200_OK)
 # -------------------------------
 # Book Details
 # -------------------------------
@@ -171,7 +153,7 @@ class BookSummaryView(APIView):
 
     def get(self, request, google_id):
         # 1) Ensure the book exists in DB (try quick fetch, else attempt creation)
-        book = Book.objects.filter(google_id=google_id).first()
+        book = Book.objects.detail().filter(google_id=google_id).first()
         if not book:
             # attempt to fetch from Google Books and store locally
             book = get_or_create_book_details(google_id)
@@ -231,28 +213,16 @@ class HomeBooksView(APIView):
     def get(self, request):
         """
         Unified homepage data — carousel, recent, and popular sections.
-        Cached for 1 hour to minimize repeated API calls.
+        Fresh for 1 hour; after that the stale copy is served while Celery
+        rebuilds it, so requests never wait on upstream APIs once warm.
         """
-        cache_key = "home_books_combined_v2"
-        cached = cache.get(cache_key)
-
-        if cached:
-            return Response({**cached, "cached": True}, status=status.HTTP_200_OK)
-
-        # --- Generate fresh data ---
-        carousel = get_genre_top_books(limit=10)
-        recent = get_recent_books(limit=10)
-        popular_now = get_popular_now_books(limit=10)
-
-        result = {
-            "carousel": carousel,
-            "recent": recent,
-            "bestsellers": popular_now,  # kept key same for frontend compatibility
-        }
-
-        # --- Cache full response for 1 hour ---
-        cache.set(cache_key, result, timeout=60 * 60)
+        result, from_cache = swr_get("home_books_combined_v2")
 
+        if not result:
+            # Cold cache and an incomplete build: nothing stored, sections stay empty.
+            return Response({key: [] for key in HOME_SECTIONS}, status=status.HTTP_200_OK)
+        if from_cache:
+            return Response({**result, "cached": True}, status=status.HTTP_200_OK)
         return Response(result, status=status.HTTP_200_OK)
 
 
@@ -340,16 +310,27 @@ class UserBookInteractionView(APIView):
 # -------------------------------
 class ReviewListCreateView(APIView):
     """
-    GET → Fetch all reviews for a given book.
+    GET → One page of reviews for a given book, newest first.
+          ?cursor=<next_cursor from the previous page>&page_size=<1-50, default 10>
     POST → Create a new review (or return existing one if already reviewed by user).
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, book_id):
         book = get_object_or_404(Book, pk=book_id)
-        reviews = Review.objects.filter(book=book).select_related("user")
+        try:
+            page_size = int(request.query_params.get("page_size", REVIEW_PAGE_SIZE))
+            reviews, next_cursor = paginate_reviews(
+                book.pk,
+                cursor=request.query_params.get("cursor"),
+                page_size=page_size,
+                queryset=Review.objects.select_related("user"),
+            )
+        except ValueError:
+            return Response({"error": "Invalid cursor or page_size."}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        return Response({"results": serializer.data, "next_cursor": next_cursor})
 
     def post(self, request, book_id):
         book = get_object_or_404(Book, pk=book_id)
@@ -412,39 +393,42 @@ class DeleteReviewView(APIView):
 # -------------------------------
 class UserLibraryView(APIView):
     """
-    Returns user's library grouped by status:
+    Returns user's library grouped by status, one page per shelf:
     {
         "library": {
             "will_read": [...],
             "reading": [...],
             "read": [...],
             "favorites": [...]
-        }
+        },
+        "next_cursors": {"will_read": "<id>" | null, ...}
     }
+    ?shelf=<name>&cursor=<next_cursor> returns the next page of just that shelf.
+    ?page_size= (default 24, max 100).
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         user = request.user
-        interactions = (
-            UserBookInteraction.objects.filter(user=user)
-            .select_related("book")
-            .order_by("-id")
-        )
+        shelf = request.query_params.get("shelf")
+        cursor = request.query_params.get("cursor")
+        if shelf and shelf not in LIBRARY_SHELVES:
+            return Response({"error": f"Unknown shelf '{shelf}'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        will_read = [i for i in interactions if i.status == UserBookInteraction.Status.WILL_READ]
-        reading = [i for i in interactions if i.status == UserBookInteraction.Status.READING]
-        read = [i for i in interactions if i.status == UserBookInteraction.Status.READ]
-        favorites = [i for i in interactions if i.is_favorite]
+        try:
+            page_size = int(request.query_params.get("page_size", LIBRARY_PAGE_SIZE))
+            shelves = [shelf] if shelf else list(LIBRARY_SHELVES)
+            pages = {
+                name: library_shelf_page(user, name, cursor=cursor if shelf else None, page_size=page_size)
+                for name in shelves
+            }
+        except ValueError:
+            return Response({"error": "Invalid cursor or page_size."}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = UserBookInteractionSerializer
         response_data = {
-            "library": {
-                "will_read": serializer(will_read, many=True).data,
-                "reading": serializer(reading, many=True).data,
-                "read": serializer(read, many=True).data,
-                "favorites": serializer(favorites, many=True).data,
-            }
+            "library": {name: serializer(items, many=True).data for name, (items, _) in pages.items()},
+            "next_cursors": {name: next_cursor for name, (_, next_cursor) in pages.items()},
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
@@ -460,10 +444,11 @@ class UserFavoritesView(APIView):
     def get(self, request):
         status_filter = request.query_params.get("status")
 
-        favorites_qs = UserBookInteraction.objects.filter(
-            user=request.user,
-            is_favorite=True,
-        ).select_related("book")
+        favorites_qs = (
+            UserBookInteraction.objects.filter(user=request.user, is_favorite=True)
+            .select_related("user", "book")
+            .only(*LIBRARY_FIELDS)
+        )
 
         if status_filter in [
             UserBookInteraction.Status.WILL_READ,
@@ -512,16 +497,12 @@ class AuthorDetailView(APIView):
 
 class MoreFromAuthorView(APIView):
     """
-    Returns other books from the same author (based on Google Books).
+    Returns other books from the same author (persisted books first, then Google Books).
     """
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, author_name):
-        data = search_google_books(f"inauthor:{author_name}", max_results=10)
-        if not data or "items" not in data:
-            return Response({"books": []})
-        books = [normalize_google_book(item) for item in data["items"]]
-        return Response({"books": books})
+        return Response(get_more_from_author(author_name))
 
 class GoogleBooksDebugView(APIView):
     def get(self, request):
@@ -535,7 +516,7 @@ class GoogleBooksDebugView(APIView):
         }
 
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params)
             data = response.json()
             return Response({
                 "used_api_key": api_key,
@@ -0,0 +1,206 @@
+# books/warming.py
+"""
+Cache warming for the home and Explore pages.
+
+A Celery beat job refreshes the curated stale-while-revalidate sections before
+they go stale and re-fetches page 1 of the most requested Explore searches and
+genres, so users never trigger a cold build. Explore request counts are
+kept in per-minute buckets in the shared cache (atomic increments, so nothing
+is lost on restart) and folded into ExploreQueryStat by the beat run.
+"""
+import hashlib
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import swr_expires_in, swr_refresh
+from .models import ExploreQueryStat
+from .services import (
+    EXPLORE_PAGE_TTL,
+    build_explore_page,
+    explore_cache_key,
+    normalize_explore_term,
+    run_in_parallel,
+)
+
+WARMING_LAST_RUN_KEY = "cache_warming_last_run"
+STATS_BUCKET_SECONDS = 60             # Explore hits are counted per minute
+STATS_SETTLE_BUCKETS = 2              # the newest buckets may still be written; flushed next run
+STATS_BUCKET_TTL = 60 * 60 * 24 * 2   # unflushed buckets are dropped after two days
+STATS_CURSOR_KEY = "explore_hits_flushed_through"
+STATS_FLUSH_LOCK_KEY = "explore_hits_flush_lock"
+STATS_FLUSH_LOCK_TTL = 60 * 5
+
+DEFAULTS = {
+    "INTERVAL_MINUTES": 30,
+    # Curated keys refreshed ahead of expiry; components before the pages that embed them.
+    "KEYS": [
+        "genre_top_books_curated",
+        "recent_books_curated",
+        "popular_now_books",
+        "bestsellers_combined",
+        "home_books_combined_v2",
+        "explore_default_sections",
+    ],
+    "REFRESH_AHEAD_SECONDS": 45 * 60,  # refresh anything going stale before the next run + margin
+    "TOP_QUERIES": 20,
+    "TOP_GENRES": 10,
+    "PAGE_SIZE": 12,
+    "LOOKBACK_DAYS": 7,
+}
+
+
+def warming_config():
+    return {**DEFAULTS, **getattr(settings, "CACHE_WARMING", {})}
+
+
+# ============================================================
+# 🔹 Explore Request Stats
+# ============================================================
+def _bucket(now=None):
+    return int((time.time() if now is None else now) // STATS_BUCKET_SECONDS)
+
+
+def _bucket_size_key(bucket):
+    return f"explore_hits_{bucket}_n"
+
+
+def _slot_key(bucket, slot):
+    return f"explore_hits_{bucket}_slot_{slot}"
+
+
+def _counter_key(bucket, kind, value):
+    digest = hashlib.md5(f"{kind}:{value}".encode()).hexdigest()
+    return f"explore_hits_{bucket}_{digest}"
+
+
+def record_explore_request(kind, value):
+    """
+    Count one Explore search/genre request with an atomic cache increment.
+    The first hit of a value in a bucket registers it in the next slot, so the
+    flush can find it. Values are normalized like the view's cache key, so
+    warmed pages land on the keys real requests read.
+    """
+    value = normalize_explore_term(value)
+    if not value or len(value) > 255:
+        return
+    bucket = _bucket()
+    counter = _counter_key(bucket, kind, value)
+    if cache.add(counter, 1, STATS_BUCKET_TTL):
+        size_key = _bucket_size_key(bucket)
+        cache.add(size_key, 0, STATS_BUCKET_TTL)
+        cache.set(_slot_key(bucket, cache.incr(size_key)), (kind, value), STATS_BUCKET_TTL)
+        return
+    try:
+        cache.incr(counter)
+    except ValueError:
+        pass  # evicted between add and incr; one hit is not worth a retry
+
+
+def flush_explore_stats():
+    """
+    Fold every settled bucket since the last flush into ExploreQueryStat
+    with F() increments (one row per distinct query). Returns rows written.
+    """
+    if not cache.add(STATS_FLUSH_LOCK_KEY, True, STATS_FLUSH_LOCK_TTL):
+        return 0
+    try:
+        now = _bucket()
+        last = now - STATS_SETTLE_BUCKETS
+        flushed_through = cache.get(STATS_CURSOR_KEY)
+        first = now - STATS_BUCKET_TTL // STATS_BUCKET_SECONDS
+        if flushed_through is not None:
+            first = max(first, flushed_through + 1)
+        buckets = range(first, last + 1)
+
+        sizes = cache.get_many([_bucket_size_key(b) for b in buckets])
+        totals, used_keys = Counter(), []
+        for bucket in buckets:
+            size = sizes.get(_bucket_size_key(bucket))
+            if not size:
+                continue
+            slot_keys = [_slot_key(bucket, slot) for slot in range(1, size + 1)]
+            entries = list(cache.get_many(slot_keys).values())
+            counter_keys = [_counter_key(bucket, kind, value) for kind, value in entries]
+            counts = cache.get_many(counter_keys)
+            for entry, key in zip(entries, counter_keys):
+                totals[entry] += counts.get(key, 0)
+            used_keys += [_bucket_size_key(bucket), *slot_keys, *counter_keys]
+
+        now_ts = timezone.now()
+        for (kind, value), hits in totals.items():
+            if not hits:
+                continue
+            stat, created = ExploreQueryStat.objects.get_or_create(kind=kind, value=value, defaults={"hits": hits})
+            if not created:
+                ExploreQueryStat.objects.filter(pk=stat.pk).update(hits=F("hits") + hits, last_requested=now_ts)
+
+        cache.set(STATS_CURSOR_KEY, last, timeout=None)
+        cache.delete_many(used_keys)
+        return len(totals)
+    finally:
+        cache.delete(STATS_FLUSH_LOCK_KEY)
+
+
+def top_explore_requests(kind, limit, lookback_days):
+    since = timezone.now() - timedelta(days=lookback_days)
+    return list(
+        ExploreQueryStat.objects.filter(kind=kind, last_requested__gte=since)
+        .order_by("-hits")
+        .values_list("value", flat=True)[:limit]
+    )
+
+
+# ============================================================
+# 🔹 Warming Run
+# ============================================================
+def warm_caches():
+    """Refresh hot curated sections and top Explore pages; returns a run summary."""
+    config = warming_config()
+    started = time.time()
+    summary = {"refreshed": [], "fresh": [], "failed": {}, "explore_pages": 0, "explore_local": 0, "explore_failed": 0}
+
+    for key in config["KEYS"]:
+        remaining = swr_expires_in(key)
+        if remaining is not None and remaining > config["REFRESH_AHEAD_SECONDS"]:
+            summary["fresh"].append(key)
+            continue
+        try:
+            if swr_refresh(key):
+                summary["refreshed"].append(key)
+            else:
+                summary["failed"][key] = "empty build"
+        except Exception as e:
+            summary["failed"][key] = str(e)
+            print(f"⚠️ Cache warming failed for {key}: {e}")
+
+    flush_explore_stats()
+    page_size = config["PAGE_SIZE"]
+    calls = {}
+    for query in top_explore_requests(ExploreQueryStat.Kind.SEARCH, config["TOP_QUERIES"], config["LOOKBACK_DAYS"]):
+        calls[explore_cache_key(query=query, page=1, page_size=page_size)] = (
+            build_explore_page, query, None, 1, page_size,
+        )
+    for genre in top_explore_requests(ExploreQueryStat.Kind.GENRE, config["TOP_GENRES"], config["LOOKBACK_DAYS"]):
+        calls[explore_cache_key(genre=genre, page=1, page_size=page_size)] = (
+            build_explore_page, None, genre, 1, page_size,
+        )
+
+    results = run_in_parallel(calls)
+    # Pages answered from the local catalog are cheap and need no warming.
+    local = [key for key, page in results.items() if page.get("source") == "local"]
+    # Don't overwrite a cached page with an empty result from a failed upstream call.
+    warmed = {key: page for key, page in results.items() if page["results"] and key not in local}
+    cache.set_many(warmed, timeout=EXPLORE_PAGE_TTL)
+    summary["explore_pages"] = len(warmed)
+    summary["explore_local"] = len(local)
+    summary["explore_failed"] = len(calls) - len(warmed) - len(local)
+
+    summary["seconds"] = round(time.time() - started, 2)
+    summary["finished_at"] = timezone.now().isoformat()
+    return summary
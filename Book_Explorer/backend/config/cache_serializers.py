@@ -0,0 +1,47 @@
+# config/cache_serializers.py
+"""
+Serializer for the shared Redis cache.
+
+Values are pickled with protocol 5 and zlib-compressed once they pass
+COMPRESS_MIN_BYTES (explore pages, full book details, curated sections), so
+they take less Redis memory and less bandwidth per read. Plain ints are stored
+raw, exactly like Django's RedisSerializer, so cache.incr()/decr() stay atomic.
+"""
+import pickle
+import zlib
+
+from django.core.cache.backends.redis import RedisSerializer
+
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 3  # fast; most of the gain on JSON-like payloads comes early
+
+_PLAIN = b"P"
+_ZLIB = b"Z"
+
+
+class CompressedPickleSerializer(RedisSerializer):
+    def __init__(self, protocol=5):
+        super().__init__(protocol=protocol)
+
+    def dumps(self, obj):
+        if type(obj) is int:
+            return obj
+        data = pickle.dumps(obj, self.protocol)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            packed = zlib.compress(data, COMPRESS_LEVEL)
+            if len(packed) < len(data):
+                return _ZLIB + packed
+        return _PLAIN + data
+
+    def loads(self, data):
+        try:
+            return int(data)
+        except ValueError:
+            pass
+        header, body = data[:1], data[1:]
+        if header == _ZLIB:
+            return pickle.loads(zlib.decompress(body))
+        if header == _PLAIN:
+            return pickle.loads(body)
+        # Entries written by Django's default serializer before this one was configured.
+        return pickle.loads(data)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import worker_init
 
 # Set default Django settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.config.settings')
@@ -14,6 +15,13 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 
+@worker_init.connect
+def use_background_http_budget(**kwargs):
+    """Workers retry upstream calls longer than web requests (inherited by forked children)."""
+    from backend.books import http_client
+    http_client.use_background_budget()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
@@ -2,6 +2,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
+from celery.schedules import crontab
 
 # Load environment variables from .env
 load_dotenv()
@@ -127,6 +128,26 @@ GOOGLE_BOOKS_API_KEY = os.getenv("GOOGLE_BOOKS_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 NYT_API_KEY = os.getenv("NYT_API_KEY")
+
+# Outbound HTTP client (see backend/books/http_client.py); top-level values are
+# the Celery workers' retry budget, REQUEST overrides them on web request threads.
+OUTBOUND_HTTP = {
+    "TIMEOUT": (
+        float(os.getenv("OUTBOUND_HTTP_CONNECT_TIMEOUT", "3.05")),
+        float(os.getenv("OUTBOUND_HTTP_READ_TIMEOUT", "10")),
+    ),
+    "RETRIES": int(os.getenv("OUTBOUND_HTTP_RETRIES", "3")),
+    "BACKOFF_FACTOR": float(os.getenv("OUTBOUND_HTTP_BACKOFF", "0.5")),
+    "POOL_MAXSIZE": int(os.getenv("OUTBOUND_HTTP_POOL_MAXSIZE", "20")),
+    # Web request threads: keep the whole call (retries included) under 10s
+    "REQUEST": {
+        "TIMEOUT": (
+            float(os.getenv("OUTBOUND_HTTP_REQUEST_CONNECT_TIMEOUT", "1.5")),
+            float(os.getenv("OUTBOUND_HTTP_REQUEST_READ_TIMEOUT", "3")),
+        ),
+        "RETRIES": int(os.getenv("OUTBOUND_HTTP_REQUEST_RETRIES", "1")),
+    },
+}
 # CORS Settings
 # NOTE: For production, use CORS_ALLOWED_ORIGINS instead of allowing all.
 #
@@ -174,6 +195,52 @@ CELERY_TIMEZONE = 'Asia/Kolkata'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60 
 
+# Shared cache: one Redis-backed tier for all Gunicorn and Celery processes
+# (DB 1, so it never collides with the broker on DB 0). Large values are pickled
+# with protocol 5 and zlib-compressed, see backend/config/cache_serializers.py.
+# CACHE_BACKEND=fakeredis runs the same backend against an in-memory Redis stand-in.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_CACHE_URL", "redis://localhost:6379/1"),
+        "KEY_PREFIX": "bookex",
+        "OPTIONS": {
+            "serializer": "backend.config.cache_serializers.CompressedPickleSerializer",
+            "health_check_interval": 30,
+        },
+    }
+}
+if CACHE_BACKEND == "fakeredis":
+    import fakeredis
+
+    CACHES["default"]["OPTIONS"]["connection_class"] = fakeredis.FakeConnection
+
+# Cache warming (see backend/books/warming.py for the defaults, incl. the hot key list)
+CACHE_WARMING = {
+    "INTERVAL_MINUTES": int(os.getenv("CACHE_WARMING_INTERVAL_MINUTES", "30")),
+    "REFRESH_AHEAD_SECONDS": int(os.getenv("CACHE_WARMING_REFRESH_AHEAD", str(45 * 60))),
+    "TOP_QUERIES": int(os.getenv("CACHE_WARMING_TOP_QUERIES", "20")),
+    "TOP_GENRES": int(os.getenv("CACHE_WARMING_TOP_GENRES", "10")),
+}
+
+# Periodic jobs (run `celery -A backend.config beat`)
+CELERY_BEAT_SCHEDULE = {
+    "nightly-recommendation-precompute": {
+        "task": "backend.books.tasks.precompute_recommendations_task",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "nightly-autocomplete-rebuild": {
+        "task": "backend.books.tasks.update_autocomplete_index_task",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "cache-warming": {
+        "task": "backend.books.tasks.warm_caches_task",
+        # A fixed interval: crontab's */N only works for divisors of 60.
+        "schedule": timedelta(minutes=max(1, CACHE_WARMING["INTERVAL_MINUTES"])),
+    },
+}
+
 
 # ===============================
 # 📧 EMAIL (Development Settings)
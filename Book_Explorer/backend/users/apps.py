@@ -8,3 +8,4 @@ class UsersConfig(AppConfig):
     
     def ready(self):
         import backend.users.admin  # ✅ Ensures custom admin is loaded
+        import backend.users.signals
@@ -1,31 +1,105 @@
-from backend.books.models import UserBookInteraction, Review
-from django.db.models import Count
+from django.contrib.auth import get_user_model
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from backend.books.caching import local_get, local_set, tag_versions, tagged_key
+from backend.books.models import Book, UserBookInteraction, Review, book_fields
+from backend.books.serializers import BookSerializer, ReviewSerializer
+
+PROFILE_STATS_CACHE_TTL = 60 * 30  # tagged user:<id>, so interaction/review/profile signals drop it immediately
+PROFILE_PREVIEW_SIZE = 3
+
+Status = UserBookInteraction.Status
+
+
+def get_user_stats(user):
+    """
+    All library and review counts for a user in one query: conditional
+    Counts over the user's interactions plus a scalar subquery for reviews.
+    """
+    review_count = (
+        Review.objects.filter(user=OuterRef("pk"))
+        .order_by()
+        .values("user")
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    stats = (
+        get_user_model().objects.filter(pk=user.pk)
+        .annotate(
+            total_books=Count("interactions"),
+            want_to_read=Count("interactions", filter=Q(interactions__status=Status.WILL_READ)),
+            reading=Count("interactions", filter=Q(interactions__status=Status.READING)),
+            read=Count("interactions", filter=Q(interactions__status=Status.READ)),
+            favorites=Count("interactions", filter=Q(interactions__is_favorite=True)),
+            review_total=Coalesce(Subquery(review_count, output_field=IntegerField()), Value(0)),
+        )
+        .values("total_books", "want_to_read", "reading", "read", "favorites", "review_total")
+        .get()
+    )
+    stats["reviews"] = stats.pop("review_total")
+    return stats
+
+
+def get_profile_summary(user):
+    """
+    Stats plus the recent-review and favorite-book previews shown on the
+    profile page, cached per user and invalidated through the user:<id> tag.
+    The entry also records the book:<id> versions of the favorite cards it
+    embeds, so editing one of those books rebuilds it on the next read.
+    """
+    cache_key = tagged_key(f"user_profile_summary_{user.pk}", f"user:{user.pk}")
+    cached = local_get(cache_key)
+    if cached and tag_versions(cached["book_tags"]) == cached["book_versions"]:
+        return cached["summary"]
+
+    recent_reviews = Review.objects.filter(user=user).select_related("user").order_by("-created_at", "id")
+    favorite_books = list(
+        Book.objects.filter(interactions__user=user, interactions__is_favorite=True)
+        .card()
+        .order_by("-interactions__id")[:PROFILE_PREVIEW_SIZE]
+    )
+    book_tags = [f"book:{book.google_id}" for book in favorite_books]
+    summary = {
+        "stats": get_user_stats(user),
+        "recent_reviews": ReviewSerializer(recent_reviews[:PROFILE_PREVIEW_SIZE], many=True).data,
+        "favorite_books": BookSerializer(favorite_books, many=True).data,
+    }
+    local_set(
+        cache_key,
+        {"summary": summary, "book_tags": book_tags, "book_versions": tag_versions(book_tags)},
+        timeout=PROFILE_STATS_CACHE_TTL,
+    )
+    return summary
+
 
 def get_user_dashboard_data(user):
     """
     Gather key statistics and recent activities for a user's dashboard.
     """
-    # --- Book stats ---
+    # --- Book stats (single aggregate query) ---
+    counts = get_user_stats(user)
     stats = {
-        "total_books": UserBookInteraction.objects.filter(user=user).count(),
-        "books_read": UserBookInteraction.objects.filter(user=user, status="RD").count(),
-        "books_reading": UserBookInteraction.objects.filter(user=user, status="RDG").count(),
-        "books_want_to_read": UserBookInteraction.objects.filter(user=user, status="WTR").count(),
-        "favorites": UserBookInteraction.objects.filter(user=user, is_favorite=True).count(),
-        "total_reviews": Review.objects.filter(user=user).count(),
+        "total_books": counts["total_books"],
+        "books_read": counts["read"],
+        "books_reading": counts["reading"],
+        "books_want_to_read": counts["want_to_read"],
+        "favorites": counts["favorites"],
+        "total_reviews": counts["reviews"],
     }
 
     # --- Recent activity (latest 5 interactions) ---
     recent_interactions = (
         UserBookInteraction.objects.filter(user=user)
         .select_related("book")
+        .only("status", "is_favorite", "book", *book_fields("card", "book"))
         .order_by("-id")[:5]
     )
 
     # --- Recent reviews (latest 5) ---
     recent_reviews = (
         Review.objects.filter(user=user)
-        .select_related("book")
+        .select_related("user")
         .order_by("-created_at")[:5]
     )
 
@@ -0,0 +1,16 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from backend.books.services import clear_user_cache
+
+
+# ------------------------------------------------------------
+# 🔹 When a profile changes → drop payloads that show the user's name
+#    (logins only touch last_login and keep them)
+# ------------------------------------------------------------
+@receiver(post_save, sender=get_user_model())
+def clear_cache_on_profile_change(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= {"last_login"}):
+        return
+    clear_user_cache(instance.pk)
@@ -1,3 +1,81 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from backend.books.models import Book, Review, UserBookInteraction
+from backend.books.tests import LOCMEM_CACHES, CacheIsolationMixin
+from backend.users.services import get_profile_summary, get_user_stats
+
+Status = UserBookInteraction.Status
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserStatsTests(CacheIsolationMixin, TestCase):
+    """Library and review counts come from a single query and stay in step with the signals."""
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.user = User.objects.create_user(email="stats@example.com", password=None)
+        other = User.objects.create_user(email="other@example.com", password=None)
+        books = [Book.objects.create(google_id=f"s{i}", title=f"Stats {i}") for i in range(6)]
+        shelves = [Status.WILL_READ, Status.WILL_READ, Status.READING, Status.READ, None, Status.READ]
+        for book, status in zip(books, shelves):
+            UserBookInteraction.objects.create(user=self.user, book=book, status=status, is_favorite=status is None)
+        Review.objects.create(user=self.user, book=books[3], rating=4)
+        Review.objects.create(user=self.user, book=books[5], rating=2)
+        # Another reader's rows must not leak into the counts.
+        UserBookInteraction.objects.create(user=other, book=books[0], status=Status.READ, is_favorite=True)
+        Review.objects.create(user=other, book=books[0], rating=5)
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = get_user_stats(self.user)
+
+        self.assertEqual(stats, {
+            "total_books": 6,
+            "want_to_read": 2,
+            "reading": 1,
+            "read": 2,
+            "favorites": 1,
+            "reviews": 2,
+        })
+
+    def test_new_user_has_zero_counts(self):
+        user = get_user_model().objects.create_user(email="fresh@example.com", password=None)
+        self.assertEqual(set(get_user_stats(user).values()), {0})
+
+    def test_profile_summary_follows_new_reviews(self):
+        self.assertEqual(get_profile_summary(self.user)["stats"]["reviews"], 2)
+        with self.assertNumQueries(0):
+            get_profile_summary(self.user)
+
+        Review.objects.create(user=self.user, book=Book.objects.get(google_id="s0"), rating=3)
+
+        self.assertEqual(get_profile_summary(self.user)["stats"]["reviews"], 3)
+
+    def test_profile_summary_follows_name_changes(self):
+        Review.objects.filter(user=self.user).update(comment="Loved it")
+        self.user.name = "Old Name"
+        self.user.save()
+        self.assertEqual(get_profile_summary(self.user)["recent_reviews"][0]["username"], "Old Name")
+
+        self.user.name = "New Name"
+        self.user.save()
+
+        self.assertEqual(get_profile_summary(self.user)["recent_reviews"][0]["username"], "New Name")
+
+    def test_logins_keep_the_profile_summary(self):
+        get_profile_summary(self.user)
+        self.user.save(update_fields=["last_login"])
+
+        with self.assertNumQueries(0):
+            get_profile_summary(self.user)
+
+    def test_profile_summary_follows_favorite_book_edits(self):
+        favorite = UserBookInteraction.objects.get(user=self.user, is_favorite=True).book
+        self.assertEqual(get_profile_summary(self.user)["favorite_books"][0]["title"], favorite.title)
+
+        favorite.title = "Retitled"
+        favorite.save()
+
+        self.assertEqual(get_profile_summary(self.user)["favorite_books"][0]["title"], "Retitled")
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth.models import update_last_login
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -22,7 +23,7 @@ from .serializers import (
     UserDashboardSerializer,
     
 )
-from .services import get_user_dashboard_data
+from .services import get_profile_summary, get_user_dashboard_data
 from .models import CustomUser, EmailOTP
 from .utils import send_otp_email, send_registration_otp
 
@@ -83,6 +84,7 @@ class RegisterVerifyOTPView(APIView):
         user.save()
         EmailOTP.objects.filter(user=user).delete()
 
+        update_last_login(None, user)
         refresh = RefreshToken.for_user(user)
         return Response(
             {
@@ -121,6 +123,7 @@ class OTPVerifyView(APIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data["user"]
 
+        update_last_login(None, user)
         refresh = RefreshToken.for_user(user)
         return Response(
             {
@@ -241,26 +244,8 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         # Basic profile info
         profile_data = self.get_serializer(user, context={"request": request}).data
 
-        # Stats
-        interactions = UserBookInteraction.objects.filter(user=user)
-        stats = {
-            "total_books": interactions.count(),
-            "want_to_read": interactions.filter(status="WTR").count(),
-            "reading": interactions.filter(status="RDG").count(),
-            "read": interactions.filter(status="RD").count(),
-            "favorites": interactions.filter(is_favorite=True).count(),
-            "reviews": Review.objects.filter(user=user).count(),
-        }
-
-        # Preview data
-        recent_reviews = Review.objects.filter(user=user).order_by("-created_at")[:3]
-        favorite_books = interactions.filter(is_favorite=True)[:3]
-
-        profile_data["stats"] = stats
-        profile_data["recent_reviews"] = ReviewSerializer(recent_reviews, many=True).data
-        profile_data["favorite_books"] = [
-            BookSerializer(i.book).data for i in favorite_books
-        ]
+        # Stats + previews (one aggregate query when cold, cached per user)
+        profile_data.update(get_profile_summary(user))
 
         return Response(profile_data, status=status.HTTP_200_OK)
 
@@ -1,6 +1,6 @@
 import React, { useState } from "react";
 
-export default function ReviewSection({ reviews, user, onReviewAction }) {
+export default function ReviewSection({ reviews, user, onReviewAction, hasMore, onLoadMore }) {
   const [rating, setRating] = useState(0);
   const [comment, setComment] = useState("");
 
@@ -64,6 +64,15 @@ export default function ReviewSection({ reviews, user, onReviewAction }) {
       ) : (
         <p className="text-gray-500 text-sm">No reviews yet.</p>
       )}
+
+      {hasMore && (
+        <button
+          onClick={onLoadMore}
+          className="mt-4 px-4 py-2 bg-gray-800 hover:bg-gray-700 rounded-md text-sm text-gray-300"
+        >
+          Load more reviews
+        </button>
+      )}
     </div>
   );
 }
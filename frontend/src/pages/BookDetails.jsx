@@ -5,6 +5,7 @@ import {
   getBookDetail,
   getBookDetailFull,
   getSummary,
+  getReviews,
   createReview,
   updateReview,
   deleteReview,
@@ -26,6 +27,7 @@ export default function BookDetails() {
   // Core Data States
   const [book, setBook] = useState(null);
   const [reviews, setReviews] = useState([]);
+  const [reviewsCursor, setReviewsCursor] = useState(null);
   const [userInteraction, setUserInteraction] = useState(null);
   const [summary, setSummary] = useState(null);
   const [authorBooks, setAuthorBooks] = useState([]);
@@ -54,6 +56,7 @@ export default function BookDetails() {
 
       setBook(data.book);
       setReviews(data.reviews || []);
+      setReviewsCursor(data.reviews_next_cursor || null);
       setUserInteraction(data.user_interaction || null);
 
       setLoadingBook(false);
@@ -129,6 +132,20 @@ export default function BookDetails() {
     }
   };
 
+  /* =====================================================
+     🔹 Load Older Reviews (cursor pagination)
+  ===================================================== */
+  const loadMoreReviews = async () => {
+    if (!reviewsCursor) return;
+    try {
+      const { data } = await getReviews(google_id, reviewsCursor);
+      setReviews((prev) => [...prev, ...(data.results || [])]);
+      setReviewsCursor(data.next_cursor || null);
+    } catch {
+      toast.error("Failed to load more reviews");
+    }
+  };
+
   /* =====================================================
      🔹 Handle Review Actions (Create / Update / Delete)
   ===================================================== */
@@ -194,7 +211,13 @@ export default function BookDetails() {
             ))}
           </div>
         ) : (
-          <ReviewSection reviews={reviews} user={user} onReviewAction={handleReview} />
+          <ReviewSection
+            reviews={reviews}
+            user={user}
+            onReviewAction={handleReview}
+            hasMore={Boolean(reviewsCursor)}
+            onLoadMore={loadMoreReviews}
+          />
         )}
 
         {/* ✍️ Author Books */}
@@ -10,6 +10,7 @@ export default function Library() {
   const { isAuthenticated } = useAuth();
   const navigate = useNavigate();
   const [library, setLibrary] = useState(null);
+  const [cursors, setCursors] = useState({});
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -21,6 +22,7 @@ export default function Library() {
       setLoading(true);
       const { data } = await getMyLibrary();
       setLibrary(data.library);
+      setCursors(data.next_cursors || {});
     } catch (err) {
       console.error(err);
       toast.error("Failed to load your library");
@@ -29,6 +31,20 @@ export default function Library() {
     }
   };
 
+  const loadMoreShelf = async (section) => {
+    try {
+      const { data } = await getMyLibrary({ shelf: section, cursor: cursors[section] });
+      setLibrary((prev) => ({
+        ...prev,
+        [section]: [...(prev?.[section] || []), ...(data.library?.[section] || [])],
+      }));
+      setCursors((prev) => ({ ...prev, [section]: data.next_cursors?.[section] || null }));
+    } catch (err) {
+      console.error(err);
+      toast.error("Failed to load more books");
+    }
+  };
+
   const handleBookClick = (googleId) => {
     navigate(`/books/${googleId}`);
   };
@@ -104,6 +120,15 @@ export default function Library() {
                   </div>
                 ))}
               </div>
+
+              {cursors[section] && (
+                <button
+                  onClick={() => loadMoreShelf(section)}
+                  className="mt-5 px-4 py-2 bg-gray-800 hover:bg-gray-700 rounded-md text-sm text-gray-300"
+                >
+                  Load more
+                </button>
+              )}
             </div>
           );
         })}
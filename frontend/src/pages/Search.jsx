@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { useLocation, useNavigate } from "react-router-dom";
-import { getExploreData } from "../services/bookApi";
+import { getAutocomplete, getExploreData } from "../services/bookApi";
 import toast from "react-hot-toast";
 
 export default function Search() {
@@ -19,12 +19,46 @@ export default function Search() {
   });
   const [loading, setLoading] = useState(false);
   const [loadingMore, setLoadingMore] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
+  const [showSuggestions, setShowSuggestions] = useState(false);
 
   useEffect(() => {
     if (!initialQuery.trim()) return;
     fetchSearchResults(initialQuery, 1, true);
   }, [initialQuery]);
 
+  // Debounced typeahead; suggestions never hit Google Books
+  useEffect(() => {
+    const term = query.trim();
+    if (term.length < 2 || term === initialQuery) {
+      setSuggestions([]);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const { data } = await getAutocomplete(term);
+        if (!cancelled) setSuggestions(data.suggestions || []);
+      } catch (error) {
+        if (!cancelled) setSuggestions([]);
+      }
+    }, 150);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query, initialQuery]);
+
+  const handleSuggestionClick = (suggestion) => {
+    setShowSuggestions(false);
+    setSuggestions([]);
+    if (suggestion.type === "title" && suggestion.google_id) {
+      navigate(`/books/${suggestion.google_id}`);
+    } else {
+      navigate(`/author/${encodeURIComponent(suggestion.text)}`);
+    }
+  };
+
   const fetchSearchResults = async (searchTerm, page = 1, reset = false) => {
     if (reset) setLoading(true);
     else setLoadingMore(true);
@@ -62,6 +96,7 @@ export default function Search() {
   const handleSearch = (e) => {
     e.preventDefault();
     if (!query.trim()) return;
+    setShowSuggestions(false);
     navigate(`/search?q=${encodeURIComponent(query.trim())}`);
   };
 
@@ -80,7 +115,12 @@ export default function Search() {
             type="text"
             placeholder="Search for books, authors, or genres..."
             value={query}
-            onChange={(e) => setQuery(e.target.value)}
+            onChange={(e) => {
+              setQuery(e.target.value);
+              setShowSuggestions(true);
+            }}
+            onFocus={() => setShowSuggestions(true)}
+            onBlur={() => setTimeout(() => setShowSuggestions(false), 150)}
             className="w-full p-4 rounded-2xl bg-gray-800 border border-gray-700 placeholder-gray-400 text-gray-100 focus:outline-none focus:ring-2 focus:ring-red-500"
           />
           <button
@@ -89,6 +129,24 @@ export default function Search() {
           >
             Search
           </button>
+
+          {/* Typeahead Suggestions */}
+          {showSuggestions && suggestions.length > 0 && (
+            <ul className="absolute z-20 top-full left-0 right-0 mt-2 bg-gray-800 border border-gray-700 rounded-xl overflow-hidden shadow-lg">
+              {suggestions.map((s) => (
+                <li
+                  key={`${s.type}-${s.google_id || s.text}`}
+                  onMouseDown={() => handleSuggestionClick(s)}
+                  className="px-4 py-2 flex items-center justify-between hover:bg-gray-700 cursor-pointer"
+                >
+                  <span className="text-sm text-gray-100 line-clamp-1">{s.text}</span>
+                  <span className="text-xs text-gray-400 ml-3">
+                    {s.type === "author" ? "Author" : "Book"}
+                  </span>
+                </li>
+              ))}
+            </ul>
+          )}
         </form>
       </div>
 
@@ -10,6 +10,10 @@ export const getHomeData = () => API.get("home/");
 ===================================================== */
 export const getExploreData = (params = {}) => API.get("explore/", { params });
 
+// Typeahead suggestions for titles and authors (served from the local index)
+export const getAutocomplete = (q, limit = 8) =>
+  API.get("autocomplete/", { params: { q, limit } });
+
 /* =====================================================
    🔹 BOOK DETAILS + SUMMARY
 ===================================================== */
@@ -26,6 +30,10 @@ export const getSummary = (googleId) => API.get(`summary/${googleId}/`);
 /* =====================================================
    🔹 REVIEWS (CRUD)
 ===================================================== */
+// Paginated review list (pass the previous page's next_cursor)
+export const getReviews = (googleId, cursor) =>
+  API.get(`create-review/${googleId}/`, { params: cursor ? { cursor } : {} });
+
 export const createReview = (googleId, payload) =>
   API.post(`create-review/${googleId}/`, payload);
 
@@ -59,7 +67,8 @@ export const setInteraction = (payload) => {
 };
 
 // Get all user-book interactions grouped by reading status + favorites
-export const getMyLibrary = () => API.get("my-library/");
+// First page of every shelf, or the next page of one shelf: { shelf, cursor }
+export const getMyLibrary = (params = {}) => API.get("my-library/", { params });
 
 // Get all favorite books (optional ?status=WR|RDG|RD)
 export const getFavorites = (status) =>